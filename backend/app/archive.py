@@ -0,0 +1,295 @@
+"""Archive job: move closed requests and settled payments out of the live tables.
+
+Service requests with a closed status (``ARCHIVE_REQUEST_STATUSES``) dated
+before the cutoff move to ``Service_Request_History``, together with their
+payment. Payments that no request references move to ``Payment_History``
+once they are settled (``ARCHIVE_PAYMENT_STATUSES``) and older than the
+cutoff. A request whose payment is still open stays live until the payment
+settles, so a request and its payment are always on the same side (see
+``app/history.py``). The cutoff is the first day of the month
+``ARCHIVE_AFTER_MONTHS`` months back, so whole months move, which suits the
+monthly partitions of ``app/partitioning.py``.
+
+The history tables are compressed InnoDB tables (migration 0008) and remain
+the source of record: every all-time aggregate and ``/api/history`` read
+them. With ``--parquet-dir`` (or ``ARCHIVE_PARQUET_DIR``) each batch is also
+written as Parquet files under ``<dir>/<table>/month=YYYY-MM/``, for
+analytics tools and cold storage. That needs the ``pyarrow`` package.
+
+Rows move in batches of ``ARCHIVE_BATCH_SIZE``. Each batch is copied and
+deleted in one transaction on the primary, so an interrupted run can simply
+be started again. Its Parquet files are written once the transaction has
+committed; a run stopped in between leaves those rows in the history tables
+only. The job works on engine connections, not ORM sessions, so
+the projection hooks do not run. Totals do not change when rows move between
+the sides, and only closed requests move, so none of the projections
+(citizen summaries, counters, rollup, frozen months) needs updating. Cached
+results of the moved tables are invalidated after every batch.
+
+Usage (from ``backend/``):
+
+    python -m app.archive status
+    python -m app.archive run
+    python -m app.archive run --months 36 --parquet-dir /srv/archive
+"""
+import argparse
+import datetime
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import Date, DateTime, Integer, Numeric, delete, exists, func, insert, or_, select, update
+
+from app import history
+from app.cache import result_cache
+from app.database import engine
+from app.models.archive_run import ArchiveRun
+from app.models.payment import Payment
+from app.models.payment_history import PaymentHistory
+from app.models.service_request import ServiceRequest
+from app.models.service_request_history import ServiceRequestHistory
+from app.monthly_trends import month_key
+from app.pagination import keyset_after
+
+
+def _env_list(name: str, default: str) -> tuple:
+    return tuple(s.strip() for s in os.getenv(name, default).split(",") if s.strip())
+
+
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "24"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+ARCHIVE_REQUEST_STATUSES = _env_list("ARCHIVE_REQUEST_STATUSES", "Completed,Rejected,Cancelled")
+ARCHIVE_PAYMENT_STATUSES = _env_list("ARCHIVE_PAYMENT_STATUSES", "Completed,Failed,Refunded")
+ARCHIVE_PARQUET_DIR = os.getenv("ARCHIVE_PARQUET_DIR", "")
+
+_REQUEST_COLUMNS = [c.name for c in ServiceRequest.__table__.columns]
+_PAYMENT_COLUMNS = [c.name for c in Payment.__table__.columns]
+MOVED_TABLES = (ServiceRequest.__tablename__, Payment.__tablename__, *history.HISTORY_TABLES)
+
+
+def cutoff_for(months: int, today: Optional[datetime.date] = None) -> datetime.date:
+    """First day of the month ``months`` months before the month of ``today``"""
+    today = today or datetime.date.today()
+    index = today.year * 12 + today.month - 1 - months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def _closed_requests(cutoff: datetime.date):
+    """Requests the job may move: closed, older than ``cutoff``, without an open payment"""
+    return (
+        select(*(getattr(ServiceRequest, c) for c in _REQUEST_COLUMNS))
+        .outerjoin(Payment, Payment.Payment_ID == ServiceRequest.Payment_ID)
+        .where(
+            ServiceRequest.Request_Date < cutoff,
+            ServiceRequest.Status.in_(ARCHIVE_REQUEST_STATUSES),
+            or_(Payment.Payment_ID.is_(None), Payment.Status.in_(ARCHIVE_PAYMENT_STATUSES)),
+        )
+    )
+
+
+def _unreferenced_payments(cutoff: datetime.date):
+    """Settled payments older than ``cutoff`` that no live request points to"""
+    return (
+        select(*(getattr(Payment, c) for c in _PAYMENT_COLUMNS))
+        .where(
+            Payment.Payment_Date < cutoff,
+            Payment.Status.in_(ARCHIVE_PAYMENT_STATUSES),
+            ~exists().where(ServiceRequest.Payment_ID == Payment.Payment_ID),
+        )
+    )
+
+
+class ParquetWriter:
+    """Writes archived rows to ``<directory>/<table>/month=YYYY-MM/part-<first ID>-<last ID>.parquet``.
+
+    Files are written after their batch commits, and the name depends only
+    on the rows, so no row ever lands in two files: writing the same rows
+    again replaces the file.
+    """
+
+    def __init__(self, directory: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet archive files require the 'pyarrow' package")
+        self._pa, self._pq = pyarrow, pyarrow.parquet
+        self.directory = Path(directory)
+
+    def _schema(self, table):
+        """The Arrow schema of ``table``, so batches whose column happens to be all NULL still match"""
+        pa = self._pa
+        fields = []
+        for column in table.columns:
+            kind = column.type
+            if isinstance(kind, Numeric):
+                arrow = pa.decimal128(kind.precision, kind.scale)
+            elif isinstance(kind, Integer):
+                arrow = pa.int64()
+            elif isinstance(kind, DateTime):
+                arrow = pa.timestamp("us")
+            elif isinstance(kind, Date):
+                arrow = pa.date32()
+            else:
+                arrow = pa.string()
+            fields.append(pa.field(column.name, arrow))
+        return pa.schema(fields)
+
+    def write(self, model, date_column: str, rows: List[dict]) -> None:
+        months: Dict[str, List[dict]] = {}
+        for row in rows:
+            day = row[date_column]
+            months.setdefault(month_key(day) if day else "undated", []).append(row)
+        schema = self._schema(model.__table__)
+        key = model.__table__.primary_key.columns.keys()[0]
+        for month, month_rows in months.items():
+            path = self.directory / model.__tablename__ / f"month={month}"
+            path.mkdir(parents=True, exist_ok=True)
+            ids = [row[key] for row in month_rows]
+            self._pq.write_table(self._pa.Table.from_pylist(month_rows, schema=schema),
+                                 path / f"part-{min(ids)}-{max(ids)}.parquet", compression="zstd")
+
+
+def _move(conn, requests: List[dict], payments: List[dict], now: datetime.datetime) -> None:
+    if requests:
+        conn.execute(insert(ServiceRequestHistory), [{**row, "Archived_At": now} for row in requests])
+    if payments:
+        conn.execute(insert(PaymentHistory), [{**row, "Archived_At": now} for row in payments])
+    # Payments first: trg_after_delete_service_request copies a deleted
+    # request's payment into payment_archive (the record of deleted
+    # payments), and finds nothing to copy once the payment has moved
+    if payments:
+        conn.execute(delete(Payment).where(Payment.Payment_ID.in_([p["Payment_ID"] for p in payments])))
+    if requests:
+        conn.execute(delete(ServiceRequest).where(ServiceRequest.Request_ID.in_([r["Request_ID"] for r in requests])))
+
+
+def phases(cutoff: datetime.date) -> list:
+    """(source query, keyset columns) of the requests and then the unreferenced payments to move.
+
+    Batches follow the date order (then the ID), so each one reads a few
+    adjacent partitions and lands in one or two monthly Parquet directories.
+    """
+    return [
+        (_closed_requests(cutoff), [ServiceRequest.Request_Date, ServiceRequest.Request_ID]),
+        (_unreferenced_payments(cutoff), [Payment.Payment_Date, Payment.Payment_ID]),
+    ]
+
+
+def next_batch(source, keys, last: Optional[list], batch_size: int):
+    """The ``batch_size`` rows of ``source`` after the keyset position ``last``"""
+    stmt = source.order_by(*keys).limit(batch_size)
+    if last is not None:
+        stmt = stmt.where(keyset_after(keys, last, descending=False))
+    return stmt
+
+
+def run(months: int = ARCHIVE_AFTER_MONTHS, batch_size: int = ARCHIVE_BATCH_SIZE,
+        parquet_dir: Optional[str] = None, today: Optional[datetime.date] = None, bind=engine) -> dict:
+    """Archive everything eligible before ``cutoff_for(months, today)``; returns the run's totals"""
+    writer = ParquetWriter(parquet_dir) if parquet_dir else None
+    for model in (ArchiveRun, ServiceRequestHistory, PaymentHistory):
+        model.__table__.create(bind, checkfirst=True)
+
+    cutoff = cutoff_for(months, today)
+    with bind.begin() as conn:
+        run_id = conn.execute(insert(ArchiveRun).values(
+            Started_At=datetime.datetime.now(), Cutoff=cutoff, Parquet_Path=parquet_dir or None,
+        )).inserted_primary_key[0]
+
+    totals = {"run_id": run_id, "cutoff": cutoff, "requests": 0, "payments": 0}
+    for source, keys in phases(cutoff):
+        last = None
+        while True:
+            with bind.begin() as conn:
+                rows = [dict(row._mapping) for row in conn.execute(next_batch(source, keys, last, batch_size))]
+                if not rows:
+                    break
+                last = [rows[-1][k.key] for k in keys]
+                if keys[0] is ServiceRequest.Request_Date:
+                    requests = rows
+                    payment_ids = sorted({r["Payment_ID"] for r in rows if r["Payment_ID"] is not None})
+                    payments = [
+                        dict(row._mapping) for row in conn.execute(
+                            select(*(getattr(Payment, c) for c in _PAYMENT_COLUMNS))
+                            .where(Payment.Payment_ID.in_(payment_ids))
+                        )
+                    ] if payment_ids else []
+                else:
+                    requests, payments = [], rows
+                _move(conn, requests, payments, datetime.datetime.now())
+                conn.execute(
+                    update(ArchiveRun).where(ArchiveRun.Run_ID == run_id).values(
+                        Requests=ArchiveRun.Requests + len(requests),
+                        Payments=ArchiveRun.Payments + len(payments),
+                    )
+                )
+            if writer is not None:
+                # Only once the batch has committed: a rolled back batch stays
+                # live and is moved (and written) again by the next run
+                writer.write(ServiceRequest, "Request_Date", requests)
+                writer.write(Payment, "Payment_Date", payments)
+            totals["requests"] += len(requests)
+            totals["payments"] += len(payments)
+            result_cache.invalidate(*MOVED_TABLES)
+
+    with bind.begin() as conn:
+        conn.execute(update(ArchiveRun).where(ArchiveRun.Run_ID == run_id)
+                     .values(Finished_At=datetime.datetime.now()))
+    return totals
+
+
+def status(months: int = ARCHIVE_AFTER_MONTHS, bind=engine) -> dict:
+    """Rows waiting to be archived at ``months``, rows already archived, and the latest runs"""
+    for model in (ArchiveRun, ServiceRequestHistory, PaymentHistory):
+        model.__table__.create(bind, checkfirst=True)
+    cutoff = cutoff_for(months)
+    with bind.connect() as conn:
+        return {
+            "cutoff": cutoff,
+            "eligible_requests": conn.scalar(select(func.count()).select_from(_closed_requests(cutoff).subquery())),
+            "eligible_payments": conn.scalar(
+                select(func.count()).select_from(_unreferenced_payments(cutoff).subquery())
+            ),
+            "archived_requests": conn.scalar(select(func.count()).select_from(ServiceRequestHistory)),
+            "archived_payments": conn.scalar(select(func.count()).select_from(PaymentHistory)),
+            "runs": [
+                dict(row._mapping)
+                for row in conn.execute(select(ArchiveRun.__table__).order_by(ArchiveRun.Run_ID.desc()).limit(5))
+            ],
+        }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Move closed requests and settled payments to the history tables")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, text in (("status", "show what is archived and what is waiting"),
+                       ("run", "archive everything older than the cutoff")):
+        cmd = sub.add_parser(name, help=text)
+        cmd.add_argument("--months", type=int, default=ARCHIVE_AFTER_MONTHS,
+                         help="archive rows dated before the start of the month this many months back")
+    run_cmd = sub.choices["run"]
+    run_cmd.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    run_cmd.add_argument("--parquet-dir", default=ARCHIVE_PARQUET_DIR or None,
+                         help="also write each batch as Parquet files under this directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        info = status(args.months)
+        print(f"cutoff {info['cutoff']}: {info['eligible_requests']} requests and "
+              f"{info['eligible_payments']} unreferenced payments waiting")
+        print(f"archived: {info['archived_requests']} requests, {info['archived_payments']} payments")
+        for r in info["runs"]:
+            print(f"  run {r['Run_ID']} at {r['Started_At']:%Y-%m-%d %H:%M} cutoff {r['Cutoff']}: "
+                  f"{r['Requests']} requests, {r['Payments']} payments"
+                  f"{'' if r['Finished_At'] else ' (unfinished)'}")
+    else:
+        totals = run(args.months, args.batch_size, args.parquet_dir)
+        print(f"run {totals['run_id']}: archived {totals['requests']} requests and "
+              f"{totals['payments']} payments dated before {totals['cutoff']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""Streaming bulk ingestion shared by the ``/bulk`` endpoints.
+
+Request bodies are read as a stream of NDJSON or CSV records, validated with
+the existing ``*Create`` schemas and inserted in chunked multi-row
+``executemany`` transactions. Rows that fail validation or violate a
+constraint are reported back by their (1-based) position in the upload; the
+rest of the upload is still inserted.
+"""
+import codecs
+import csv
+import io
+import json
+import os
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import dashboard_counters
+from app.id_allocator import id_allocator
+from app.schemas.schemas import BulkIngestError, BulkIngestResult
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "500000"))
+# Cap the error list so a completely broken upload cannot blow up the response
+BULK_MAX_REPORTED_ERRORS = int(os.getenv("BULK_MAX_REPORTED_ERRORS", "1000"))
+
+Record = Tuple[int, Dict[str, Any]]
+# Optional hook that checks a chunk of validated rows against the database and
+# returns {row_number: message} for the ones that must be rejected.
+ChunkValidator = Callable[[Session, List[Record]], Dict[int, str]]
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    # Incremental decoder so multi-byte characters split across chunks survive
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def _iter_csv_records(request: Request) -> AsyncIterator[str]:
+    # A quoted field may span lines (a multi-line Address, say), so a record
+    # stays open until its quotes balance. Doubled quotes inside a field
+    # count twice and keep the balance.
+    pending: Optional[str] = None
+    quotes = 0
+    async for line in _iter_lines(request):
+        pending = line if pending is None else f"{pending}\n{line}"
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            yield pending
+            pending, quotes = None, 0
+    if pending is not None:
+        # Unterminated quote: csv reads the field to the end of the upload
+        yield pending
+
+
+async def iter_records(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (row_number, record) pairs from an NDJSON or CSV request body.
+
+    The format follows the Content-Type (``text/csv`` selects CSV, anything
+    else is treated as NDJSON); CSV fields may contain quoted newlines.
+    Undecodable lines are yielded as exceptions so the caller can report them
+    against their row number.
+    """
+    content_type = request.headers.get("content-type", "")
+    is_csv = "csv" in content_type
+    header: Optional[List[str]] = None
+    row_number = 0
+
+    async for line in (_iter_csv_records(request) if is_csv else _iter_lines(request)):
+        if not line.strip():
+            continue
+        if is_csv:
+            values = next(csv.reader(io.StringIO(line)))
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            row_number += 1
+            if len(values) != len(header):
+                yield row_number, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+                continue
+            # Empty CSV cells mean NULL
+            yield row_number, {k: (v if v != "" else None) for k, v in zip(header, values)}
+        else:
+            row_number += 1
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row_number, ValueError(f"Invalid JSON: {e.msg}")
+                continue
+            if not isinstance(record, dict):
+                yield row_number, ValueError("Each line must be a JSON object")
+                continue
+            yield row_number, record
+
+
+class BulkIngestor:
+    """Validates records and inserts them chunk by chunk into one table"""
+
+    def __init__(self, db: Session, model, schema: type, validate_chunk: Optional[ChunkValidator] = None):
+        self.db = db
+        self.model = model
+        self.schema = schema
+        self.validate_chunk = validate_chunk
+        self.pk = model.__mapper__.primary_key[0].key
+        self.result = BulkIngestResult(received=0, inserted=0, failed=0, errors=[])
+
+    def add_error(self, row: int, message: str) -> None:
+        self.result.failed += 1
+        if len(self.result.errors) < BULK_MAX_REPORTED_ERRORS:
+            self.result.errors.append(BulkIngestError(row=row, error=message))
+
+    def validate(self, row: int, record: Any) -> Optional[Dict[str, Any]]:
+        """Return the validated payload for ``record`` or record an error"""
+        self.result.received += 1
+        if isinstance(record, Exception):
+            self.add_error(row, str(record))
+            return None
+        try:
+            return self.schema(**record).model_dump()
+        except ValidationError as e:
+            self.add_error(row, "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+            return None
+
+    def insert_chunk(self, records: List[Record]) -> None:
+        if self.validate_chunk is not None:
+            rejected = self.validate_chunk(self.db, records)
+            for row, message in rejected.items():
+                self.add_error(row, message)
+            records = [(row, payload) for row, payload in records if row not in rejected]
+        if not records:
+            return
+
+        ids = id_allocator.next_ids(self.model, len(records))
+        rows = [{self.pk: pk, **payload} for pk, (_, payload) in zip(ids, records)]
+        try:
+            self.db.execute(insert(self.model), rows)
+            dashboard_counters.record_inserts(self.db, self.model, rows)
+            self.db.commit()
+            self.result.inserted += len(rows)
+        except IntegrityError:
+            # Retry the chunk row by row so only the offending rows are rejected
+            self.db.rollback()
+            for (row, _), values in zip(records, rows):
+                try:
+                    self.db.execute(insert(self.model), [values])
+                    dashboard_counters.record_inserts(self.db, self.model, [values])
+                    self.db.commit()
+                    self.result.inserted += 1
+                except IntegrityError as e:
+                    self.db.rollback()
+                    self.add_error(row, str(e.orig))
+
+
+async def ingest_stream(
+    request: Request,
+    db: Session,
+    model,
+    schema: type,
+    validate_chunk: Optional[ChunkValidator] = None,
+) -> BulkIngestResult:
+    """Stream ``request`` into ``model``'s table and return the per-row report"""
+    ingestor = BulkIngestor(db, model, schema, validate_chunk)
+    chunk: List[Record] = []
+
+    async for row, record in iter_records(request):
+        if row > BULK_MAX_ROWS:
+            ingestor.add_error(row, f"Upload exceeds {BULK_MAX_ROWS} rows; remaining rows were not read")
+            break
+        payload = ingestor.validate(row, record)
+        if payload is not None:
+            chunk.append((row, payload))
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            await run_in_threadpool(ingestor.insert_chunk, chunk)
+            chunk = []
+
+    if chunk:
+        await run_in_threadpool(ingestor.insert_chunk, chunk)
+    ingestor.result.errors.sort(key=lambda e: e.row)
+    return ingestor.result
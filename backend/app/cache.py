@@ -0,0 +1,315 @@
+"""Result cache for the read-heavy analytics endpoints.
+
+Cached results are tagged with the tables they were computed from. Every
+tag has a version number that is part of the cache key, so invalidating a
+table is a single counter bump: entries built from the old version are never
+looked up again and age out through LRU eviction or their TTL.
+
+Tags are invalidated automatically when a session that wrote to the tagged
+table commits (see ``install_session_hooks``). The default backend is an
+in-process LRU; ``CACHE_BACKEND=redis`` shares results and tag versions
+between uvicorn workers (requires the ``redis`` package and ``REDIS_URL``).
+"""
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, replica_lag
+from app.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+# Write-time key covering every table, for reads whose tables are unknown
+ANY_TABLE = "<any>"
+
+
+class LocalBackend:
+    """Thread-safe in-process LRU with per-entry expiry"""
+
+    # Counters only see this worker's writes
+    shared = False
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        # Counters restart from zero with the process, so versions are only
+        # comparable within one epoch
+        self.epoch = uuid.uuid4().hex
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def incr(self, name: str) -> int:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def touch(self, names: Iterable[str], at: float) -> None:
+        with self._lock:
+            for name in names:
+                self._touched[name] = max(at, self._touched.get(name, 0.0))
+
+    def touched_at(self, names: Iterable[str]) -> float:
+        with self._lock:
+            return max((self._touched.get(name, 0.0) for name in names), default=0.0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisBackend:
+    """Shared backend so all workers see the same results and invalidations"""
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "csms:cache:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self._client.set(prefix + "epoch", uuid.uuid4().hex, nx=True)
+        self.epoch = self._client.get(prefix + "epoch").decode()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        raw = self._client.get(self._prefix + key)
+        if raw is None:
+            return False, None
+        return True, pickle.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        self._client.set(self._prefix + key, pickle.dumps(value), ex=ttl)
+
+    def get_counter(self, name: str) -> int:
+        raw = self._client.get(self._prefix + "counter:" + name)
+        return int(raw) if raw is not None else 0
+
+    def incr(self, name: str) -> int:
+        return int(self._client.incr(self._prefix + "counter:" + name))
+
+    def touch(self, names: Iterable[str], at: float) -> None:
+        with self._client.pipeline() as pipe:
+            for name in names:
+                pipe.set(self._prefix + "touched:" + name, at)
+            pipe.execute()
+
+    def touched_at(self, names: Iterable[str]) -> float:
+        raw = self._client.mget([self._prefix + "touched:" + name for name in names])
+        return max((float(r) for r in raw if r is not None), default=0.0)
+
+    def clear(self) -> None:
+        # Keep the counters, write times and epoch: HTTP validators must never
+        # see a version number go backwards
+        keep = tuple(self._prefix.encode() + k for k in (b"counter:", b"touched:", b"epoch"))
+        for key in self._client.scan_iter(self._prefix + "*"):
+            if not key.startswith(keep):
+                self._client.delete(key)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._client.scan_iter(self._prefix + "*"))
+
+
+class ResultCache:
+    """Tag-versioned get-or-compute cache with hit/miss accounting"""
+
+    def __init__(self, backend, default_ttl: int = CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+        # Called with the invalidated tags after each invalidation (app/live_updates.py)
+        self.listeners: List[Callable[[Tuple[str, ...]], None]] = []
+
+    def _count(self, name: str, outcome: str) -> None:
+        with self._stats_lock:
+            stats = self._stats.setdefault(name, {"hits": 0, "misses": 0})
+            stats[outcome] += 1
+
+    def key(self, name: str, params: Any, tags: Iterable[str]) -> str:
+        """Cache (and single-flight) key of a query at the current versions of ``tags``"""
+        versions = ",".join(f"{t}={self.backend.get_counter('tag:' + t)}" for t in sorted(tags))
+        return f"{name}|{json.dumps(params, sort_keys=True, default=str)}|{versions}"
+
+    def get_or_compute(
+        self,
+        name: str,
+        compute: Callable[[], Any],
+        tags: Iterable[str],
+        params: Any = None,
+        ttl: Optional[int] = None,
+    ) -> Any:
+        """Return the cached result for (name, params) or compute and store it.
+
+        Concurrent misses for the same key are computed once (``app.single_flight``).
+        """
+        key = self.key(name, params, tags)
+        if self.default_ttl <= 0:
+            return single_flight.do(key, compute, name)
+        found, value = self.backend.get(key)
+        if found:
+            self._count(name, "hits")
+            return value
+        self._count(name, "misses")
+
+        def compute_and_store():
+            value = compute()
+            self.backend.set(key, value, ttl if ttl is not None else self.default_ttl)
+            return value
+        return single_flight.do(key, compute_and_store, name)
+
+    def shared(self, name: str, compute: Callable[[], Any], tags: Iterable[str], params: Any = None) -> Any:
+        """Result of ``compute`` shared by concurrent identical calls only; nothing is cached"""
+        return single_flight.do(self.key(name, params, tags), compute, name)
+
+    def _notify(self, tags: Tuple[str, ...]) -> None:
+        for listener in self.listeners:
+            try:
+                listener(tags)
+            except Exception:
+                logger.exception("Cache invalidation listener failed")
+
+    def invalidate(self, *tags: str) -> None:
+        """Make every result tagged with any of ``tags`` stale"""
+        for tag in tags:
+            self.backend.incr("tag:" + tag)
+        self.backend.touch((*tags, ANY_TABLE), time.time())
+        self._notify(tags)
+        with self._stats_lock:
+            stats = self._stats.setdefault("_invalidations", {})
+            for tag in tags:
+                stats[tag] = stats.get(tag, 0) + 1
+
+    def invalidate_all(self) -> None:
+        """Drop everything, e.g. after a write whose tables are unknown"""
+        self.backend.clear()
+        self.backend.incr("tag:*")
+        self.backend.touch(("*", ANY_TABLE), time.time())
+        self._notify(("*",))
+        with self._stats_lock:
+            stats = self._stats.setdefault("_invalidations", {})
+            stats["*"] = stats.get("*", 0) + 1
+
+    def written_at(self, tables: Optional[Iterable[str]] = None) -> float:
+        """When any of ``tables`` (any table, for None) was last invalidated by a write"""
+        return self.backend.touched_at((*tables, "*") if tables is not None else (ANY_TABLE,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            per_name = {k: dict(v) for k, v in self._stats.items() if not k.startswith("_")}
+            invalidations = dict(self._stats.get("_invalidations", {}))
+        for stats in per_name.values():
+            total = stats["hits"] + stats["misses"]
+            stats["hit_ratio"] = round(stats["hits"] / total, 4) if total else 0.0
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "ttl_seconds": self.default_ttl,
+            "caches": per_name,
+            "invalidations": invalidations,
+        }
+
+
+def _make_backend():
+    if os.getenv("CACHE_BACKEND", "local").lower() == "redis":
+        return RedisBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return LocalBackend()
+
+
+result_cache = ResultCache(_make_backend())
+# Replica reads wait for the last write to the tables they read (app/db_routing.py)
+replica_lag.written_at = result_cache.written_at
+
+
+# Rows the database triggers delete along with a deleted row of the key table
+TRIGGER_CASCADES = {
+    "Citizen": ("Service_Request", "Grievance", "Payment", "Service_Request_History", "Payment_History"),
+    "Service": ("Service_Request", "Payment", "Service_Request_History", "Payment_History"),
+    "Service_Request": ("Payment",),
+}
+
+
+def _written_tables(session: Session) -> set:
+    return session.info.setdefault("written_tables", set())
+
+
+def _deleted_from(session: Session, table: str) -> None:
+    _written_tables(session).update((table, *TRIGGER_CASCADES.get(table, ())))
+
+
+def install_session_hooks(session_factory) -> None:
+    """Invalidate cache tags for every table a session wrote once it commits"""
+
+    @event.listens_for(session_factory, "after_flush")
+    def _collect_flushed(session, flush_context):
+        for obj in list(session.new) + list(session.dirty):
+            table = getattr(obj, "__tablename__", None)
+            if table:
+                _written_tables(session).add(table)
+        for obj in session.deleted:
+            table = getattr(obj, "__tablename__", None)
+            if table:
+                _deleted_from(session, table)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _collect_executed(orm_execute_state):
+        # Core insert()/update()/delete() statements executed through the session
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, "table", None)
+            if table is None:
+                return
+            if orm_execute_state.is_delete:
+                _deleted_from(orm_execute_state.session, table.name)
+            else:
+                _written_tables(orm_execute_state.session).add(table.name)
+
+    @event.listens_for(session_factory, "after_commit")
+    def _invalidate(session):
+        tables = session.info.pop("written_tables", None)
+        if tables:
+            result_cache.invalidate(*tables)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _discard(session):
+        session.info.pop("written_tables", None)
+
+
+install_session_hooks(SessionLocal)
@@ -0,0 +1,530 @@
+"""Per-citizen summary projection.
+
+``citizen_summary`` holds one pre-aggregated row per citizen (request and
+grievance counts, amount paid, last activity dates), so the profile and
+summary endpoints answer with a primary-key lookup instead of calling
+``sp_get_citizen_summary`` and re-joining the citizen's requests,
+grievances and payments on every view.
+
+Rows are kept current by session hooks rather than explicit calls in each
+router, because many writes move a summary: a payment status change, a
+request moving to another citizen, or a bulk insert. ``after_flush`` and
+``do_orm_execute`` turn every written row into per-citizen deltas (its old
+contribution subtracted, its new one added). ``before_commit`` applies them
+with one upsert that adds to the stored values, inside the same transaction,
+so each summary changes atomically with the write that caused it. Deltas
+commute, so concurrent writers for the same citizen only queue on the
+summary row and never read each other's rows. The last activity dates are
+the exception: a removed row can lower a maximum, so those citizens get
+their dates re-read (a plain, non-locking MAX on the per-citizen index).
+
+Writes that bypass the ORM session (triggers, the custom query console) are
+repaired by ``rebuild``, which recomputes rows from the base tables:
+
+    python -m app.citizen_summary rebuild
+"""
+import argparse
+import sys
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, case, delete, event, func, inspect, insert, select, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+
+from app import history
+from app.database import SessionLocal
+from app.models.citizen import Citizen
+from app.models.citizen_summary import CitizenSummary
+from app.models.grievance import Grievance
+from app.models.payment import Payment
+from app.models.service_request import ServiceRequest
+
+PAID_STATUS = "Completed"
+COMPLETED_REQUEST_STATUS = "Completed"
+PENDING_REQUEST_STATUS = "Pending"
+OPEN_GRIEVANCE_STATUS = "Open"
+
+# Citizens recomputed per statement (IN list size) and per rebuild transaction
+BATCH_SIZE = 1000
+
+# Summary columns each row adds to; the other two are maxima
+_COUNTS = (
+    "Total_Service_Requests",
+    "Completed_Requests",
+    "Pending_Requests",
+    "Total_Grievances",
+    "Open_Grievances",
+    "Total_Amount_Paid",
+)
+_DATES = ("Last_Service_Request_Date", "Last_Grievance_Date")
+
+_EMPTY = {
+    "Total_Service_Requests": 0,
+    "Completed_Requests": 0,
+    "Pending_Requests": 0,
+    "Total_Grievances": 0,
+    "Open_Grievances": 0,
+    "Total_Amount_Paid": Decimal("0.00"),
+    "Last_Service_Request_Date": None,
+    "Last_Grievance_Date": None,
+}
+
+
+def _batches(ids: List[int]) -> Iterable[List[int]]:
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start:start + BATCH_SIZE]
+
+
+def _add(summary: dict, **values) -> None:
+    """Merge one side's request aggregates into ``summary``"""
+    for key, value in values.items():
+        if key == "Last_Service_Request_Date":
+            if value is not None and (summary[key] is None or value > summary[key]):
+                summary[key] = value
+        else:
+            summary[key] += value or 0
+
+
+def compute(db: Session, citizen_ids: Iterable[int]) -> Dict[int, dict]:
+    """Aggregate summaries for existing citizens straight from the base tables.
+
+    Requests, grievances and payments are aggregated separately and merged,
+    avoiding the request x grievance fan-out (which also inflates
+    ``SUM(Amount)``) of a single joined GROUP BY. Requests the archive job
+    moved to ``Service_Request_History`` still count (``app.history.SIDES``).
+    """
+    ids = sorted(set(citizen_ids))
+    summaries: Dict[int, dict] = {}
+    for batch in _batches(ids):
+        for (citizen_id,) in db.execute(select(Citizen.Citizen_ID).where(Citizen.Citizen_ID.in_(batch))):
+            summaries[citizen_id] = {"Citizen_ID": citizen_id, **_EMPTY}
+
+        for request, payment in history.SIDES:
+            requests = db.execute(
+                select(
+                    request.Citizen_ID,
+                    func.count(request.Request_ID),
+                    func.count(case((request.Status == COMPLETED_REQUEST_STATUS, 1))),
+                    func.count(case((request.Status == PENDING_REQUEST_STATUS, 1))),
+                    func.max(request.Request_Date),
+                )
+                .where(request.Citizen_ID.in_(batch))
+                .group_by(request.Citizen_ID)
+            )
+            for citizen_id, total, completed, pending, last in requests:
+                if citizen_id in summaries:
+                    _add(summaries[citizen_id], Total_Service_Requests=total, Completed_Requests=completed,
+                         Pending_Requests=pending, Last_Service_Request_Date=last)
+
+            paid = db.execute(
+                select(request.Citizen_ID, func.sum(payment.Amount))
+                .join(payment, payment.Payment_ID == request.Payment_ID)
+                .where(request.Citizen_ID.in_(batch), payment.Status == PAID_STATUS)
+                .group_by(request.Citizen_ID)
+            )
+            for citizen_id, amount in paid:
+                if citizen_id in summaries:
+                    _add(summaries[citizen_id], Total_Amount_Paid=Decimal(amount or 0).quantize(Decimal("0.01")))
+
+        grievances = db.execute(
+            select(
+                Grievance.Citizen_ID,
+                func.count(Grievance.Grievance_ID),
+                func.count(case((Grievance.Status == OPEN_GRIEVANCE_STATUS, 1))),
+                func.max(Grievance.Date),
+            )
+            .where(Grievance.Citizen_ID.in_(batch))
+            .group_by(Grievance.Citizen_ID)
+        )
+        for citizen_id, total, open_count, last in grievances:
+            if citizen_id in summaries:
+                summaries[citizen_id].update(Total_Grievances=total, Open_Grievances=open_count,
+                                             Last_Grievance_Date=last)
+
+    return summaries
+
+
+def _upsert(db: Session, rows: List[dict]) -> None:
+    columns = [c.name for c in CitizenSummary.__table__.columns if not c.primary_key]
+    dialect = db.get_bind().dialect.name
+    # Upsert rather than delete + insert: two writers creating the same
+    # citizen's first row would otherwise deadlock on MySQL gap locks
+    if dialect == "mysql":
+        stmt = mysql.insert(CitizenSummary)
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columns})
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(CitizenSummary)
+        stmt = stmt.on_conflict_do_update(index_elements=["Citizen_ID"], set_={c: stmt.excluded[c] for c in columns})
+    else:
+        for batch in _batches([row["Citizen_ID"] for row in rows]):
+            db.execute(delete(CitizenSummary).where(CitizenSummary.Citizen_ID.in_(batch)))
+        stmt = insert(CitizenSummary)
+    db.execute(stmt, rows)
+
+
+def refresh(db: Session, citizen_ids: Iterable[int]) -> None:
+    """Recompute the summary rows of ``citizen_ids`` in the current transaction.
+
+    Citizens that no longer exist lose their row. Does not commit.
+    """
+    ids = sorted({i for i in citizen_ids if i is not None})
+    if not ids:
+        return
+    summaries = compute(db, ids)
+    if summaries:
+        _upsert(db, list(summaries.values()))
+    gone = [i for i in ids if i not in summaries]
+    for batch in _batches(gone):
+        db.execute(delete(CitizenSummary).where(CitizenSummary.Citizen_ID.in_(batch)))
+
+
+# -- Deltas -----------------------------------------------------------------------
+
+def _paid(amount, status) -> Decimal:
+    return Decimal(amount or 0) if status == PAID_STATUS else Decimal("0.00")
+
+
+def _request_values(row: dict, paid: Decimal) -> dict:
+    """What one service request adds to its citizen's summary"""
+    return {
+        "Total_Service_Requests": 1,
+        "Completed_Requests": int(row.get("Status") == COMPLETED_REQUEST_STATUS),
+        "Pending_Requests": int(row.get("Status") == PENDING_REQUEST_STATUS),
+        "Total_Amount_Paid": paid,
+        "Last_Service_Request_Date": row.get("Request_Date"),
+    }
+
+
+def _grievance_values(row: dict) -> dict:
+    """What one grievance adds to its citizen's summary"""
+    return {
+        "Total_Grievances": 1,
+        "Open_Grievances": int(row.get("Status") == OPEN_GRIEVANCE_STATUS),
+        "Last_Grievance_Date": row.get("Date"),
+    }
+
+
+def _apply_deltas(db: Session, rows: List[dict]) -> None:
+    """Add ``rows`` (per-citizen deltas) to the stored summaries, creating missing rows"""
+    table = CitizenSummary.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("mysql", "sqlite"):
+        if dialect == "mysql":
+            stmt = mysql.insert(CitizenSummary)
+            new, latest = stmt.inserted, func.greatest
+        else:
+            stmt = sqlite.insert(CitizenSummary)
+            # SQLite's max() with two arguments is the scalar maximum
+            new, latest = stmt.excluded, func.max
+        values = {c: table.c[c] + new[c] for c in _COUNTS}
+        values.update({c: latest(func.coalesce(table.c[c], new[c]), func.coalesce(new[c], table.c[c]))
+                       for c in _DATES})
+        if dialect == "mysql":
+            stmt = stmt.on_duplicate_key_update(values)
+        else:
+            stmt = stmt.on_conflict_do_update(index_elements=["Citizen_ID"], set_=values)
+        db.execute(stmt, rows)
+        return
+    for row in rows:
+        values = {c: table.c[c] + row[c] for c in _COUNTS}
+        values.update({c: func.coalesce(table.c[c], row[c]) for c in _DATES if row[c] is not None})
+        found = db.execute(
+            update(CitizenSummary).where(CitizenSummary.Citizen_ID == row["Citizen_ID"]).values(values)
+        ).rowcount
+        if not found:
+            db.execute(insert(CitizenSummary), [row])
+
+
+def _last_dates(db: Session, citizen_ids: List[int]) -> None:
+    """Re-read the last activity dates of ``citizen_ids`` after rows that set them went away"""
+    for batch in _batches(citizen_ids):
+        dates = {i: dict.fromkeys(_DATES) for i in batch}
+        for request, _ in history.SIDES:
+            for citizen_id, last in db.execute(
+                select(request.Citizen_ID, func.max(request.Request_Date))
+                .where(request.Citizen_ID.in_(batch))
+                .group_by(request.Citizen_ID)
+            ):
+                _add(dates[citizen_id], Last_Service_Request_Date=last)
+        for citizen_id, last in db.execute(
+            select(Grievance.Citizen_ID, func.max(Grievance.Date))
+            .where(Grievance.Citizen_ID.in_(batch))
+            .group_by(Grievance.Citizen_ID)
+        ):
+            dates[citizen_id]["Last_Grievance_Date"] = last
+        db.execute(
+            update(CitizenSummary.__table__).where(CitizenSummary.Citizen_ID == bindparam("cid")),
+            [{"cid": i, **values} for i, values in dates.items()],
+        )
+
+
+def _write_pending(db: Session, pending: dict) -> None:
+    """Write the deltas collected by the session hooks. Does not commit."""
+    deltas, gone = pending["deltas"], pending["gone"]
+    for batch in _batches(sorted(gone)):
+        db.execute(delete(CitizenSummary).where(CitizenSummary.Citizen_ID.in_(batch)))
+    ids = sorted(set(deltas) - gone)
+    if not ids:
+        return
+    # A citizen without a row (written outside the application and not
+    # rebuilt yet) has no base to add to, so it is computed in full instead;
+    # citizens created in this transaction start from zero
+    stored = set()
+    for batch in _batches(ids):
+        stored.update(db.execute(
+            select(CitizenSummary.Citizen_ID).where(CitizenSummary.Citizen_ID.in_(batch))
+        ).scalars())
+    missing = [i for i in ids if i not in stored and i not in pending["created"]]
+    if missing:
+        refresh(db, missing)
+    rows = [{"Citizen_ID": i, **deltas[i]} for i in ids if i not in missing]
+    for start in range(0, len(rows), BATCH_SIZE):
+        _apply_deltas(db, rows[start:start + BATCH_SIZE])
+    redate = sorted(pending["redate"] & set(ids) - set(missing))
+    if redate:
+        _last_dates(db, redate)
+
+
+def lookup(db: Session, citizen_id: int) -> Optional[Tuple[Citizen, dict]]:
+    """The citizen and its summary values in one primary-key lookup.
+
+    A citizen whose summary row is missing (inserted outside the application
+    and not yet rebuilt) is aggregated on the fly.
+    """
+    row = db.execute(
+        select(Citizen, CitizenSummary)
+        .outerjoin(CitizenSummary, CitizenSummary.Citizen_ID == Citizen.Citizen_ID)
+        .where(Citizen.Citizen_ID == citizen_id)
+    ).first()
+    if row is None:
+        return None
+    citizen, summary = row
+    if summary is None:
+        values = dict(compute(db, [citizen_id]).get(citizen_id, _EMPTY))
+        values.pop("Citizen_ID", None)
+    else:
+        values = {key: getattr(summary, key) for key in _EMPTY}
+    return citizen, values
+
+
+def read(db: Session, citizen_id: int) -> Optional[dict]:
+    """Summary row shaped like the result of ``sp_get_citizen_summary``"""
+    found = lookup(db, citizen_id)
+    if found is None:
+        return None
+    citizen, values = found
+    return {"Citizen_ID": citizen.Citizen_ID, "Name": citizen.Name, "Email": citizen.Email, **values}
+
+
+def rebuild(db: Session, batch_size: int = BATCH_SIZE) -> int:
+    """Recompute every summary row in primary-key batches, committing per batch"""
+    CitizenSummary.__table__.create(db.get_bind(), checkfirst=True)
+    rebuilt, last_id = 0, None
+    while True:
+        stmt = select(Citizen.Citizen_ID).order_by(Citizen.Citizen_ID).limit(batch_size)
+        if last_id is not None:
+            stmt = stmt.where(Citizen.Citizen_ID > last_id)
+        ids = list(db.execute(stmt).scalars())
+        if not ids:
+            break
+        refresh(db, ids)
+        db.commit()
+        rebuilt += len(ids)
+        last_id = ids[-1]
+    # Rows of citizens deleted behind the application's back
+    orphans = select(CitizenSummary.Citizen_ID).where(
+        ~select(Citizen.Citizen_ID).where(Citizen.Citizen_ID == CitizenSummary.Citizen_ID).exists()
+    )
+    stale = list(db.execute(orphans).scalars())
+    for batch in _batches(stale):
+        db.execute(delete(CitizenSummary).where(CitizenSummary.Citizen_ID.in_(batch)))
+    db.commit()
+    return rebuilt
+
+
+# -- Session hooks ----------------------------------------------------------------
+
+def _pending(session: Session) -> dict:
+    return session.info.setdefault(
+        "citizen_summary", {"deltas": {}, "redate": set(), "gone": set(), "created": set()}
+    )
+
+
+def _record(pending: dict, citizen_id: Optional[int], values: dict, sign: int) -> None:
+    """Add (``sign`` 1) or take away (-1) one row's ``values`` from its citizen's delta"""
+    if citizen_id is None:
+        return
+    delta = pending["deltas"].setdefault(citizen_id, dict(_EMPTY))
+    for key, value in values.items():
+        if key in _DATES:
+            if sign < 0:
+                # Only a re-read can tell whether this row held the maximum
+                if value is not None:
+                    pending["redate"].add(citizen_id)
+            elif value is not None and (delta[key] is None or value > delta[key]):
+                delta[key] = value
+        else:
+            delta[key] += sign * value
+
+
+def _committed(obj, attrs) -> dict:
+    """``attrs`` of ``obj`` as they were before this flush"""
+    state = inspect(obj).attrs
+    values = {}
+    for attr in attrs:
+        changes = getattr(state, attr).history
+        values[attr] = changes.deleted[0] if changes.deleted else getattr(obj, attr)
+    return values
+
+
+def _current(obj, attrs) -> dict:
+    return {attr: getattr(obj, attr) for attr in attrs}
+
+
+def _changed(obj, attrs) -> bool:
+    state = inspect(obj).attrs
+    return any(getattr(state, attr).history.has_changes() for attr in attrs)
+
+
+def _paid_before(session: Session, payment_ids: Set[int], changed: Dict[int, Decimal]) -> Dict[int, Decimal]:
+    """Amount each payment counted for before this flush (0 unless Completed)"""
+    paid = {i: changed[i] for i in payment_ids if i in changed}
+    rest = sorted(i for i in payment_ids if i not in paid)
+    for batch in _batches(rest):
+        for payment_id, amount, status in session.execute(
+            select(Payment.Payment_ID, Payment.Amount, Payment.Status).where(Payment.Payment_ID.in_(batch))
+        ):
+            paid[payment_id] = _paid(amount, status)
+    return paid
+
+
+_REQUEST_ATTRS = ("Citizen_ID", "Status", "Request_Date", "Payment_ID")
+_GRIEVANCE_ATTRS = ("Citizen_ID", "Status", "Date")
+_PAYMENT_ATTRS = ("Amount", "Status")
+
+
+def install_session_hooks(session_factory) -> None:
+    """Keep ``citizen_summary`` in step with every commit of ``session_factory`` sessions"""
+
+    @event.listens_for(session_factory, "after_flush")
+    def _collect_flushed(session, flush_context):
+        pending = _pending(session)
+        new, dirty, deleted = list(session.new), list(session.dirty), list(session.deleted)
+
+        # A payment's amount counts for every request that points at it. The
+        # requests of this flush are counted against the payments as they
+        # were before it; payment changes then go to the requests stored now.
+        payments_before = {}
+        for obj in new + dirty + deleted:
+            if isinstance(obj, Payment):
+                old = _committed(obj, _PAYMENT_ATTRS)
+                payments_before[obj.Payment_ID] = (
+                    Decimal("0.00") if obj in session.new else _paid(old["Amount"], old["Status"])
+                )
+
+        requests = []  # (values, sign)
+        for obj in new + dirty + deleted:
+            if isinstance(obj, ServiceRequest):
+                if obj in session.new:
+                    requests.append((_current(obj, _REQUEST_ATTRS), 1))
+                elif obj in session.deleted:
+                    requests.append((_committed(obj, _REQUEST_ATTRS), -1))
+                elif _changed(obj, _REQUEST_ATTRS):
+                    requests += [(_committed(obj, _REQUEST_ATTRS), -1), (_current(obj, _REQUEST_ATTRS), 1)]
+            elif isinstance(obj, Grievance):
+                if obj in session.new:
+                    _record(pending, obj.Citizen_ID, _grievance_values(_current(obj, _GRIEVANCE_ATTRS)), 1)
+                elif obj in session.deleted:
+                    old = _committed(obj, _GRIEVANCE_ATTRS)
+                    _record(pending, old["Citizen_ID"], _grievance_values(old), -1)
+                elif _changed(obj, _GRIEVANCE_ATTRS):
+                    old = _committed(obj, _GRIEVANCE_ATTRS)
+                    _record(pending, old["Citizen_ID"], _grievance_values(old), -1)
+                    _record(pending, obj.Citizen_ID, _grievance_values(_current(obj, _GRIEVANCE_ATTRS)), 1)
+            elif isinstance(obj, Citizen):
+                if obj in session.deleted:
+                    pending["gone"].add(obj.Citizen_ID)
+                elif obj in session.new:
+                    pending["created"].add(obj.Citizen_ID)
+                    _record(pending, obj.Citizen_ID, {}, 1)
+
+        paid = _paid_before(session, {v["Payment_ID"] for v, _ in requests if v["Payment_ID"]}, payments_before)
+        for values, sign in requests:
+            _record(pending, values["Citizen_ID"],
+                    _request_values(values, paid.get(values["Payment_ID"], Decimal("0.00"))), sign)
+
+        moved = {}
+        for obj in new + dirty + deleted:
+            if isinstance(obj, Payment):
+                after = Decimal("0.00") if obj in session.deleted else _paid(obj.Amount, obj.Status)
+                if after != payments_before[obj.Payment_ID]:
+                    moved[obj.Payment_ID] = after - payments_before[obj.Payment_ID]
+        for batch in _batches(sorted(moved)):
+            for payment_id, citizen_id, count in session.execute(
+                select(ServiceRequest.Payment_ID, ServiceRequest.Citizen_ID, func.count())
+                .where(ServiceRequest.Payment_ID.in_(batch))
+                .group_by(ServiceRequest.Payment_ID, ServiceRequest.Citizen_ID)
+            ):
+                _record(pending, citizen_id, {"Total_Amount_Paid": moved[payment_id] * count}, 1)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _collect_executed(orm_execute_state):
+        # Core insert() with row dicts, as used by the bulk ingestion path
+        if not orm_execute_state.is_insert:
+            return
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is None or table.name not in (Citizen.__tablename__, ServiceRequest.__tablename__,
+                                                Grievance.__tablename__):
+            return
+        params = orm_execute_state.parameters
+        rows = params if isinstance(params, list) else [params or {}]
+        session = orm_execute_state.session
+        pending = _pending(session)
+        if table.name == Citizen.__tablename__:
+            for row in rows:
+                if row.get("Citizen_ID") is not None:
+                    pending["created"].add(row["Citizen_ID"])
+                    _record(pending, row["Citizen_ID"], {}, 1)
+        elif table.name == Grievance.__tablename__:
+            for row in rows:
+                _record(pending, row.get("Citizen_ID"), _grievance_values(row), 1)
+        else:
+            paid = _paid_before(session, {row["Payment_ID"] for row in rows if row.get("Payment_ID")}, {})
+            for row in rows:
+                _record(pending, row.get("Citizen_ID"),
+                        _request_values(row, paid.get(row.get("Payment_ID"), Decimal("0.00"))), 1)
+
+    @event.listens_for(session_factory, "before_commit")
+    def _write(session):
+        # Flush first so after_flush collects everything
+        session.flush()
+        pending = session.info.pop("citizen_summary", None)
+        if pending:
+            _write_pending(session, pending)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _discard(session):
+        session.info.pop("citizen_summary", None)
+
+
+install_session_hooks(SessionLocal)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the citizen_summary projection")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild_cmd = sub.add_parser("rebuild", help="recompute every citizen's summary row")
+    rebuild_cmd.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        print(f"rebuilt {rebuild(db, args.batch_size)} citizen summaries")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""Incrementally maintained dashboard statistics.
+
+``GET /api/dashboard/stats`` reads six pre-aggregated counters from the
+``dashboard_counter`` table instead of counting the fact tables. The write
+routers call ``record_change`` inside their own transaction, so a counter
+moves exactly when the row it describes commits; the committed deltas are
+then pushed to live dashboards (``app.live_updates``).
+
+Every write bumps the same few counters, and the bumped rows stay locked
+until the writer commits. So each counter is spread over
+``DASHBOARD_COUNTER_SLOTS`` rows: a transaction adds its deltas to one
+randomly picked slot, and readers sum the slots. Concurrent writers only
+wait for each other when they pick the same slot. Writes that bypass the
+routers (DB triggers, the custom query console, stored procedures) are
+corrected by ``reconcile``, which runs periodically in the background and can
+also be triggered through the API.
+"""
+import logging
+import os
+import random
+import threading
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import case, event, func, select, update
+from sqlalchemy.orm import Session
+
+from app import history
+from app.database import SessionLocal
+from app.live_updates import broker
+from app.models.citizen import Citizen
+from app.models.dashboard_counter import DashboardCounter
+from app.models.grievance import Grievance
+from app.models.payment import Payment
+from app.models.service_request import ServiceRequest
+
+logger = logging.getLogger(__name__)
+
+PENDING_REQUEST_STATUSES = ("Pending", "Processing")
+OPEN_GRIEVANCE_STATUSES = ("Open", "In Progress")
+REVENUE_PAYMENT_STATUS = "Completed"
+
+COUNTERS = (
+    "total_citizens",
+    "total_requests",
+    "total_grievances",
+    "total_revenue",
+    "pending_requests",
+    "open_grievances",
+)
+
+RECONCILE_INTERVAL_SECONDS = int(os.getenv("DASHBOARD_RECONCILE_SECONDS", "300"))
+DASHBOARD_COUNTER_SLOTS = max(1, int(os.getenv("DASHBOARD_COUNTER_SLOTS", "16")))
+
+
+def _citizen_counts(row: dict) -> Dict[str, Decimal]:
+    return {"total_citizens": Decimal(1)}
+
+
+def _request_counts(row: dict) -> Dict[str, Decimal]:
+    return {
+        "total_requests": Decimal(1),
+        "pending_requests": Decimal(int(row.get("Status") in PENDING_REQUEST_STATUSES)),
+    }
+
+
+def _grievance_counts(row: dict) -> Dict[str, Decimal]:
+    return {
+        "total_grievances": Decimal(1),
+        "open_grievances": Decimal(int(row.get("Status") in OPEN_GRIEVANCE_STATUSES)),
+    }
+
+
+def _payment_counts(row: dict) -> Dict[str, Decimal]:
+    if row.get("Status") != REVENUE_PAYMENT_STATUS or row.get("Amount") is None:
+        return {}
+    return {"total_revenue": Decimal(str(row["Amount"]))}
+
+
+_COUNTS_BY_TABLE = {
+    Citizen.__tablename__: _citizen_counts,
+    ServiceRequest.__tablename__: _request_counts,
+    Grievance.__tablename__: _grievance_counts,
+    Payment.__tablename__: _payment_counts,
+}
+
+
+def _bump(db: Session, deltas: Dict[str, Decimal]) -> None:
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    # One UPDATE for all touched counters, inside the caller's transaction.
+    # The transaction keeps its slot, so it never holds more than one row per counter.
+    slot = db.info.get("dashboard_slot")
+    if slot is None:
+        slot = db.info["dashboard_slot"] = random.randrange(DASHBOARD_COUNTER_SLOTS)
+    db.execute(
+        update(DashboardCounter)
+        .where(DashboardCounter.Name.in_(list(deltas)), DashboardCounter.Slot == slot)
+        .values(Value=DashboardCounter.Value + case(deltas, value=DashboardCounter.Name, else_=0))
+    )
+    # Pushed to live dashboards once the transaction commits
+    pending = db.info.setdefault("dashboard_deltas", {})
+    for name, delta in deltas.items():
+        pending[name] = pending.get(name, Decimal(0)) + delta
+
+
+def record_change(db: Session, model, before: Optional[dict] = None, after: Optional[dict] = None) -> None:
+    """Apply the counter delta for one row of ``model`` going from ``before`` to ``after``.
+
+    Pass only ``after`` for an insert, only ``before`` for a delete and both
+    for an update. Must be called before the caller commits.
+    """
+    counts = _COUNTS_BY_TABLE[model.__tablename__]
+    deltas: Dict[str, Decimal] = {}
+    if after is not None:
+        for name, value in counts(after).items():
+            deltas[name] = deltas.get(name, Decimal(0)) + value
+    if before is not None:
+        for name, value in counts(before).items():
+            deltas[name] = deltas.get(name, Decimal(0)) - value
+    _bump(db, deltas)
+
+
+def record_inserts(db: Session, model, rows: Iterable[dict]) -> None:
+    """Apply the counter delta for a batch of inserted rows in one statement"""
+    counts = _COUNTS_BY_TABLE.get(model.__tablename__)
+    if counts is None:
+        return
+    deltas: Dict[str, Decimal] = {}
+    for row in rows:
+        for name, value in counts(row).items():
+            deltas[name] = deltas.get(name, Decimal(0)) + value
+    _bump(db, deltas)
+
+
+def snapshot(model_row) -> dict:
+    """Capture the counter-relevant columns of an ORM row before it changes"""
+    return {"Status": getattr(model_row, "Status", None), "Amount": getattr(model_row, "Amount", None)}
+
+
+def compute_from_tables(db: Session) -> Dict[str, Decimal]:
+    """Recompute every counter from the fact tables (the pre-materialization queries).
+
+    Totals include the archived requests and payments (``app.history``);
+    only closed requests are archived, so the pending count needs the live table only.
+    """
+    history.ensure_tables(db)
+    return {
+        "total_citizens": db.scalar(select(func.count(Citizen.Citizen_ID))),
+        "total_requests": sum(
+            db.scalar(select(func.count(request.Request_ID))) for request, _ in history.SIDES
+        ),
+        "total_grievances": db.scalar(select(func.count(Grievance.Grievance_ID))),
+        "total_revenue": sum(
+            db.scalar(select(func.coalesce(func.sum(payment.Amount), 0)).where(payment.Status == REVENUE_PAYMENT_STATUS))
+            for _, payment in history.SIDES
+        ),
+        "pending_requests": db.scalar(
+            select(func.count(ServiceRequest.Request_ID)).where(ServiceRequest.Status.in_(PENDING_REQUEST_STATUSES))
+        ),
+        "open_grievances": db.scalar(
+            select(func.count(Grievance.Grievance_ID)).where(Grievance.Status.in_(OPEN_GRIEVANCE_STATUSES))
+        ),
+    }
+
+
+def reconcile(db: Session) -> Dict[str, Decimal]:
+    """Overwrite the counters with freshly computed values and commit.
+
+    The counter rows are locked first, so writers that bump a counter while
+    the recount runs wait for it and then apply their delta on top of the
+    corrected value instead of being lost. The value goes to slot 0 and the
+    other slots restart from zero; missing slot rows are created.
+    """
+    DashboardCounter.__table__.create(db.get_bind(), checkfirst=True)
+    slots: Dict[str, Dict[int, DashboardCounter]] = {}
+    for c in db.execute(select(DashboardCounter).with_for_update()).scalars():
+        slots.setdefault(c.Name, {})[c.Slot] = c
+    values = compute_from_tables(db)
+    drift = {}
+    created = {}
+    for name, value in values.items():
+        value = Decimal(value or 0)
+        current = slots.get(name, {})
+        if not current:
+            created[name] = value
+        else:
+            total = sum((c.Value for c in current.values()), Decimal(0))
+            if total != value:
+                drift[name] = value - total
+        for slot in range(DASHBOARD_COUNTER_SLOTS):
+            target = value if slot == 0 else Decimal(0)
+            counter = current.get(slot)
+            if counter is None:
+                db.add(DashboardCounter(Name=name, Slot=slot, Value=target))
+            elif counter.Value != target:
+                counter.Value = target
+        # Slots beyond a lowered DASHBOARD_COUNTER_SLOTS are folded into slot 0
+        for slot, counter in current.items():
+            if slot >= DASHBOARD_COUNTER_SLOTS:
+                db.delete(counter)
+    db.commit()
+    if drift:
+        logger.info("Dashboard counters corrected by reconciliation: %s", drift)
+    if drift or created:
+        broker.publish(counters={**created, **drift})
+    return values
+
+
+def read_counters(db: Session) -> Dict[str, Decimal]:
+    """Return all counters, reconciling first if they have never been built.
+
+    Also reconciles when a counter lacks some of its slot rows (after
+    migration 0009, or a raised ``DASHBOARD_COUNTER_SLOTS``): bumps to a
+    missing slot change nothing, and the recount creates the rows.
+    """
+    values, slots = {}, {}
+    for name, value, count in db.execute(
+        select(DashboardCounter.Name, func.sum(DashboardCounter.Value), func.count())
+        .group_by(DashboardCounter.Name)
+    ):
+        values[name], slots[name] = value, count
+    if any(slots.get(name, 0) < DASHBOARD_COUNTER_SLOTS for name in COUNTERS):
+        values = reconcile(db)
+    return values
+
+
+def install_session_hooks(session_factory) -> None:
+    """Publish a session's counter deltas to the live dashboards once it commits"""
+
+    @event.listens_for(session_factory, "after_commit")
+    def _publish(session):
+        # The next transaction of a long-lived session picks a new slot
+        session.info.pop("dashboard_slot", None)
+        deltas = session.info.pop("dashboard_deltas", None)
+        if deltas:
+            broker.publish(counters=deltas)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _discard(session):
+        session.info.pop("dashboard_slot", None)
+        session.info.pop("dashboard_deltas", None)
+
+
+install_session_hooks(SessionLocal)
+
+
+class Reconciler:
+    """Background thread that periodically reconciles the counters"""
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="dashboard-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                reconcile(db)
+            except Exception:
+                db.rollback()
+                logger.exception("Dashboard counter reconciliation failed")
+            finally:
+                db.close()
+
+
+reconciler = Reconciler(RECONCILE_INTERVAL_SECONDS)
@@ -0,0 +1,178 @@
+"""Read/write splitting between the primary and its read replicas.
+
+Replicas are listed in ``REPLICA_DATABASE_URLS``; without any, everything
+runs on the primary as before. Sessions from ``SessionLocal``,
+``AsyncSessionLocal`` and ``CustomQuerySessionLocal`` are
+``RoutingSession``s (``app.database``). They choose an engine per statement:
+
+* Writes, ``FOR UPDATE``/``FOR SHARE`` reads and DDL go to the primary, and a
+  session that wrote stays there.
+* Plain reads go to a replica only during GET/HEAD requests (set by
+  ``ReadRoutingMiddleware``). The custom query console also sends read-only
+  statements there (``prefer_replica``, ``read_engine``).
+
+Lag is measured with a heartbeat. ``ReplicaMonitor`` writes the current time
+to ``replica_heartbeat`` on the primary, then reads it back from every
+replica. The value a replica returns is the moment up to which it is known
+to hold every primary commit. A replica is skipped when that moment is more
+than ``REPLICA_MAX_LAG_SECONDS`` old (or was never seen, e.g. when
+replication is broken), so reads fall back to the primary.
+
+A read also waits for the last commit to the tables it reads (any table,
+for textual SQL), as recorded by the result cache. Until a replica has it
+the read goes to the primary, so responses stamped with the current table
+versions (ETags, cached analytics) never hold older data.
+
+Read-your-writes: each successful write request returns the time it
+finished, in the ``X-Read-After`` header and a ``read_after`` cookie. A
+client that sends either one back reads from a replica only once that
+replica's heartbeat is newer, and from the primary until then.
+
+To try it locally, point ``DATABASE_URL`` and ``REPLICA_DATABASE_URLS`` at two
+MySQL servers with replication set up between them. Two SQLite files also
+work: reads move to the replica once its copy of ``replica_heartbeat`` is
+fresh.
+"""
+import logging
+import os
+import threading
+import time
+from http.cookies import SimpleCookie
+from typing import Optional
+
+from sqlalchemy import insert, select, update
+
+from app.database import ReplicaSet, engine, read_after, replica_lag, replica_reads_allowed, replicas
+from app.models.replica_heartbeat import ReplicaHeartbeat
+
+logger = logging.getLogger(__name__)
+
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "1"))
+# How long a client's read_after cookie lives; past this, max lag alone decides
+READ_AFTER_TTL_SECONDS = int(os.getenv("READ_AFTER_TTL_SECONDS", "60"))
+
+READ_AFTER_HEADER = "X-Read-After"
+READ_AFTER_COOKIE = "read_after"
+_HEARTBEAT_ID = 1
+
+
+def prefer_replica(db) -> None:
+    """Let ``db`` read from a replica even outside a GET request (until it writes)"""
+    db.info["route"] = "replica"
+
+
+def read_engine(primary, replica_set: ReplicaSet):
+    """Engine for a read-only connection used outside a session (textual SQL)"""
+    after = max(read_after.get(), replica_lag.written_at(None))
+    return replica_set.pick(after) or primary
+
+
+def _client_read_after(scope) -> float:
+    headers = dict(scope.get("headers") or [])
+    raw = headers.get(READ_AFTER_HEADER.lower().encode())
+    if raw is None and b"cookie" in headers:
+        morsel = SimpleCookie(headers[b"cookie"].decode("latin-1")).get(READ_AFTER_COOKIE)
+        raw = morsel.value.encode() if morsel else None
+    try:
+        return float(raw) if raw else 0.0
+    except ValueError:
+        return 0.0
+
+
+class ReadRoutingMiddleware:
+    """Allow replica reads for GET/HEAD requests and stamp write responses with X-Read-After"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas.engines:
+            return await self.app(scope, receive, send)
+
+        reads = scope["method"] in ("GET", "HEAD", "OPTIONS")
+        allowed_token = replica_reads_allowed.set(reads)
+        after_token = read_after.set(_client_read_after(scope))
+
+        async def send_with_read_after(message):
+            if message["type"] == "http.response.start" and not reads and message["status"] < 400:
+                # Sent after the endpoint committed, so this is never earlier than the write
+                stamp = f"{time.time():.6f}"
+                cookie = f"{READ_AFTER_COOKIE}={stamp}; Max-Age={READ_AFTER_TTL_SECONDS}; Path=/; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [
+                    (READ_AFTER_HEADER.lower().encode(), stamp.encode()),
+                    (b"set-cookie", cookie.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_read_after)
+        finally:
+            read_after.reset(after_token)
+            replica_reads_allowed.reset(allowed_token)
+
+
+def check_replicas() -> None:
+    """Write a heartbeat on the primary and read every replica's copy of it"""
+    now = time.time()
+    with engine.begin() as conn:
+        stmt = update(ReplicaHeartbeat).where(ReplicaHeartbeat.Id == _HEARTBEAT_ID).values(Beat_At=now)
+        if conn.execute(stmt).rowcount == 0:
+            conn.execute(insert(ReplicaHeartbeat).values(Id=_HEARTBEAT_ID, Beat_At=now))
+    for i, replica in enumerate(replicas.engines):
+        try:
+            with replica.connect() as conn:
+                seen = conn.execute(
+                    select(ReplicaHeartbeat.Beat_At).where(ReplicaHeartbeat.Id == _HEARTBEAT_ID)
+                ).scalar()
+            replica_lag.caught_up_to[i] = seen or 0.0
+        except Exception:
+            replica_lag.caught_up_to[i] = 0.0
+            logger.warning("Replica %s is unreachable; reading from the primary", i + 1, exc_info=True)
+
+
+def replica_stats() -> list:
+    now = time.time()
+    return [
+        {
+            "replica": i + 1,
+            "url": replica.url.render_as_string(hide_password=True),
+            "lag_seconds": round(now - seen, 3) if seen else None,
+            "usable": bool(seen) and now - seen <= replica_lag.max_lag,
+        }
+        for i, (replica, seen) in enumerate(zip(replicas.engines, replica_lag.caught_up_to))
+    ]
+
+
+class ReplicaMonitor:
+    """Background thread that keeps the replica lag current"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or not replicas.engines or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            try:
+                check_replicas()
+            except Exception:
+                # Without a heartbeat every replica ages past max lag: reads use the primary
+                logger.exception("Replica heartbeat failed")
+            if self._stop.wait(self.interval):
+                break
+
+
+replica_monitor = ReplicaMonitor(REPLICA_LAG_CHECK_SECONDS)
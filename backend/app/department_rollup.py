@@ -0,0 +1,401 @@
+"""Department analytics rollup.
+
+``department_daily_rollup`` holds partial aggregates of Service_Request
+keyed by (service, day, status): the request count, how many of those
+requests have a completed payment, and that revenue. Completed counts are
+the request counts of the ``Completed`` status buckets. Department
+performance and department stats for any date range merge these buckets
+with one GROUP BY over a few thousand rows joined to Service, instead of
+joining Department -> Service -> Service_Request -> Payment over the whole
+history. The department is deliberately not part of the key: it is read
+from Service each time, so a service transferred to another department
+(through the API or ``sp_transfer_service_to_department``) takes its
+buckets along without any bucket being rewritten.
+
+Buckets are maintained with deltas. Session hooks capture the before and
+after image of every request and payment a transaction touches, and
+``before_commit`` adds the difference to the affected buckets with an atomic
+increment upsert. A late-arriving request dated last year, or a payment
+completing weeks after its request, simply adjusts that older bucket, so
+closed days never need recomputing. Writes that bypass the session are
+repaired per date range with ``rebuild``:
+
+    python -m app.department_rollup rebuild --since 2025-01-01
+"""
+import argparse
+import datetime
+import sys
+import threading
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, inspect, insert, literal, select, union_all, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+
+from app import history
+from app.database import SessionLocal
+from app.models.department import Department
+from app.models.department_rollup import DepartmentDailyRollup as Rollup
+from app.models.payment import Payment
+from app.models.service import Service
+from app.models.service_request import ServiceRequest
+
+COMPLETED_STATUS = "Completed"
+PENDING_STATUS = "Pending"
+PAID_STATUS = "Completed"
+# Bucket day for requests without a Request_Date (the key cannot be NULL)
+UNDATED = history.UNDATED
+
+_REQUEST_COLUMNS = ("Request_ID", "Service_ID", "Request_Date", "Status", "Payment_ID")
+_BATCH = 1000
+
+BucketKey = Tuple[int, datetime.date, str]
+
+
+def _batches(ids: List) -> Iterable[List]:
+    for start in range(0, len(ids), _BATCH):
+        yield ids[start:start + _BATCH]
+
+
+# -- Writing buckets --------------------------------------------------------------
+
+def _increment_statement(dialect: str):
+    measures = ("Request_Count", "Paid_Count", "Revenue")
+    if dialect == "mysql":
+        stmt = mysql.insert(Rollup)
+        return stmt.on_duplicate_key_update({m: Rollup.__table__.c[m] + stmt.inserted[m] for m in measures})
+    if dialect == "sqlite":
+        stmt = sqlite.insert(Rollup)
+        return stmt.on_conflict_do_update(
+            index_elements=["Service_ID", "Day", "Status"],
+            set_={m: Rollup.__table__.c[m] + stmt.excluded[m] for m in measures},
+        )
+    return None
+
+
+def apply_deltas(db: Session, deltas: Dict[BucketKey, list]) -> None:
+    """Add ``[requests, paid, revenue]`` deltas to their buckets (creating them as needed)"""
+    rows = [
+        {"Service_ID": k[0], "Day": k[1], "Status": k[2],
+         "Request_Count": d[0], "Paid_Count": d[1], "Revenue": d[2]}
+        for k, d in deltas.items() if any(d)
+    ]
+    if not rows:
+        return
+    stmt = _increment_statement(db.get_bind().dialect.name)
+    if stmt is not None:
+        db.execute(stmt, rows)
+        return
+    for row in rows:
+        key = (Rollup.Service_ID == row["Service_ID"], Rollup.Day == row["Day"], Rollup.Status == row["Status"])
+        updated = db.execute(update(Rollup).where(*key).values(
+            Request_Count=Rollup.Request_Count + row["Request_Count"],
+            Paid_Count=Rollup.Paid_Count + row["Paid_Count"],
+            Revenue=Rollup.Revenue + row["Revenue"],
+        ))
+        if updated.rowcount == 0:
+            db.execute(insert(Rollup), [row])
+
+
+def rebuild(db: Session, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None) -> int:
+    """Recompute the buckets of ``[start, end]`` (everything by default) from the fact tables and commit"""
+    def side(request, payment):
+        stmt = (
+            select(
+                request.Service_ID,
+                func.coalesce(request.Request_Date, literal(UNDATED)).label("Day"),
+                func.coalesce(request.Status, "").label("Status"),
+                request.Request_ID,
+                payment.Payment_ID,
+                payment.Amount,
+            )
+            .outerjoin(payment, (payment.Payment_ID == request.Payment_ID) & (payment.Status == PAID_STATUS))
+        )
+        if start is not None:
+            stmt = stmt.where(request.Request_Date >= start)
+        if end is not None:
+            stmt = stmt.where(request.Request_Date <= end)
+        return stmt
+
+    # Archived requests keep their buckets (app/history.py)
+    requests = union_all(*(side(request, payment) for request, payment in history.SIDES)).subquery()
+    source = (
+        select(
+            requests.c.Service_ID,
+            requests.c.Day,
+            requests.c.Status,
+            func.count(requests.c.Request_ID),
+            func.count(requests.c.Payment_ID),
+            func.coalesce(func.sum(requests.c.Amount), 0),
+        )
+        .where(requests.c.Service_ID.is_not(None))
+        .group_by(requests.c.Service_ID, requests.c.Day, requests.c.Status)
+    )
+    clear = delete(Rollup)
+    if start is not None:
+        clear = clear.where(Rollup.Day >= start)
+    if end is not None:
+        clear = clear.where(Rollup.Day <= end)
+    db.execute(clear)
+    result = db.execute(insert(Rollup).from_select(
+        ["Service_ID", "Day", "Status", "Request_Count", "Paid_Count", "Revenue"], source
+    ))
+    db.commit()
+    return result.rowcount
+
+
+_built = False
+_build_lock = threading.Lock()
+
+
+def ensure_built(db: Session) -> None:
+    """Build the rollup on first use if it is empty but requests exist"""
+    global _built
+    if _built:
+        return
+    # One thread builds; the others wait for it rather than rebuilding too
+    with _build_lock:
+        if _built:
+            return
+        if db.scalar(select(Rollup.Day).limit(1)) is None and db.scalar(select(ServiceRequest.Request_ID).limit(1)):
+            rebuild(db)
+        _built = True
+
+
+# -- Reading buckets --------------------------------------------------------------
+
+def _bucket_totals(db: Session, start, end, department_id=None):
+    """Merged (Department_ID, Status) -> request/paid/revenue totals for the range"""
+    ensure_built(db)
+    stmt = (
+        select(
+            Service.Department_ID,
+            Rollup.Status,
+            func.sum(Rollup.Request_Count),
+            func.sum(Rollup.Paid_Count),
+            func.sum(Rollup.Revenue),
+        )
+        .join(Service, Service.Service_ID == Rollup.Service_ID)
+        .where(Service.Department_ID.is_not(None))
+        .group_by(Service.Department_ID, Rollup.Status)
+    )
+    if start is not None:
+        stmt = stmt.where(Rollup.Day >= start)
+    if end is not None:
+        stmt = stmt.where(Rollup.Day <= end)
+    if department_id is not None:
+        stmt = stmt.where(Service.Department_ID == department_id)
+    totals: Dict[int, dict] = {}
+    for dept, status, requests, paid, revenue in db.execute(stmt):
+        t = totals.setdefault(dept, {"requests": 0, "completed": 0, "pending": 0, "paid": 0, "revenue": Decimal(0)})
+        t["requests"] += int(requests or 0)
+        t["paid"] += int(paid or 0)
+        t["revenue"] += Decimal(revenue or 0)
+        if status == COMPLETED_STATUS:
+            t["completed"] += int(requests or 0)
+        elif status == PENDING_STATUS:
+            t["pending"] += int(requests or 0)
+    return totals
+
+
+def _rate(part: int, whole: int) -> Optional[float]:
+    return round(part * 100.0 / whole, 2) if whole else None
+
+
+def department_performance(db: Session, start: Optional[datetime.date] = None,
+                           end: Optional[datetime.date] = None) -> List[dict]:
+    """Rows of GET /api/dashboard/department-performance for the date range"""
+    totals = _bucket_totals(db, start, end)
+    rows = []
+    for dept_id, name in db.execute(select(Department.Department_ID, Department.Department_Name)):
+        t = totals.get(dept_id, {})
+        requests, completed = t.get("requests", 0), t.get("completed", 0)
+        rows.append({
+            "Department_Name": name,
+            "Total_Requests": requests,
+            "Completed_Requests": completed,
+            "Pending_Requests": t.get("pending", 0),
+            "Total_Revenue": t.get("revenue", Decimal("0.00")),
+            "Completion_Rate": _rate(completed, requests),
+        })
+    rows.sort(key=lambda r: r["Total_Requests"], reverse=True)
+    return rows
+
+
+def department_stats(db: Session, department_id: int, start: Optional[datetime.date] = None,
+                     end: Optional[datetime.date] = None) -> Optional[dict]:
+    """Result row of sp_get_department_stats, merged from the buckets"""
+    name = db.scalar(select(Department.Department_Name).where(Department.Department_ID == department_id))
+    if name is None:
+        return None
+    services = db.scalar(select(func.count(Service.Service_ID)).where(Service.Department_ID == department_id))
+    t = _bucket_totals(db, start, end, department_id).get(department_id, {})
+    revenue, paid = t.get("revenue", Decimal(0)), t.get("paid", 0)
+    return {
+        "Department_ID": department_id,
+        "Department_Name": name,
+        "Total_Services": services,
+        "Total_Requests": t.get("requests", 0),
+        "Completed_Requests": t.get("completed", 0),
+        "Total_Revenue": round(revenue, 2),
+        "Avg_Payment": round(revenue / paid, 2) if paid else Decimal("0.00"),
+    }
+
+
+# -- Session hooks ----------------------------------------------------------------
+
+def _pending(session: Session) -> dict:
+    return session.info.setdefault("department_rollup", {"requests": [], "payments": {}, "touched": set()})
+
+
+def _image(obj, columns, old: bool) -> dict:
+    state = inspect(obj)
+    image = {}
+    for column in columns:
+        history = state.attrs[column].history
+        image[column] = history.deleted[0] if old and history.deleted else getattr(obj, column)
+    return image
+
+
+def _collect_requests(session, pending) -> None:
+    for obj in session.new:
+        if isinstance(obj, ServiceRequest):
+            pending["requests"].append((1, _image(obj, _REQUEST_COLUMNS, old=False)))
+            pending["touched"].add(obj.Request_ID)
+    for obj in session.dirty:
+        if isinstance(obj, ServiceRequest) and session.is_modified(obj):
+            pending["requests"].append((-1, _image(obj, _REQUEST_COLUMNS, old=True)))
+            pending["requests"].append((1, _image(obj, _REQUEST_COLUMNS, old=False)))
+            pending["touched"].add(obj.Request_ID)
+    for obj in session.deleted:
+        if isinstance(obj, ServiceRequest):
+            pending["requests"].append((-1, _image(obj, _REQUEST_COLUMNS, old=True)))
+            pending["touched"].add(obj.Request_ID)
+
+
+def _collect_payments(session, pending) -> None:
+    columns = ("Payment_ID", "Status", "Amount")
+    changed = [(obj, False) for obj in session.dirty if isinstance(obj, Payment) and session.is_modified(obj)]
+    changed += [(obj, True) for obj in session.deleted if isinstance(obj, Payment)]
+    for obj, deleted in changed:
+        old = _image(obj, columns, old=True)
+        first_old = pending["payments"].get(obj.Payment_ID, (old, None))[0]
+        pending["payments"][obj.Payment_ID] = (first_old, None if deleted else _image(obj, columns, old=False))
+
+
+def _paid_amount(payment: Optional[dict]) -> Optional[Decimal]:
+    if payment and payment["Status"] == PAID_STATUS:
+        return Decimal(payment["Amount"] or 0)
+    return None
+
+
+def _resolve(session: Session, pending: dict) -> Dict[BucketKey, list]:
+    requests, payments = pending["requests"], pending["payments"]
+
+    # Requests still pointing at a payment whose paid state changed this transaction
+    affected: List[Tuple[dict, Optional[Decimal], Optional[Decimal]]] = []
+    for payment_id, (old, new) in payments.items():
+        before, after = _paid_amount(old), _paid_amount(new)
+        if before == after:
+            continue
+        stmt = select(*[getattr(ServiceRequest, c) for c in _REQUEST_COLUMNS]).where(
+            ServiceRequest.Payment_ID == payment_id)
+        for row in session.execute(stmt).mappings():
+            if row["Request_ID"] not in pending["touched"]:
+                affected.append((dict(row), before, after))
+
+    payment_ids = sorted({img["Payment_ID"] for _, img in requests if img.get("Payment_ID") is not None})
+    current: Dict[int, dict] = {}
+    for batch in _batches(payment_ids):
+        for row in session.execute(
+            select(Payment.Payment_ID, Payment.Status, Payment.Amount).where(Payment.Payment_ID.in_(batch))
+        ).mappings():
+            current[row["Payment_ID"]] = dict(row)
+
+    def key(image) -> Optional[BucketKey]:
+        if image.get("Service_ID") is None:
+            return None
+        return image["Service_ID"], image.get("Request_Date") or UNDATED, image.get("Status") or ""
+
+    deltas: Dict[BucketKey, list] = {}
+
+    def add(bucket, requests_delta, amount, sign):
+        if bucket is None:
+            return
+        d = deltas.setdefault(bucket, [0, 0, Decimal(0)])
+        d[0] += requests_delta
+        if amount is not None:
+            d[1] += sign
+            d[2] += sign * amount
+
+    for sign, image in requests:
+        payment_id = image.get("Payment_ID")
+        # A removed image counts the payment as it was before this transaction
+        if sign < 0 and payment_id in payments:
+            amount = _paid_amount(payments[payment_id][0])
+        else:
+            amount = _paid_amount(current.get(payment_id))
+        add(key(image), sign, amount, sign)
+    for image, before, after in affected:
+        add(key(image), 0, before, -1)
+        add(key(image), 0, after, 1)
+    return deltas
+
+
+def install_session_hooks(session_factory) -> None:
+    """Apply rollup deltas for every commit of ``session_factory`` sessions"""
+
+    @event.listens_for(session_factory, "after_flush")
+    def _collect_flushed(session, flush_context):
+        pending = _pending(session)
+        _collect_requests(session, pending)
+        _collect_payments(session, pending)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _collect_executed(orm_execute_state):
+        # Core insert() with row dicts, as used by the bulk ingestion path
+        if not orm_execute_state.is_insert:
+            return
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is None or table.name != ServiceRequest.__tablename__:
+            return
+        params = orm_execute_state.parameters
+        pending = _pending(orm_execute_state.session)
+        for row in params if isinstance(params, list) else [params or {}]:
+            pending["requests"].append((1, {c: row.get(c) for c in _REQUEST_COLUMNS}))
+            pending["touched"].add(row.get("Request_ID"))
+
+    @event.listens_for(session_factory, "before_commit")
+    def _apply(session):
+        session.flush()
+        pending = session.info.pop("department_rollup", None)
+        if pending and (pending["requests"] or pending["payments"]):
+            apply_deltas(session, _resolve(session, pending))
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _discard(session):
+        session.info.pop("department_rollup", None)
+
+
+install_session_hooks(SessionLocal)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the department analytics rollup")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild_cmd = sub.add_parser("rebuild", help="recompute buckets from the fact tables")
+    rebuild_cmd.add_argument("--since", type=datetime.date.fromisoformat, default=None)
+    rebuild_cmd.add_argument("--until", type=datetime.date.fromisoformat, default=None)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        print(f"rebuilt {rebuild(db, args.since, args.until)} buckets")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Set-based equivalents of the db_tools stored functions.
+
+Each ``fn_*`` function answers for one ID and runs its own query on every
+call, so filling a table of citizens costs one HTTP request and one query
+per row. ``compute`` answers for many IDs with one GROUP BY over the same
+rows, filters and rounding as the scalar function, so the values match
+exactly (``scripts/verify_function_batches.py`` checks this against the
+database's functions). Like the functions, they read the live and the
+archived requests and payments (``app/history.py``). IDs without matching
+rows get the value the function returns for them, e.g. 0.00 paid or not
+active.
+"""
+import datetime
+import os
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+
+from app import history
+from app.models.department import Department
+from app.models.grievance import Grievance
+
+# IDs accepted per batch request (bound as one IN list)
+FUNCTION_BATCH_MAX_IDS = int(os.getenv("FUNCTION_BATCH_MAX_IDS", "5000"))
+
+PAID_STATUS = "Completed"
+# fn_open_grievances_by_department's statuses (not the dashboard's)
+OPEN_GRIEVANCE_STATUSES = ("Open", "Under Review")
+ACTIVE_WITHIN_DAYS = 30
+
+_CENT = Decimal("0.01")
+
+
+def _money(value) -> Decimal:
+    """A DECIMAL(12,2) function result: MySQL rounds half away from zero on assignment"""
+    return Decimal(str(value or 0)).quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def _is_active(last_date, today) -> int:
+    if last_date is None:
+        return 0
+    if isinstance(today, str):  # SQLite returns CURRENT_DATE as text
+        today = datetime.date.fromisoformat(today)
+    if isinstance(last_date, datetime.datetime):
+        last_date = last_date.date()
+    return int((today - last_date).days <= ACTIVE_WITHIN_DAYS)
+
+
+def _paid(key: str, ids: List[int]):
+    """(ID, Amount) of the completed payments of live and archived requests whose ``key`` is in ``ids``"""
+    return union_all(*(
+        select(getattr(request, key).label("id"), payment.Amount)
+        .join(payment, request.Payment_ID == payment.Payment_ID)
+        .where(getattr(request, key).in_(ids), payment.Status == PAID_STATUS)
+        for request, payment in history.SIDES
+    )).subquery("paid")
+
+
+def _total_paid(ids: List[int]):
+    paid = _paid("Citizen_ID", ids)
+    return select(paid.c.id, func.sum(paid.c.Amount)).group_by(paid.c.id)
+
+
+def _avg_payment(ids: List[int]):
+    # One average over both sides, not an average of the two sides' averages
+    paid = _paid("Service_ID", ids)
+    return select(paid.c.id, func.avg(paid.c.Amount)).group_by(paid.c.id)
+
+
+def _count_requests(ids: List[int]):
+    requests = history.requests_union(["Citizen_ID"], lambda model: (model.Citizen_ID.in_(ids),))
+    return select(requests.c.Citizen_ID, func.count()).group_by(requests.c.Citizen_ID)
+
+
+def _last_request(ids: List[int]):
+    requests = history.requests_union(["Citizen_ID", "Request_Date"], lambda model: (model.Citizen_ID.in_(ids),))
+    # The database's date, like CURDATE() in the function (MAX keeps it a valid aggregate)
+    return (
+        select(requests.c.Citizen_ID, func.max(requests.c.Request_Date), func.max(func.current_date()))
+        .group_by(requests.c.Citizen_ID)
+    )
+
+
+class BatchFunction(NamedTuple):
+    """How one scalar function is computed for many IDs"""
+
+    function: str    # the stored function it reproduces
+    id_param: str    # the scalar endpoint's ID parameter
+    column: str      # the scalar endpoint's result column
+    tags: tuple      # tables read, for cache validation
+    # IDs -> rows of (id, *aggregates), grouped by id
+    query: Callable[[List[int]], Any]
+    # aggregates of one id -> the function's value
+    value: Callable[..., Any]
+    # the function's value for an ID without rows
+    default: Any
+
+
+FUNCTIONS: Dict[str, BatchFunction] = {
+    "total_paid": BatchFunction(
+        "fn_total_paid_by_citizen", "citizen_id", "total", (*history.REQUEST_TABLES, *history.PAYMENT_TABLES),
+        _total_paid,
+        _money, Decimal("0.00"),
+    ),
+    "count_requests": BatchFunction(
+        "fn_count_requests_by_citizen", "citizen_id", "cnt", history.REQUEST_TABLES,
+        _count_requests,
+        int, 0,
+    ),
+    "avg_payment": BatchFunction(
+        "fn_avg_payment_by_service", "service_id", "avg_amt", (*history.REQUEST_TABLES, *history.PAYMENT_TABLES),
+        _avg_payment,
+        _money, Decimal("0.00"),
+    ),
+    "open_grievances": BatchFunction(
+        "fn_open_grievances_by_department", "department_id", "open_cnt", ("Grievance",),
+        lambda ids: (
+            select(Department.Department_ID, func.count())
+            .join(Grievance, Grievance.Department_ID == Department.Department_ID)
+            .where(Department.Department_ID.in_(ids), Grievance.Status.in_(OPEN_GRIEVANCE_STATUSES))
+            .group_by(Department.Department_ID)
+        ),
+        int, 0,
+    ),
+    "is_citizen_active": BatchFunction(
+        "fn_is_citizen_active", "citizen_id", "active", (*history.REQUEST_TABLES, "Grievance"),
+        _last_request,
+        _is_active, 0,
+    ),
+}
+
+
+def compute(db: Session, name: str, ids: Iterable[int]) -> List[dict]:
+    """``FUNCTIONS[name]`` for every distinct ID, in request order, as the scalar endpoint's rows plus the ID"""
+    fn = FUNCTIONS[name]
+    ids = list(dict.fromkeys(ids))
+    found = {row[0]: fn.value(*row[1:]) for row in db.execute(fn.query(ids))} if ids else {}
+    return [{fn.id_param: i, fn.column: found.get(i, fn.default)} for i in ids]
@@ -0,0 +1,122 @@
+"""Archived service requests and payments, read together with the live tables.
+
+``python -m app.archive run`` moves closed requests older than
+``ARCHIVE_AFTER_MONTHS``, and their payments, out of the partitioned live
+tables into ``Service_Request_History`` and ``Payment_History``. Everything
+that reports over all time reads both sides through this module: citizen
+summaries, dashboard counters, the department rollup rebuild and monthly
+trends. Archiving therefore changes none of their numbers, and
+``/api/history`` serves the individual rows from either side.
+
+A request and its payment are always on the same side, because the job moves
+a payment together with its request. So an aggregate runs its usual join once
+per side (``SIDES``) and the results are added. Only distinct counts need both
+sides in one query (``requests_union``). Each side gets the filters itself,
+so a date range is still pruned to the matching partitions of the live table.
+"""
+import datetime
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Date, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.payment import Payment
+from app.models.payment_history import PaymentHistory
+from app.models.service_request import ServiceRequest
+from app.models.service_request_history import ServiceRequestHistory
+from app.pagination import NEXT_CURSOR_HEADER, clamp_limit, decode_cursor, encode_cursor, keyset_after
+
+# (request model, payment model) of the live and the archived side
+SIDES = ((ServiceRequest, Payment), (ServiceRequestHistory, PaymentHistory))
+ARCHIVED = (ServiceRequestHistory, PaymentHistory)
+HISTORY_TABLES = tuple(model.__tablename__ for model in ARCHIVED)
+
+# The date migration 0008 gives rows that had none (the partitioning column
+# cannot be NULL); app.department_rollup buckets undated requests there too
+UNDATED = datetime.date(1970, 1, 1)
+
+# Cache tags of the unified reads
+REQUEST_TABLES = (ServiceRequest.__tablename__, ServiceRequestHistory.__tablename__)
+PAYMENT_TABLES = (Payment.__tablename__, PaymentHistory.__tablename__)
+
+_created = False
+
+
+def ensure_tables(db: Session) -> None:
+    """Create the history tables on first use where migration 0008 has not run (e.g. SQLite)"""
+    global _created
+    if _created:
+        return
+    bind = db.get_bind()
+    for model in ARCHIVED:
+        model.__table__.create(bind, checkfirst=True)
+    _created = True
+
+
+def requests_union(columns: Sequence[str], where: Callable[[Any], Iterable] = lambda model: ()):
+    """Live and archived requests as one subquery of ``columns``, each side filtered by ``where(model)``"""
+    return union_all(*(
+        select(*(getattr(model, c) for c in columns)).where(*where(model)) for model, _ in SIDES
+    )).subquery("all_requests")
+
+
+# -- Unified reads ----------------------------------------------------------------
+
+def _columns(model) -> List:
+    # The live table's columns; the history tables add Archived_At
+    live = ServiceRequest if model in (ServiceRequest, ServiceRequestHistory) else Payment
+    return [getattr(model, c.name) for c in live.__table__.columns]
+
+
+def _cursor_values(cursor: str, columns: Sequence) -> list:
+    values = decode_cursor(cursor, len(columns))
+    for i, column in enumerate(columns):
+        if isinstance(column.type, Date) and isinstance(values[i], str):
+            try:
+                values[i] = datetime.date.fromisoformat(values[i])
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return values
+
+
+def _sort_key(row: dict, keys: Sequence[str]) -> tuple:
+    # NULLs sort below everything, as in the database
+    return tuple((row[k] is not None, row[k]) for k in keys)
+
+
+async def read_page(db, models: Sequence, keys: Sequence[str], where: Callable[[Any], Iterable],
+                    limit: int, cursor: Optional[str] = None, response: Optional[Response] = None) -> List[dict]:
+    """One newest-first page of the rows of every table in ``models``, ordered by the columns ``keys``.
+
+    ``keys`` must end with the primary key. Every table is read with its own
+    ``where(model)`` filter, cursor condition and ``LIMIT``, which keeps each
+    side an index range scan, and the sides are merged here. Rows carry
+    ``Archived`` to tell the sides apart. The next cursor goes to the
+    ``X-Next-Cursor`` header, as with ``keyset_paginate``.
+    """
+    limit = clamp_limit(limit)
+    rows: List[dict] = []
+    for model in models:
+        order = [getattr(model, k) for k in keys]
+        stmt = select(*_columns(model)).where(*where(model))
+        if cursor:
+            stmt = stmt.where(keyset_after(order, _cursor_values(cursor, order), descending=True))
+        result = await db.execute(stmt.order_by(*(c.desc() for c in order)).limit(limit + 1))
+        rows.extend({**row._mapping, "Archived": model in ARCHIVED} for row in result)
+
+    rows.sort(key=lambda row: _sort_key(row, keys), reverse=True)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if response is not None and has_more:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([rows[-1][k] for k in keys])
+    return rows
+
+
+async def read_one(db, models: Sequence, key: str, value: Any) -> Optional[dict]:
+    """The row whose ``key`` is ``value`` from the first table in ``models`` that has it"""
+    for model in models:
+        row = (await db.execute(select(*_columns(model)).where(getattr(model, key) == value))).first()
+        if row is not None:
+            return {**row._mapping, "Archived": model in ARCHIVED}
+    return None
@@ -0,0 +1,107 @@
+"""Conditional GET for the read endpoints.
+
+A response's ETag is derived from the route, its query string and the
+version counters of the tables it reads. These are the result cache's tag
+counters (``app.cache``): every commit that writes a table bumps that
+table's counter, and custom-query writes bump the ``*`` counter. Working out
+the validator therefore costs a few counter reads and no query. A request
+whose ``If-None-Match`` still matches gets a bare 304 from the dependency,
+before the endpoint body runs or anything is serialized.
+
+Responses are sent with ``Cache-Control: private, no-cache``, so browsers
+keep the body but revalidate it on every use. The frontend's repeated list
+and dashboard fetches then cost a 304 while nothing has changed.
+
+The counters are only exact with ``CACHE_BACKEND=redis``. The local backend
+counts each worker's own writes, so a worker would keep answering 304 after
+another worker committed a change. Under it the ETag also includes the
+current ``CACHE_TTL_SECONDS`` time bucket. A 304 is then at most one TTL out
+of date, which is the same bound the local result cache already has.
+Validators are left out when the TTL is 0 (caching off).
+
+Usage:
+
+    @router.get("/", dependencies=[cached("Citizen")])
+"""
+import hashlib
+import os
+import time
+from typing import Iterable, Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+
+from app.cache import result_cache
+
+HTTP_CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "private, no-cache")
+HTTP_COMPRESSION = os.getenv("HTTP_COMPRESSION", "gzip").lower()
+HTTP_COMPRESSION_MIN_BYTES = int(os.getenv("HTTP_COMPRESSION_MIN_BYTES", "1024"))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against ``etag``"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or bare in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def validator(request: Request, tables: Iterable[str]) -> Optional[str]:
+    """Weak ETag for ``request`` given the current versions of ``tables``; None when validators are off"""
+    backend = result_cache.backend
+    versions = ",".join(f"{t}={backend.get_counter('tag:' + t)}" for t in sorted({*tables, "*"}))
+    raw = f"{backend.epoch}|{request.url.path}?{request.url.query}|{versions}"
+    if not backend.shared:
+        # Other workers' writes are invisible here (see the module docstring)
+        if result_cache.default_ttl <= 0:
+            return None
+        raw += f"|{int(time.time() // result_cache.default_ttl)}"
+    # Weak: the body may be sent gzip- or brotli-encoded
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+def check(request: Request, response: Response, tables: Iterable[str]) -> None:
+    """Raise a 304 if the client's copy is current, else stamp the validators on ``response``.
+
+    Versions are read before the endpoint queries, so a write racing the
+    query can only make the ETag older than the body (costing a 200 on the
+    next request), never newer.
+    """
+    etag = validator(request, tables)
+    if etag is None:
+        response.headers["Cache-Control"] = HTTP_CACHE_CONTROL
+        return
+    headers = {"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+
+def cached(*tables: str):
+    """Route dependency answering conditional GETs for an endpoint that reads ``tables``"""
+    def dependency(request: Request, response: Response) -> None:
+        check(request, response, tables)
+    return Depends(dependency)
+
+
+def add_compression(app) -> None:
+    """Compress response bodies over HTTP_COMPRESSION_MIN_BYTES.
+
+    ``HTTP_COMPRESSION=brotli`` serves ``br`` to clients that accept it and
+    gzip to the rest (requires the ``brotli-asgi`` package); ``off`` leaves
+    compression to a reverse proxy. The gzip middleware skips event streams.
+    """
+    if HTTP_COMPRESSION == "off":
+        return
+    if HTTP_COMPRESSION == "brotli":
+        try:
+            from brotli_asgi import BrotliMiddleware
+        except ImportError:
+            raise RuntimeError("HTTP_COMPRESSION=brotli requires the 'brotli-asgi' package")
+        # brotli-asgi would buffer the dashboard's event stream
+        app.add_middleware(BrotliMiddleware, minimum_size=HTTP_COMPRESSION_MIN_BYTES, gzip_fallback=True,
+                           excluded_handlers=[r"^/api/dashboard/stream$"])
+        return
+    from starlette.middleware.gzip import GZipMiddleware
+    # Level 6 gets most of level 9's ratio on JSON at a fraction of the CPU
+    app.add_middleware(GZipMiddleware, minimum_size=HTTP_COMPRESSION_MIN_BYTES, compresslevel=6)
@@ -0,0 +1,187 @@
+"""Live dashboard updates pushed over Server-Sent Events.
+
+``GET /api/dashboard/stream`` replaces the dashboard's fetch-and-repeat
+pattern. Changes reach the broker in two ways. The write routers' counter
+deltas (``dashboard_counters.record_change``) are published when their
+transaction commits. Every cache invalidation (``app.cache``) is published
+with the tables it covers.
+
+The broker does not forward every event. After the first change it waits
+``LIVE_UPDATE_INTERVAL_SECONDS`` so that a burst of writes becomes one
+message. It sends that message to every connected client:
+
+    event: update
+    data: {"counters": {"total_requests": 3.0, ...}, "refresh": ["recent-requests"]}
+
+Clients add ``counters`` to the stats they hold and refetch the panels
+listed in ``refresh``. The refetches are answered from the result cache and
+single flight, so the database does work per change, not per viewer.
+
+Changes made by other workers show up as table version bumps (shared through
+``CACHE_BACKEND=redis``). The broker compares versions every
+``LIVE_UPDATE_POLL_SECONDS`` and lists the affected panels. It also asks for
+``stats`` when it cannot account for the counter changes with deltas of its
+own.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Set
+
+from starlette.concurrency import run_in_threadpool
+
+from app.cache import result_cache
+
+logger = logging.getLogger(__name__)
+
+LIVE_UPDATE_INTERVAL_SECONDS = float(os.getenv("LIVE_UPDATE_INTERVAL_SECONDS", "1"))
+LIVE_UPDATE_POLL_SECONDS = float(os.getenv("LIVE_UPDATE_POLL_SECONDS", "2"))
+LIVE_UPDATE_KEEPALIVE_SECONDS = float(os.getenv("LIVE_UPDATE_KEEPALIVE_SECONDS", "15"))
+# Messages a slow client may fall behind by before it is told to refetch everything
+LIVE_UPDATE_QUEUE_SIZE = int(os.getenv("LIVE_UPDATE_QUEUE_SIZE", "16"))
+
+# Dashboard panels (endpoints under /api/dashboard) and the tables they read
+PANEL_TABLES = {
+    "stats": ("dashboard_counter",),
+    "recent-requests": ("Service_Request", "Citizen", "Service", "Department", "Payment"),
+    "department-performance": ("Department", "Service", "department_daily_rollup"),
+    "monthly-trends": ("Service_Request", "Payment"),
+}
+WATCHED_TABLES = sorted({t for tables in PANEL_TABLES.values() for t in tables} | {"*"})
+RESYNC = {"counters": {}, "refresh": list(PANEL_TABLES)}
+
+
+class DashboardBroker:
+    """Collects published changes and fans coalesced updates out to SSE subscribers"""
+
+    def __init__(self, interval: float, poll: float):
+        self.interval = interval
+        self.poll = poll
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._lock = threading.Lock()
+        self._deltas: Dict[str, Decimal] = {}
+        self._bumps: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Held while the first subscriber starts the pump, so clients
+        # connecting at once do not each start one
+        self._starting = asyncio.Lock()
+        self.sent = 0
+
+    def publish(self, counters: Optional[Dict[str, Decimal]] = None, tables: Iterable[str] = ()) -> None:
+        """Record a committed change; safe to call from any thread"""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        with self._lock:
+            for name, delta in (counters or {}).items():
+                self._deltas[name] = self._deltas.get(name, Decimal(0)) + delta
+            for table in tables:
+                self._bumps[table] = self._bumps.get(table, 0) + 1
+        loop.call_soon_threadsafe(self._wake.set)
+
+    def _read_versions(self) -> Dict[str, int]:
+        backend = result_cache.backend
+        return {t: backend.get_counter("tag:" + t) for t in WATCHED_TABLES}
+
+    def _collect(self) -> Optional[dict]:
+        """The update since the last one, or None when nothing changed"""
+        versions = self._read_versions()
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            bumps, self._bumps = self._bumps, {}
+        changed = {t for t in WATCHED_TABLES if versions[t] != self._versions.get(t, 0)}
+        # Version bumps this process did not publish: another worker or a custom query
+        foreign = {t for t in changed if versions[t] - self._versions.get(t, 0) != bumps.get(t, 0)}
+        self._versions = versions
+        if not changed and not deltas:
+            return None
+        if "*" in changed:
+            refresh = list(PANEL_TABLES)
+        else:
+            refresh = [panel for panel, tables in PANEL_TABLES.items() if changed.intersection(tables)]
+            if "stats" in refresh and "dashboard_counter" not in foreign:
+                # The deltas cover it
+                refresh.remove("stats")
+        return {"counters": {k: float(v) for k, v in deltas.items() if v}, "refresh": refresh}
+
+    def _send(self, message: dict) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too far behind for deltas to be of use: start it over
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+        self.sent += 1
+
+    async def _pump(self) -> None:
+        while self._subscribers:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll)
+                # Let the rest of a burst of writes arrive
+                await asyncio.sleep(self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                message = await run_in_threadpool(self._collect)
+            except Exception:
+                logger.exception("Collecting dashboard changes failed")
+                continue
+            if message is not None:
+                self._send(message)
+        self._task = None
+
+    async def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=LIVE_UPDATE_QUEUE_SIZE)
+        async with self._starting:
+            if self._task is None:
+                self._loop = asyncio.get_running_loop()
+                self._wake = asyncio.Event()
+                self._versions = await run_in_threadpool(self._read_versions)
+                self._subscribers.add(queue)
+                self._task = self._loop.create_task(self._pump())
+            else:
+                self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    async def events(self, request):
+        """SSE body for one client: an update per coalesced change, and keepalives"""
+        queue = await self.subscribe()
+        try:
+            # Reconnect quickly; the client refetches everything when it does
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), LIVE_UPDATE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: update\ndata: {json.dumps(message)}\n\n"
+        finally:
+            self.unsubscribe(queue)
+
+    async def stop(self) -> None:
+        self._subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subscribers), "updates_sent": self.sent}
+
+
+broker = DashboardBroker(LIVE_UPDATE_INTERVAL_SECONDS, LIVE_UPDATE_POLL_SECONDS)
+result_cache.listeners.append(lambda tables: broker.publish(tables=tables))
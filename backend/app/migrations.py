@@ -0,0 +1,125 @@
+"""Versioned schema migrations.
+
+Migrations are the numbered ``backend/migrations/NNNN_name.sql`` files,
+applied in order and recorded in ``schema_migrations`` together with a
+checksum, so each one runs exactly once per database and later edits to an
+applied file are reported. Statements are separated by ``;`` at the end of a
+line; ``DELIMITER`` blocks (procedures, triggers) belong in ``backend/sql``.
+
+Usage (from ``backend/``):
+
+    python -m app.migrations status
+    python -m app.migrations up
+"""
+import argparse
+import hashlib
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+from sqlalchemy import text
+
+from app.database import engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode()).hexdigest()
+
+    def statements(self) -> List[str]:
+        lines = [line for line in self.sql.splitlines() if not line.strip().startswith("--")]
+        return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        match = _FILENAME.match(path.name)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), path))
+    return migrations
+
+
+def _ensure_table(conn) -> None:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " Version INT PRIMARY KEY,"
+        " Name VARCHAR(200) NOT NULL,"
+        " Checksum CHAR(64) NOT NULL,"
+        " Applied_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+
+def applied_versions(conn) -> Dict[int, str]:
+    _ensure_table(conn)
+    return dict(conn.execute(text("SELECT Version, Checksum FROM schema_migrations")).all())
+
+
+def status(bind=engine) -> List[dict]:
+    with bind.begin() as conn:
+        applied = applied_versions(conn)
+    rows = []
+    for m in discover():
+        state = "pending"
+        if m.version in applied:
+            state = "applied" if applied[m.version] == m.checksum else "applied (file changed)"
+        rows.append({"version": m.version, "name": m.name, "state": state})
+    return rows
+
+
+def upgrade(bind=engine, target: int = None) -> List[Migration]:
+    """Apply pending migrations up to ``target`` (all by default)"""
+    done = []
+    with bind.begin() as conn:
+        applied = applied_versions(conn)
+    for m in discover():
+        if m.version in applied or (target is not None and m.version > target):
+            continue
+        # MySQL commits DDL implicitly, so each migration is recorded right
+        # after its own statements succeed
+        with bind.begin() as conn:
+            for stmt in m.statements():
+                conn.execute(text(stmt))
+            conn.execute(
+                text("INSERT INTO schema_migrations (Version, Name, Checksum) VALUES (:v, :n, :c)"),
+                {"v": m.version, "n": m.name, "c": m.checksum},
+            )
+        done.append(m)
+        print(f"applied {m.version:04d}_{m.name}")
+    return done
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="list migrations and whether they are applied")
+    up = sub.add_parser("up", help="apply pending migrations")
+    up.add_argument("--target", type=int, default=None, help="stop after this version")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        for row in status():
+            print(f"{row['version']:04d}  {row['name']:<40} {row['state']}")
+    else:
+        if not upgrade(target=args.target):
+            print("nothing to apply")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
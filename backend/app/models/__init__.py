@@ -4,5 +4,14 @@ from .service import Service
 from .payment import Payment
 from .service_request import ServiceRequest
 from .grievance import Grievance
+from .id_sequence import IdSequence
+from .dashboard_counter import DashboardCounter
+from .citizen_summary import CitizenSummary
+from .department_rollup import DepartmentDailyRollup
+from .monthly_trend import MonthlyTrend
+from .replica_heartbeat import ReplicaHeartbeat
+from .service_request_history import ServiceRequestHistory
+from .payment_history import PaymentHistory
+from .archive_run import ArchiveRun
 
-__all__ = ["Citizen", "Department", "Service", "Payment", "ServiceRequest", "Grievance"]
+__all__ = ["Citizen", "Department", "Service", "Payment", "ServiceRequest", "Grievance", "IdSequence", "DashboardCounter", "CitizenSummary", "DepartmentDailyRollup", "MonthlyTrend", "ReplicaHeartbeat", "ServiceRequestHistory", "PaymentHistory", "ArchiveRun"]
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime
+from app.database import Base
+
+class ArchiveRun(Base):
+    __tablename__ = "archive_run"
+
+    Run_ID = Column(Integer, primary_key=True, autoincrement=True)
+    Started_At = Column(DateTime, nullable=False)
+    Finished_At = Column(DateTime)
+    # Closed requests dated before this day were moved
+    Cutoff = Column(Date, nullable=False)
+    Requests = Column(Integer, nullable=False, default=0)
+    Payments = Column(Integer, nullable=False, default=0)
+    # Directory of the Parquet copy, when one was written
+    Parquet_Path = Column(String(500))
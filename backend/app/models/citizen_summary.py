@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, Date, DECIMAL
+from app.database import Base
+
+class CitizenSummary(Base):
+    __tablename__ = "citizen_summary"
+
+    Citizen_ID = Column(Integer, primary_key=True)
+    Total_Service_Requests = Column(Integer, nullable=False, default=0)
+    Completed_Requests = Column(Integer, nullable=False, default=0)
+    Pending_Requests = Column(Integer, nullable=False, default=0)
+    Total_Grievances = Column(Integer, nullable=False, default=0)
+    Open_Grievances = Column(Integer, nullable=False, default=0)
+    Total_Amount_Paid = Column(DECIMAL(14, 2), nullable=False, default=0)
+    Last_Service_Request_Date = Column(Date)
+    Last_Grievance_Date = Column(Date)
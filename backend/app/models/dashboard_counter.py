@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DECIMAL, SmallInteger
+from app.database import Base
+
+class DashboardCounter(Base):
+    __tablename__ = "dashboard_counter"
+
+    Name = Column(String(64), primary_key=True)
+    # Each counter is spread over DASHBOARD_COUNTER_SLOTS rows (app/dashboard_counters.py)
+    Slot = Column(SmallInteger, primary_key=True, default=0)
+    Value = Column(DECIMAL(18, 2), nullable=False, default=0)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, Date, DECIMAL, Index
+from app.database import Base
+
+class DepartmentDailyRollup(Base):
+    __tablename__ = "department_daily_rollup"
+    __table_args__ = (Index("idx_rollup_day", "Day"),)
+
+    Service_ID = Column(Integer, primary_key=True)
+    Day = Column(Date, primary_key=True)
+    Status = Column(String(50), primary_key=True)
+    Request_Count = Column(Integer, nullable=False, default=0)
+    Paid_Count = Column(Integer, nullable=False, default=0)
+    Revenue = Column(DECIMAL(18, 2), nullable=False, default=0)
@@ -0,0 +1,8 @@
+from sqlalchemy import Column, String, BigInteger
+from app.database import Base
+
+class IdSequence(Base):
+    __tablename__ = "id_sequence"
+
+    Sequence_Name = Column(String(64), primary_key=True)
+    Next_Value = Column(BigInteger, nullable=False)
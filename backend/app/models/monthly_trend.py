@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DECIMAL, LargeBinary, DateTime
+from app.database import Base
+
+class MonthlyTrend(Base):
+    __tablename__ = "monthly_trend"
+
+    Month = Column(String(7), primary_key=True)
+    Total_Requests = Column(Integer, nullable=False, default=0)
+    Total_Revenue = Column(DECIMAL(18, 2), nullable=False, default=0)
+    Unique_Citizens = Column(Integer, nullable=False, default=0)
+    Citizen_Sketch = Column(LargeBinary)
+    Computed_At = Column(DateTime, nullable=False)
+    Version = Column(Integer, nullable=False, default=0)
+    Frozen_Version = Column(Integer)
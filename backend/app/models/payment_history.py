@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DECIMAL, Date, DateTime, Index
+from app.database import Base
+
+class PaymentHistory(Base):
+    __tablename__ = "Payment_History"
+    __table_args__ = (
+        Index("idx_ph_date", "Payment_Date"),
+        Index("idx_ph_status_amount", "Status", "Amount"),
+    )
+
+    Payment_ID = Column(Integer, primary_key=True)
+    Amount = Column(DECIMAL(10, 2))
+    Payment_Date = Column(Date)
+    Payment_Method = Column(String(50))
+    Status = Column(String(50))
+    Archived_At = Column(DateTime, nullable=False)
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Float, Integer
+from app.database import Base
+
+class ReplicaHeartbeat(Base):
+    __tablename__ = "replica_heartbeat"
+
+    Id = Column(Integer, primary_key=True)
+    # Unix time of the primary write, read back from each replica to measure lag
+    Beat_At = Column(Float, nullable=False)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, Index
+from app.database import Base
+
+class ServiceRequestHistory(Base):
+    __tablename__ = "Service_Request_History"
+    __table_args__ = (
+        Index("idx_srh_citizen_date", "Citizen_ID", "Request_Date"),
+        Index("idx_srh_date_citizen_payment", "Request_Date", "Citizen_ID", "Payment_ID"),
+        Index("idx_srh_service_status_payment", "Service_ID", "Status", "Payment_ID"),
+    )
+
+    Request_ID = Column(Integer, primary_key=True)
+    Citizen_ID = Column(Integer)
+    Service_ID = Column(Integer)
+    Request_Date = Column(Date, nullable=False)
+    Status = Column(String(50))
+    Payment_ID = Column(Integer)
+    Archived_At = Column(DateTime, nullable=False)
@@ -0,0 +1,295 @@
+"""Monthly request trends with finished months frozen in ``monthly_trend``.
+
+Only the current month, and any future-dated ones, can still change, so only
+those are aggregated on each call. Each query is a ``Request_Date`` range
+scan of one month on the covering date index. Finished months are computed
+once, stored with their request count, revenue, exact unique-citizen count
+and a HyperLogLog sketch of their citizens, and then read back by primary key.
+
+Requests moved to ``Service_Request_History`` by the archive job are
+counted as well (see ``app/history.py``): each query runs on the live and the
+archived side with the same month range, so both stay pruned to that month.
+
+A late write that lands in a finished month unfreezes it. Session hooks
+collect the months of every request (old and new ``Request_Date``) and of
+the requests of every changed payment, then bump the ``Version`` of those
+months in the same transaction. Stored numbers count only while their
+``Frozen_Version`` still equals ``Version``; the next call recomputes the
+others. A reader stores what it computed with a conditional upsert that
+keeps the row unchanged if the version moved since the reader read it, so
+numbers computed before a concurrent late write are never frozen, and two
+first readers of a month cannot collide on the insert.
+
+With ``approximate=True`` the open month's unique citizens come from a
+HyperLogLog sketch built in a single streaming pass with constant memory,
+instead of ``COUNT(DISTINCT)``. Finished months then report their stored
+sketch estimates too, so all months use the same estimator.
+"""
+import datetime
+import logging
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import case, event, func, insert, inspect, literal, select, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app import history
+from app.database import SessionLocal
+from app.hll import HyperLogLog
+from app.models.monthly_trend import MonthlyTrend
+from app.models.payment import Payment
+from app.models.service_request import ServiceRequest
+
+logger = logging.getLogger(__name__)
+
+PAID_STATUS = "Completed"
+STREAM_CHUNK_ROWS = 10000
+_FROZEN_COLUMNS = ("Total_Requests", "Total_Revenue", "Unique_Citizens", "Citizen_Sketch", "Computed_At")
+
+
+def month_key(day: datetime.date) -> str:
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+def _month_start(key: str) -> datetime.date:
+    year, month = key.split("-")
+    return datetime.date(int(year), int(month), 1)
+
+
+def _next_month(day: datetime.date) -> datetime.date:
+    return datetime.date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _in_month(first: datetime.date, model=ServiceRequest):
+    return (model.Request_Date >= first) & (model.Request_Date < _next_month(first))
+
+
+def _totals(db: Session, first: datetime.date):
+    requests, revenue = 0, Decimal(0)
+    for request, payment in history.SIDES:
+        count, amount = db.execute(
+            select(func.count(request.Request_ID), func.coalesce(func.sum(payment.Amount), 0))
+            .outerjoin(payment, (payment.Payment_ID == request.Payment_ID) & (payment.Status == PAID_STATUS))
+            .where(_in_month(first, request))
+        ).one()
+        requests += count or 0
+        revenue += Decimal(amount or 0)
+    return requests, revenue
+
+
+def _month_citizens(first: datetime.date):
+    return history.requests_union(["Citizen_ID"], lambda model: [_in_month(first, model)])
+
+
+def _exact_citizens(db: Session, first: datetime.date) -> int:
+    citizens = _month_citizens(first)
+    return db.scalar(select(func.count(func.distinct(citizens.c.Citizen_ID)))) or 0
+
+
+def _citizen_sketch(db: Session, first: datetime.date) -> HyperLogLog:
+    sketch = HyperLogLog()
+    citizens = _month_citizens(first)
+    rows = db.execute(
+        select(citizens.c.Citizen_ID)
+        .where(citizens.c.Citizen_ID.is_not(None))
+        .execution_options(stream_results=True, yield_per=STREAM_CHUNK_ROWS)
+    ).scalars()
+    sketch.update(rows)
+    return sketch
+
+
+def _row(key: str, requests: int, revenue, unique: int) -> dict:
+    return {
+        "Month": key,
+        "Total_Requests": int(requests or 0),
+        "Total_Revenue": Decimal(revenue or 0),
+        "Unique_Citizens": int(unique),
+    }
+
+
+def _upsert(db: Session, rows: List[dict], on_duplicate: Callable) -> None:
+    """Insert ``rows``; months already stored get ``on_duplicate(columns, new_row)`` instead"""
+    table = MonthlyTrend.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        db.execute(stmt.on_duplicate_key_update(on_duplicate(table.c, stmt.inserted)), rows)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table)
+        db.execute(stmt.on_conflict_do_update(index_elements=["Month"], set_=on_duplicate(table.c, stmt.excluded)),
+                   rows)
+    else:
+        for row in rows:
+            new = {k: literal(v, table.c[k].type) for k, v in row.items()}
+            found = db.execute(update(table).where(table.c.Month == row["Month"])
+                               .values(on_duplicate(table.c, new))).rowcount
+            if not found:
+                db.execute(insert(table), [row])
+
+
+def _compute(db: Session, key: str, version: int) -> dict:
+    """A finished month's numbers, to be frozen at ``version``"""
+    first = _month_start(key)
+    requests, revenue = _totals(db, first)
+    return {
+        "Month": key,
+        "Total_Requests": requests,
+        "Total_Revenue": revenue,
+        "Unique_Citizens": _exact_citizens(db, first),
+        "Citizen_Sketch": _citizen_sketch(db, first).to_bytes(),
+        "Computed_At": datetime.datetime.now(),
+        "Version": version,
+        "Frozen_Version": version,
+    }
+
+
+def _if_unchanged(columns, new) -> dict:
+    # Version itself is never assigned here, so the condition reads the stored value
+    unchanged = columns.Version == new["Version"]
+    return {c: case((unchanged, new[c]), else_=columns[c]) for c in (*_FROZEN_COLUMNS, "Frozen_Version")}
+
+
+def _freeze(db: Session, months: List[dict]) -> None:
+    """Store recomputed months whose version did not move meanwhile, and commit.
+
+    Freezing only saves later calls work, so a failure (e.g. a lock wait
+    behind a late write) is logged and the numbers are served anyway.
+    """
+    try:
+        _upsert(db, sorted(months, key=lambda m: m["Month"]), _if_unchanged)
+        db.commit()
+    except DBAPIError:
+        db.rollback()
+        logger.warning("could not freeze monthly trends", exc_info=True)
+
+
+def _months_with_data(db: Session) -> List[str]:
+    """Month keys from the newest Request_Date back to the oldest, newest first"""
+    bounds = [
+        db.execute(
+            select(func.min(request.Request_Date), func.max(request.Request_Date))
+            .where(request.Request_Date > history.UNDATED)
+        ).one()
+        for request, _ in history.SIDES
+    ]
+    oldest = min((low for low, _ in bounds if low is not None), default=None)
+    newest = max((high for _, high in bounds if high is not None), default=None)
+    if oldest is None:
+        return []
+    keys, cursor = [], datetime.date(newest.year, newest.month, 1)
+    while cursor >= datetime.date(oldest.year, oldest.month, 1):
+        keys.append(month_key(cursor))
+        cursor = datetime.date(cursor.year - (cursor.month == 1), (cursor.month - 2) % 12 + 1, 1)
+    return keys
+
+
+def monthly_trends(db: Session, months: int = 12, approximate: bool = False,
+                   today: Optional[datetime.date] = None) -> List[dict]:
+    """The ``months`` most recent months that have requests, newest first"""
+    open_from = month_key(today or datetime.date.today())
+    candidates = _months_with_data(db)
+    if not candidates:
+        return []
+
+    closed = [k for k in candidates if k < open_from]
+    # Read before anything is computed: a version read here that is still
+    # current when the recomputed month is stored means no write came between
+    frozen: Dict[str, dict] = {}
+    table = MonthlyTrend.__table__
+    for start in range(0, len(closed), 500):
+        frozen.update({
+            f["Month"]: dict(f)
+            for f in db.execute(select(table).where(table.c.Month.in_(closed[start:start + 500]))).mappings()
+        })
+
+    rows: List[dict] = []
+    recomputed: List[dict] = []
+    for key in candidates:
+        if len(rows) >= months:
+            break
+        if key >= open_from:
+            first = _month_start(key)
+            requests, revenue = _totals(db, first)
+            if requests:
+                unique = _citizen_sketch(db, first).count() if approximate else _exact_citizens(db, first)
+                rows.append(_row(key, requests, revenue, unique))
+            continue
+        month = frozen.get(key)
+        if month is None or month["Frozen_Version"] != month["Version"]:
+            # Months without requests are frozen too, so gaps are computed only once
+            month = _compute(db, key, month["Version"] if month else 0)
+            recomputed.append(month)
+        if month["Total_Requests"]:
+            unique = (HyperLogLog.from_bytes(month["Citizen_Sketch"]).count() if approximate
+                      else month["Unique_Citizens"])
+            rows.append(_row(key, month["Total_Requests"], month["Total_Revenue"], unique))
+    if recomputed:
+        _freeze(db, recomputed)
+    return rows
+
+
+# -- Unfreezing on late writes -----------------------------------------------------
+
+def _pending(session: Session) -> dict:
+    return session.info.setdefault("monthly_trends", {"months": set(), "payments": set()})
+
+
+def _dates(obj) -> Set[datetime.date]:
+    history = inspect(obj).attrs.Request_Date.history
+    return {d for d in [obj.Request_Date, *history.deleted] if d is not None}
+
+
+def _months(days: Iterable) -> Set[str]:
+    return {month_key(d) for d in days if isinstance(d, datetime.date)}
+
+
+def install_session_hooks(session_factory) -> None:
+    """Unfreeze the months that a committing ``session_factory`` session wrote into"""
+
+    @event.listens_for(session_factory, "after_flush")
+    def _collect_flushed(session, flush_context):
+        pending = _pending(session)
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, ServiceRequest):
+                pending["months"] |= _months(_dates(obj))
+            elif isinstance(obj, Payment) and obj not in session.new:
+                pending["payments"].add(obj.Payment_ID)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _collect_executed(orm_execute_state):
+        if not orm_execute_state.is_insert:
+            return
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is None or table.name != ServiceRequest.__tablename__:
+            return
+        params = orm_execute_state.parameters
+        rows = params if isinstance(params, list) else [params or {}]
+        _pending(orm_execute_state.session)["months"] |= _months(row.get("Request_Date") for row in rows)
+
+    @event.listens_for(session_factory, "before_commit")
+    def _unfreeze(session):
+        session.flush()
+        pending = session.info.pop("monthly_trends", None)
+        if not pending:
+            return
+        months = pending["months"]
+        if pending["payments"]:
+            months |= _months(session.execute(
+                select(ServiceRequest.Request_Date).where(ServiceRequest.Payment_ID.in_(pending["payments"]))
+            ).scalars())
+        closed = sorted(m for m in months if m < month_key(datetime.date.today()))
+        if closed:
+            # A month nobody froze yet gets a row too, so a reader computing it
+            # right now finds the version moved and does not store its numbers
+            now = datetime.datetime.now()
+            _upsert(session, [{"Month": m, "Computed_At": now, "Version": 1, "Frozen_Version": None} for m in closed],
+                    lambda columns, new: {"Version": columns.Version + 1})
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _discard(session):
+        session.info.pop("monthly_trends", None)
+
+
+install_session_hooks(SessionLocal)
@@ -0,0 +1,99 @@
+"""Keyset (cursor) pagination shared by the list endpoints.
+
+Deep ``OFFSET`` pages make MySQL walk and discard every skipped row, so list
+endpoints page on an index instead: each page ends with an opaque cursor that
+encodes the sort key of its last row, and the next page starts strictly after
+that key. Page cost stays flat no matter how far into the table a client is.
+"""
+import base64
+import json
+import os
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, and_, or_
+
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row on a page into an opaque token"""
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, width: int) -> List[Any]:
+    """Decode a token produced by ``encode_cursor``; 400 on anything else"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != width:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    # Sort keys are scalars; anything else would only fail later, at bind time
+    if not all(v is None or isinstance(v, (int, float, str)) for v in values):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return values
+
+
+def clamp_limit(limit: int) -> int:
+    """Keep page sizes between 1 and MAX_PAGE_SIZE"""
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_after(columns, values, descending: bool):
+    """WHERE clause selecting the rows strictly after ``values`` in ``columns`` order"""
+    # Expand (a, b) < (x, y) into a < x OR (a = x AND b < y); MySQL only uses
+    # the index for the expanded form, not for row-value comparisons.
+    clauses = []
+    for i, column in enumerate(columns):
+        step = column < values[i] if descending else column > values[i]
+        prefix = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*prefix, step) if prefix else step)
+    return or_(*clauses)
+
+
+async def keyset_paginate(
+    db,
+    stmt: Select,
+    columns: Sequence,
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = True,
+    response: Optional[Response] = None,
+    skip: int = 0,
+    scalars: bool = True,
+) -> list:
+    """Return one page of the ORM ``stmt`` ordered by ``columns``.
+
+    ``db`` is the session from ``get_async_db``. ``columns`` must end with the
+    primary key so the ordering is total. The cursor for the following page is
+    written to the ``X-Next-Cursor`` response header (absent on the last page),
+    which keeps the JSON body a plain list. ``skip`` is only honoured when no
+    cursor is given, for older clients. With ``scalars=False`` the page is a
+    list of column ``Row``s, for statements like ``select(Model.__table__)``
+    that skip building ORM objects.
+    """
+    limit = clamp_limit(limit)
+    columns = list(columns)
+
+    if cursor:
+        stmt = stmt.where(keyset_after(columns, decode_cursor(cursor, len(columns)), descending))
+    elif skip:
+        stmt = stmt.offset(skip)
+
+    order = [c.desc() if descending else c.asc() for c in columns]
+    # Fetch one extra row to learn whether another page exists
+    result = await db.execute(stmt.order_by(*order).limit(limit + 1))
+    rows = result.scalars().all() if scalars else result.all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if response is not None and has_more:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            [getattr(last, c.key) for c in columns]
+        )
+    return rows
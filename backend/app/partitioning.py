@@ -0,0 +1,170 @@
+"""Monthly RANGE partitions of Service_Request and Payment (MySQL).
+
+Migration 0008 partitions both tables on their date column, starting with a
+single ``p_future`` partition. ``maintain`` keeps this layout:
+
+    p_old    everything before the first monthly partition
+    pYYYYMM  one partition per month, from PARTITION_MONTHS_BACK months ago
+             to PARTITION_MONTHS_AHEAD months ahead
+    p_future MAXVALUE; stays empty while maintain runs regularly
+
+Queries with a date range (month aggregates, the dashboard's recent
+requests window, the archive job) are then pruned to the partitions of that
+range. Monthly partitions that fall behind the window are merged into
+``p_old``. The archive job (``app/archive.py``) has already emptied most of
+them by then, so the merge copies few rows. The window keeps the number of
+partitions small, which matters because a lookup by ID alone probes every
+partition.
+
+New months are split off ``p_future`` while it is still empty, which is a
+metadata-only change. The first run after the migration reorganizes the whole
+table once; schedule it for a quiet period. Run it from cron, e.g. monthly:
+
+    python -m app.partitioning status
+    python -m app.partitioning maintain
+    python -m app.partitioning maintain --dry-run
+"""
+import argparse
+import datetime
+import os
+import sys
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from app.archive import ARCHIVE_AFTER_MONTHS, cutoff_for
+from app.database import engine
+
+# Table -> partitioning column
+PARTITIONED = {"Service_Request": "Request_Date", "Payment": "Payment_Date"}
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# One month more than the archive horizon: the archive job's range deletes
+# stay within monthly partitions
+PARTITION_MONTHS_BACK = int(os.getenv("PARTITION_MONTHS_BACK", str(ARCHIVE_AFTER_MONTHS + 1)))
+
+OLD = "p_old"
+FUTURE = "p_future"
+
+# (name, exclusive upper bound, None for MAXVALUE)
+Partition = Tuple[str, Optional[datetime.date]]
+
+
+def _name(first: datetime.date) -> str:
+    return f"p{first.year:04d}{first.month:02d}"
+
+
+def _next_month(day: datetime.date) -> datetime.date:
+    return datetime.date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _months(start: datetime.date, end: datetime.date) -> List[Partition]:
+    """Monthly partitions covering ``[start, end)``"""
+    parts = []
+    while start < end:
+        parts.append((_name(start), _next_month(start)))
+        start = _next_month(start)
+    return parts
+
+
+def _definition(parts: Sequence[Partition]) -> str:
+    return ", ".join(
+        f"PARTITION {name} VALUES LESS THAN ({'MAXVALUE' if bound is None else repr(bound.isoformat())})"
+        for name, bound in parts
+    )
+
+
+def _reorganize(table: str, names: Sequence[str], parts: Sequence[Partition]) -> str:
+    return f"ALTER TABLE {table} REORGANIZE PARTITION {', '.join(names)} INTO ({_definition(parts)})"
+
+
+def plan(table: str, partitions: Sequence[Partition], back: int = PARTITION_MONTHS_BACK,
+         ahead: int = PARTITION_MONTHS_AHEAD, today: Optional[datetime.date] = None) -> List[str]:
+    """The statements that bring ``table`` from ``partitions`` to the layout of the window"""
+    today = today or datetime.date.today()
+    first = cutoff_for(back, today)
+    end = _next_month(cutoff_for(-ahead, today))
+    bounded = [(name, bound) for name, bound in partitions if bound is not None]
+
+    if not bounded:
+        # Fresh from the migration: one MAXVALUE partition holding everything
+        return [_reorganize(table, [name for name, _ in partitions],
+                            [(OLD, first), *_months(first, end), (FUTURE, None)])]
+
+    statements = []
+    last = bounded[-1][1]
+    if last < end:
+        added = _months(last, end)
+        statements.append(_reorganize(table, [FUTURE], [*added, (FUTURE, None)]))
+        bounded += added
+    stale = [(name, bound) for name, bound in bounded if name != OLD and bound <= first]
+    if stale:
+        statements.append(_reorganize(table, [OLD, *(name for name, _ in stale)], [(OLD, stale[-1][1])]))
+    return statements
+
+
+def partitions(conn, table: str) -> List[dict]:
+    """The partitions of ``table`` in order, with their upper bound and estimated rows"""
+    rows = conn.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {"t": table}).all()
+    return [
+        {
+            "name": name,
+            "bound": None if description == "MAXVALUE" else datetime.date.fromisoformat(description.strip("'")),
+            "rows": rows_estimate or 0,
+        }
+        for name, description, rows_estimate in rows
+    ]
+
+
+def maintain(bind=engine, back: int = PARTITION_MONTHS_BACK, ahead: int = PARTITION_MONTHS_AHEAD,
+             dry_run: bool = False) -> List[str]:
+    """Split off the coming months and merge the stale ones on every partitioned table"""
+    done = []
+    with bind.begin() as conn:
+        for table in PARTITIONED:
+            current = partitions(conn, table)
+            if not current:
+                print(f"{table} is not partitioned; apply migration 0008 first")
+                continue
+            for stmt in plan(table, [(p["name"], p["bound"]) for p in current], back, ahead):
+                print(stmt)
+                if not dry_run:
+                    conn.execute(text(stmt))
+                done.append(stmt)
+    return done
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the monthly partitions of the fact tables")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="list partitions with their bounds and estimated rows")
+    maintain_cmd = sub.add_parser("maintain", help="add upcoming months and merge old ones into p_old")
+    maintain_cmd.add_argument("--back", type=int, default=PARTITION_MONTHS_BACK,
+                              help="months before the current one that keep their own partition")
+    maintain_cmd.add_argument("--ahead", type=int, default=PARTITION_MONTHS_AHEAD,
+                              help="months after the current one to create partitions for")
+    maintain_cmd.add_argument("--dry-run", action="store_true", help="print the statements only")
+    args = parser.parse_args(argv)
+
+    if engine.dialect.name != "mysql":
+        print("partitioning needs MySQL")
+        return 2
+
+    if args.command == "status":
+        with engine.connect() as conn:
+            for table, column in PARTITIONED.items():
+                print(f"{table} (by {column})")
+                for p in partitions(conn, table):
+                    bound = "MAXVALUE" if p["bound"] is None else p["bound"].isoformat()
+                    print(f"  {p['name']:<10} < {bound:<10} ~{p['rows']:,} rows")
+    elif not maintain(back=args.back, ahead=args.ahead, dry_run=args.dry_run):
+        print("partitions are up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Connection pool telemetry.
+
+The engines in ``app/database.py`` use the pool classes below, which time
+every connection checkout (including the time spent waiting for a free
+connection) into a per-pool histogram. ``pool_stats`` combines that with the
+pool's live checked-out/overflow counts so pool sizes can be tuned per
+uvicorn worker.
+"""
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (milliseconds) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolMetrics:
+    """Checkout wait histogram and counters for one named pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.bucket_counts: List[int] = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_count = 0
+        self.wait_sum_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.timeouts = 0
+
+    def observe_wait(self, elapsed_ms: float) -> None:
+        with self._lock:
+            index = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if elapsed_ms <= bound), len(WAIT_BUCKETS_MS))
+            self.bucket_counts[index] += 1
+            self.wait_count += 1
+            self.wait_sum_ms += elapsed_ms
+            self.wait_max_ms = max(self.wait_max_ms, elapsed_ms)
+
+    def observe_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            cumulative, histogram = 0, {}
+            for bound, count in zip(list(WAIT_BUCKETS_MS) + ["+Inf"], self.bucket_counts):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+            wait = {
+                "count": self.wait_count,
+                "sum_ms": round(self.wait_sum_ms, 3),
+                "max_ms": round(self.wait_max_ms, 3),
+                "mean_ms": round(self.wait_sum_ms / self.wait_count, 3) if self.wait_count else 0.0,
+                "buckets_ms": histogram,
+                "timeouts": self.timeouts,
+            }
+        live = {}
+        if pool is not None:
+            live = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            }
+        return {"name": self.name, **live, "checkout_wait": wait}
+
+
+_registry: Dict[str, PoolMetrics] = {}
+_registry_lock = threading.Lock()
+
+
+def metrics_for(name: str) -> PoolMetrics:
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = PoolMetrics(name)
+        return _registry[name]
+
+
+class _TimedCheckoutMixin:
+    # The metrics name travels as the pool's logging_name, which SQLAlchemy
+    # carries over when a pool is recreated after dispose()
+
+    def _metrics(self) -> PoolMetrics:
+        metrics = metrics_for(self._orig_logging_name or "default")
+        metrics.pool = self
+        return metrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self._metrics().observe_timeout()
+            raise
+        self._metrics().observe_wait((time.perf_counter() - start) * 1000)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats() -> List[dict]:
+    """Snapshot of every instrumented pool"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return [m.snapshot() for m in metrics]
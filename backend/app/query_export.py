@@ -0,0 +1,218 @@
+"""Column-wise value conversion and streaming encoders for query results.
+
+A converter is picked once per column and then applied to the whole column
+of each chunk, instead of testing every cell with ``hasattr``/``isinstance``.
+The converter and the Arrow type of a column come from the MySQL field type
+the driver reports for it (``column_types``), so they are known before the
+first row and hold for every chunk. Drivers that report no types (SQLite)
+fall back to the first non-NULL value for the converter, and to strings in
+Arrow. The encoders turn an iterator of row chunks into NDJSON, CSV or Arrow
+IPC stream bytes so a result never has to be held in memory as a whole.
+"""
+import csv
+import datetime
+import io
+import json
+import os
+from decimal import Decimal
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from pymysql.constants import FIELD_TYPE
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+
+Converter = Optional[Callable[[Any], Any]]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _decode(value):
+    return value.decode("utf-8", errors="ignore")
+
+
+def _text(value):
+    # Text columns with a binary collation arrive as bytes
+    return _decode(value) if isinstance(value, (bytes, bytearray)) else value
+
+
+def _any_text(value):
+    return _decode(value) if isinstance(value, (bytes, bytearray)) else str(value)
+
+
+class ColumnType(NamedTuple):
+    """A result column's MySQL field type (``cursor.description``), None when the driver reports none"""
+
+    code: Optional[int]
+    precision: Optional[int] = None
+    scale: Optional[int] = None
+
+
+_INTEGER_CODES = {FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.LONGLONG, FIELD_TYPE.INT24,
+                  FIELD_TYPE.YEAR}
+_DECIMAL_CODES = {FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL}
+_DATETIME_CODES = {FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP}
+_DATE_CODES = {FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE}
+_BINARY_CODES = {FIELD_TYPE.BIT, FIELD_TYPE.GEOMETRY}
+
+
+def column_types(result) -> List[ColumnType]:
+    """The column types of ``result`` from the MySQL driver's cursor description"""
+    description = result.cursor.description or ()
+    if result.context.dialect.name != "mysql":
+        return [ColumnType(None)] * len(description)
+    return [ColumnType(d[1], d[4], d[5]) for d in description]
+
+
+def _type_converter(kind: ColumnType) -> Converter:
+    if kind.code in _DATETIME_CODES or kind.code in _DATE_CODES:
+        return _isoformat
+    if kind.code in _DECIMAL_CODES:
+        return float
+    if kind.code == FIELD_TYPE.TIME:
+        return str
+    if kind.code in _BINARY_CODES:
+        return _decode
+    if kind.code in _INTEGER_CODES or kind.code in (FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE, FIELD_TYPE.NULL):
+        return None
+    return _text
+
+
+def _pick_converter(sample: Any) -> Converter:
+    if isinstance(sample, (datetime.date, datetime.time)):  # datetime is a date
+        return _isoformat
+    if isinstance(sample, (bytes, bytearray)):
+        return _decode
+    if isinstance(sample, Decimal):
+        return float
+    if isinstance(sample, datetime.timedelta):  # MySQL TIME columns
+        return str
+    return None
+
+
+class ColumnConverters:
+    """Per-column converters, from the column types when known, else from the first non-NULL value"""
+
+    def __init__(self, width: int, types: Optional[Sequence[ColumnType]] = None):
+        self._converters: List[Converter] = [None] * width
+        self._resolved = [False] * width
+        for i, kind in enumerate(types or ()):
+            if kind.code is not None:
+                self._converters[i] = _type_converter(kind)
+                self._resolved[i] = True
+
+    def convert(self, rows: Sequence[Sequence[Any]]) -> List[tuple]:
+        if not rows:
+            return []
+        columns = list(zip(*rows))
+        for i, column in enumerate(columns):
+            if not self._resolved[i]:
+                sample = next((v for v in column if v is not None), None)
+                if sample is None:
+                    continue
+                self._converters[i] = _pick_converter(sample)
+                self._resolved[i] = True
+            fn = self._converters[i]
+            if fn is not None:
+                columns[i] = [None if v is None else fn(v) for v in column]
+        return list(zip(*columns))
+
+
+def rows_to_dicts(columns: Sequence[str], rows: Sequence[Sequence[Any]],
+                  types: Optional[Sequence[ColumnType]] = None) -> List[dict]:
+    """Convert a fully fetched result into JSON-ready dicts"""
+    converted = ColumnConverters(len(columns), types).convert(rows)
+    return [dict(zip(columns, row)) for row in converted]
+
+
+def iter_ndjson(columns: Sequence[str], types: Sequence[ColumnType],
+                chunks: Iterable[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    converters = ColumnConverters(len(columns), types)
+    for chunk in chunks:
+        lines = [json.dumps(dict(zip(columns, row)), default=str) for row in converters.convert(chunk)]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+
+
+def iter_csv(columns: Sequence[str], types: Sequence[ColumnType],
+             chunks: Iterable[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    converters = ColumnConverters(len(columns), types)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in chunks:
+        writer.writerows(converters.convert(chunk))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _arrow_type(pa, kind: ColumnType):
+    """The Arrow type of a column and the converter its values need first"""
+    if kind.code in _INTEGER_CODES:
+        return pa.int64(), None
+    if kind.code in (FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE):
+        return pa.float64(), None
+    if kind.code in _DECIMAL_CODES:
+        # The reported length is at least the declared precision
+        precision = max(kind.precision or 0, kind.scale or 0, 1)
+        if precision > 38:
+            return pa.decimal256(min(precision, 76), kind.scale or 0), None
+        return pa.decimal128(precision, kind.scale or 0), None
+    if kind.code in _DATETIME_CODES:
+        return pa.timestamp("us"), None
+    if kind.code in _DATE_CODES:
+        return pa.date32(), None
+    if kind.code == FIELD_TYPE.TIME:
+        return pa.duration("us"), None
+    if kind.code in _BINARY_CODES:
+        return pa.binary(), None
+    if kind.code == FIELD_TYPE.NULL:
+        return pa.null(), None
+    if kind.code is None:
+        return pa.string(), _any_text
+    return pa.string(), _text
+
+
+def iter_arrow(columns: Sequence[str], types: Sequence[ColumnType],
+               chunks: Iterable[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    """Encode chunks as an Arrow IPC stream, one record batch per chunk.
+
+    The schema is fixed from ``types`` before the first chunk, so a column
+    that is NULL or narrow in one chunk still takes every later value.
+    """
+    import pyarrow as pa
+
+    resolved = [_arrow_type(pa, kind) for kind in types]
+    schema = pa.schema([(name, arrow) for name, (arrow, _) in zip(columns, resolved)])
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    for chunk in chunks:
+        if not chunk:
+            continue
+        arrays = []
+        for column, field, (_, fn) in zip(zip(*chunk), schema, resolved):
+            values = [None if v is None else fn(v) for v in column] if fn is not None else list(column)
+            arrays.append(pa.array(values, type=field.type))
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+ENCODERS = {
+    "ndjson": iter_ndjson,
+    "csv": iter_csv,
+    "arrow": iter_arrow,
+}
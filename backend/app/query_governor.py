@@ -0,0 +1,140 @@
+"""Guardrails for analyst-submitted SQL from the custom query console.
+
+Before a SELECT runs it is costed with ``EXPLAIN`` and rejected when the
+optimizer expects it to examine more rows than ``CUSTOM_QUERY_MAX_EXAMINED_ROWS``.
+Statements that do run are bounded by MySQL's ``max_execution_time`` (set on
+every connection of the dedicated custom query pool and of its replica
+pools) and by a cap on the number of rows returned to the client. The cap
+goes into the statement itself (``cap_rows``): closing a server-side cursor
+early would otherwise read the rest of the result off the wire.
+"""
+import os
+import re
+
+from sqlalchemy import event, text
+
+from app.database import custom_query_engine, custom_query_replicas
+
+CUSTOM_QUERY_MAX_EXAMINED_ROWS = int(os.getenv("CUSTOM_QUERY_MAX_EXAMINED_ROWS", "5000000"))
+CUSTOM_QUERY_TIMEOUT_MS = int(os.getenv("CUSTOM_QUERY_TIMEOUT_MS", "10000"))
+CUSTOM_QUERY_MAX_ROWS = int(os.getenv("CUSTOM_QUERY_MAX_ROWS", "10000"))
+CUSTOM_QUERY_EXPORT_MAX_ROWS = int(os.getenv("CUSTOM_QUERY_EXPORT_MAX_ROWS", "5000000"))
+
+
+class QueryRejected(Exception):
+    """Raised when a custom query is refused before it runs"""
+
+
+def _limit_execution_time(dbapi_connection, connection_record):
+    # Replicas run the primary's engine (MySQL replication)
+    if custom_query_engine.dialect.name != "mysql" or CUSTOM_QUERY_TIMEOUT_MS <= 0:
+        return
+    cursor = dbapi_connection.cursor()
+    # Applies to every read-only SELECT run on this connection
+    cursor.execute(f"SET SESSION max_execution_time = {int(CUSTOM_QUERY_TIMEOUT_MS)}")
+    cursor.close()
+
+
+def limit_execution_time(engines) -> None:
+    """Set ``max_execution_time`` on every new connection of ``engines``"""
+    for e in engines:
+        if not event.contains(e, "connect", _limit_execution_time):
+            event.listen(e, "connect", _limit_execution_time)
+
+
+# Console SELECTs and exports may run on a replica (app/db_routing.py)
+limit_execution_time([custom_query_engine, *custom_query_replicas.engines])
+
+
+_TAIL_CLAUSE = re.compile(r"\b(FOR\s+UPDATE|FOR\s+SHARE|LOCK\s+IN\s+SHARE\s+MODE)\b", re.IGNORECASE)
+_LIMIT = re.compile(r"\bLIMIT\s+(\d+)(?:\s*,\s*(\d+))?", re.IGNORECASE)
+
+
+def _top_level(query: str) -> str:
+    """``query`` with everything inside parentheses, quotes and comments blanked out"""
+    masked, depth, i = [], 0, 0
+    while i < len(query):
+        ch = query[i]
+        if ch in "'\"`":
+            end = i + 1
+            while end < len(query) and query[end] != ch:
+                end += 2 if query[end] == "\\" else 1
+            masked.append(" " * (min(end, len(query) - 1) - i + 1))
+            i = end + 1
+            continue
+        if query.startswith("--", i) or ch == "#":
+            end = query.find("\n", i)
+            end = len(query) if end < 0 else end
+            masked.append(" " * (end - i))
+            i = end
+            continue
+        if query.startswith("/*", i):
+            end = query.find("*/", i + 2)
+            end = len(query) if end < 0 else end + 2
+            masked.append(" " * (end - i))
+            i = end
+            continue
+        if ch == "(":
+            depth += 1
+        masked.append(ch if depth == 0 else " ")
+        if ch == ")":
+            depth = max(depth - 1, 0)
+        i += 1
+    return "".join(masked)
+
+
+def cap_rows(query: str, cap: int) -> str:
+    """``query`` returning at most ``cap`` rows.
+
+    A top-level ``LIMIT`` above the cap is lowered to it; without one, a
+    ``LIMIT`` is added (ahead of a trailing locking clause).
+    """
+    query = query.rstrip().rstrip(";").rstrip()
+    top = _top_level(query)
+    limits = list(_LIMIT.finditer(top))
+    if limits:
+        last = limits[-1]
+        group = 2 if last.group(2) is not None else 1
+        if int(last.group(group)) <= cap:
+            return query
+        return query[:last.start(group)] + str(cap) + query[last.end(group):]
+    tail = _TAIL_CLAUSE.search(top)
+    at = tail.start() if tail else len(query)
+    # On its own line, so a trailing -- comment cannot swallow it
+    return f"{query[:at].rstrip()}\nLIMIT {int(cap)}\n{query[at:]}".rstrip()
+
+
+def estimate_examined_rows(conn, query: str) -> int:
+    """Estimate rows examined by ``query`` from its EXPLAIN plan.
+
+    The tables of a (nested-loop) join plan multiply: each row of one step is
+    probed against ``rows * filtered%`` rows of the next. Derived tables and
+    unions are approximated by the same product, which over-estimates and is
+    the safe direction for a budget check. Returns -1 when the backend cannot
+    EXPLAIN (anything but MySQL).
+    """
+    # Works with both a Session and a Core Connection
+    dialect = conn.get_bind().dialect if hasattr(conn, "get_bind") else conn.dialect
+    if dialect.name != "mysql":
+        return -1
+    plan = conn.execute(text("EXPLAIN " + query.rstrip(";"))).mappings().all()
+    estimate = 1.0
+    for step in plan:
+        rows = step.get("rows") or 1
+        filtered = step.get("filtered")
+        factor = rows * (float(filtered) / 100 if filtered is not None else 1.0)
+        estimate *= max(factor, 1.0)
+    return int(estimate)
+
+
+def check_cost(conn, query: str) -> None:
+    """Raise ``QueryRejected`` when ``query`` is expected to be too expensive"""
+    if CUSTOM_QUERY_MAX_EXAMINED_ROWS <= 0:
+        return
+    estimate = estimate_examined_rows(conn, query)
+    if estimate > CUSTOM_QUERY_MAX_EXAMINED_ROWS:
+        raise QueryRejected(
+            f"Query rejected: the optimizer estimates {estimate:,} rows examined, "
+            f"above the limit of {CUSTOM_QUERY_MAX_EXAMINED_ROWS:,}. "
+            f"Add filters, join conditions or a LIMIT."
+        )
@@ -0,0 +1,140 @@
+"""In-memory catalog of the reference tables (``Department`` and ``Service``).
+
+Both tables are small and rarely written, yet every page of the frontend
+lists them and every service request write checks its ``Service_ID``. The
+catalog keeps one immutable snapshot of each table per process, so those
+reads never reach the database.
+
+A snapshot is versioned by the result cache's tag counter for its table.
+The counter is bumped when a session that wrote the table commits (see
+``app.cache.install_session_hooks``) or when the custom query console runs a
+write. With ``CACHE_BACKEND=redis`` the counters are shared, so a write in
+one worker makes every worker reload. A snapshot is also reloaded after
+``REFERENCE_DATA_TTL_SECONDS``, which covers writes that bypass the
+application entirely.
+
+Each snapshot carries an ETag, a hash of its content, so it is the same in
+every worker and across restarts. The list endpoints answer a matching
+``If-None-Match`` with 304.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import select
+
+from app.cache import result_cache
+from app.http_cache import HTTP_CACHE_CONTROL, etag_matches
+from app.database import SessionLocal
+from app.models.department import Department
+from app.models.service import Service
+
+REFERENCE_DATA_TTL_SECONDS = int(os.getenv("REFERENCE_DATA_TTL_SECONDS", "300"))
+
+MODELS = {Department.__tablename__: Department, Service.__tablename__: Service}
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    rows: Tuple[dict, ...]
+    by_id: Dict[int, dict]
+    version: int
+    etag: str
+    loaded_at: float
+
+
+def _etag(rows) -> str:
+    digest = hashlib.sha1(json.dumps(rows, sort_keys=True, default=str).encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+class ReferenceCatalog:
+    """Per-process snapshots of the reference tables, reloaded when stale"""
+
+    def __init__(self, session_factory=SessionLocal, ttl: int = REFERENCE_DATA_TTL_SECONDS):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _version(table: str) -> int:
+        return result_cache.backend.get_counter("tag:" + table)
+
+    def _load(self, table: str) -> Snapshot:
+        model = MODELS[table]
+        columns = [c.key for c in model.__table__.columns]
+        pk = model.__table__.primary_key.columns.values()[0].key
+        # Read the version first: a write committed during the load bumps
+        # the counter past it, so the next read reloads again
+        version = self._version(table)
+        db = self.session_factory()
+        try:
+            objs = db.execute(select(model).order_by(getattr(model, pk))).scalars().all()
+            rows = tuple({c: getattr(obj, c) for c in columns} for obj in objs)
+        finally:
+            db.close()
+        return Snapshot(rows, {row[pk]: row for row in rows}, version, _etag(rows), time.monotonic())
+
+    def snapshot(self, table: str) -> Snapshot:
+        """The current snapshot of ``table``, reloading it if a write made it stale"""
+        current = self._snapshots.get(table)
+        if current is not None and current.version == self._version(table) \
+                and time.monotonic() - current.loaded_at < self.ttl:
+            return current
+        with self._lock:
+            current = self._snapshots.get(table)
+            if current is None or current.version != self._version(table) \
+                    or time.monotonic() - current.loaded_at >= self.ttl:
+                current = self._load(table)
+                self._snapshots[table] = current
+            return current
+
+    def load(self) -> None:
+        """Load every table now, e.g. at startup"""
+        for table in MODELS:
+            self.snapshot(table)
+
+    def get(self, table: str, key: int) -> Optional[dict]:
+        return self.snapshot(table).by_id.get(key)
+
+    def invalidate(self, *tables: str) -> None:
+        """Force a reload of ``tables`` (all of them by default) in every worker"""
+        result_cache.invalidate(*(tables or MODELS))
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            table: {"rows": len(s.rows), "version": s.version, "etag": s.etag,
+                    "age_seconds": round(now - s.loaded_at, 1)}
+            for table, s in self._snapshots.items()
+        }
+
+
+catalog = ReferenceCatalog()
+
+
+def departments() -> Snapshot:
+    return catalog.snapshot(Department.__tablename__)
+
+
+def services() -> Snapshot:
+    return catalog.snapshot(Service.__tablename__)
+
+
+def service_exists(service_id: int) -> bool:
+    return service_id in services().by_id
+
+
+def conditional(request: Request, response: Response, snapshot: Snapshot):
+    """The snapshot's rows with its ETag, or a bare 304 if the client has them"""
+    headers = {"ETag": snapshot.etag, "Cache-Control": HTTP_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return list(snapshot.rows)
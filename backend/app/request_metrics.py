@@ -0,0 +1,329 @@
+"""Per-route request and query instrumentation.
+
+``RequestMetricsMiddleware`` opens a ``RequestStats`` for every HTTP request
+in a context variable. SQLAlchemy ``before_cursor_execute`` /
+``after_cursor_execute`` listeners on the engines created in
+``app/database.py`` add each statement's duration and row count to it. The
+context variable follows the request into threadpool endpoints and async
+sessions alike. When the response starts, the totals are folded into the
+histograms for the matched route template (``/api/citizens/{citizen_id}``,
+not the concrete URL) and returned to the client as a ``Server-Timing``
+header.
+
+Two patterns are flagged and logged with their bound statements:
+
+* slow queries, slower than ``SLOW_QUERY_MS``;
+* N+1 patterns, where one statement runs ``N_PLUS_ONE_THRESHOLD`` or more
+  times within a single request.
+
+Everything is rendered in the Prometheus text format by ``render_prometheus``
+(served at ``/metrics``).
+"""
+import collections
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.pool_metrics import pool_stats
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+# How many flagged statements are kept for /api/metrics/requests
+FLAGGED_HISTORY = int(os.getenv("REQUEST_METRICS_FLAGGED_HISTORY", "100"))
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Upper bounds of the queries-per-request histogram buckets
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+_MAX_PARAMS_CHARS = 500
+
+
+class RequestStats:
+    """DB work done on behalf of one HTTP request"""
+
+    __slots__ = ("started", "db_seconds", "queries", "rows", "statements")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        # statement -> [executions, bound parameters (of the slowest slow run, else
+        # the first), slowest slow run in seconds or 0.0]
+        self.statements: Dict[str, list] = {}
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram (not thread-safe on its own)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, out = 0, []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            out.append((str(bound), total))
+        return out
+
+
+class RouteMetrics:
+    """Aggregates for one (method, route template)"""
+
+    def __init__(self):
+        self.responses: Dict[str, int] = collections.Counter()
+        self.wall = Histogram(LATENCY_BUCKETS_S)
+        self.db = Histogram(LATENCY_BUCKETS_S)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.rows = 0
+        self.n_plus_one = 0
+        self.slow_queries = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.wall.count,
+            "responses": dict(self.responses),
+            "wall_ms_mean": round(self.wall.sum / self.wall.count * 1000, 3) if self.wall.count else 0.0,
+            "db_ms_mean": round(self.db.sum / self.db.count * 1000, 3) if self.db.count else 0.0,
+            "queries_mean": round(self.queries.sum / self.queries.count, 2) if self.queries.count else 0.0,
+            "rows_returned": self.rows,
+            "n_plus_one": self.n_plus_one,
+            "slow_queries": self.slow_queries,
+        }
+
+
+_lock = threading.Lock()
+_routes: Dict[Tuple[str, str], RouteMetrics] = {}
+_flagged: Deque[dict] = collections.deque(maxlen=FLAGGED_HISTORY)
+_background_slow_queries = 0
+
+
+def _route(method: str, template: str) -> RouteMetrics:
+    key = (method, template)
+    if key not in _routes:
+        _routes[key] = RouteMetrics()
+    return _routes[key]
+
+
+def _bound(parameters) -> str:
+    text = repr(parameters)
+    return text if len(text) <= _MAX_PARAMS_CHARS else text[:_MAX_PARAMS_CHARS] + "..."
+
+
+def _flag(kind: str, route: str, statement: str, parameters, **extra) -> None:
+    entry = {"kind": kind, "route": route, "statement": statement, "parameters": _bound(parameters),
+             "at": time.time(), **extra}
+    with _lock:
+        _flagged.append(entry)
+    logger.warning("%s on %s: %s | params=%s %s", kind, route, statement, entry["parameters"], extra)
+
+
+# -- SQLAlchemy hooks ---------------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    global _background_slow_queries
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats = _current.get()
+    slow = elapsed * 1000 >= SLOW_QUERY_MS
+
+    if stats is None:
+        # Background work (reconciler, scripts): only slow statements matter
+        if slow:
+            with _lock:
+                _background_slow_queries += 1
+            _flag("slow_query", "-", statement, parameters, ms=round(elapsed * 1000, 1))
+        return
+
+    stats.db_seconds += elapsed
+    stats.queries += 1
+    # Drivers that buffer results (pymysql, aiomysql) report the row count of
+    # a SELECT up front; sqlite reports -1 and is not counted
+    if cursor.description is not None and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    seen = stats.statements.get(statement)
+    if seen is None:
+        stats.statements[statement] = [1, parameters, 0.0]
+        seen = stats.statements[statement]
+    else:
+        seen[0] += 1
+    if slow and elapsed > seen[2]:
+        seen[1], seen[2] = parameters, elapsed
+
+
+def instrument_engine(engine) -> None:
+    """Attach the query timing listeners to a sync engine (or an async engine's ``sync_engine``)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# -- Middleware -----------------------------------------------------------------
+
+def _finish(method: str, template: str, status: int, stats: RequestStats) -> float:
+    wall = time.perf_counter() - stats.started
+    slow = [(stmt, params, secs) for stmt, (count, params, secs) in stats.statements.items() if secs]
+    repeated = [(stmt, count, params) for stmt, (count, params, _) in stats.statements.items()
+                if count >= N_PLUS_ONE_THRESHOLD]
+    with _lock:
+        route = _route(method, template)
+        route.responses[str(status)] += 1
+        route.wall.observe(wall)
+        route.db.observe(stats.db_seconds)
+        route.queries.observe(stats.queries)
+        route.rows += stats.rows
+        route.slow_queries += len(slow)
+        route.n_plus_one += len(repeated)
+    label = f"{method} {template}"
+    for stmt, params, secs in slow:
+        _flag("slow_query", label, stmt, params, ms=round(secs * 1000, 1))
+    for stmt, count, params in repeated:
+        _flag("n_plus_one", label, stmt, params, executions=count)
+    return wall
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording per-route timings and adding ``Server-Timing``"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        recorded = False
+
+        def record(status: int) -> float:
+            nonlocal recorded
+            recorded = True
+            # FastAPI stores the matched route on the scope during routing
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            return _finish(scope["method"], template, status, stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and not recorded:
+                wall = record(message["status"])
+                timing = (f'app;dur={wall * 1000:.1f}, '
+                          f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"')
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception:
+            if not recorded:
+                record(500)
+            raise
+        finally:
+            _current.reset(token)
+
+
+# -- Export ---------------------------------------------------------------------
+
+def request_stats() -> dict:
+    """JSON snapshot: per-route aggregates and recently flagged statements"""
+    with _lock:
+        routes = [{"method": m, "route": t, **r.snapshot()} for (m, t), r in sorted(_routes.items())]
+        flagged = list(_flagged)
+    return {"routes": routes, "flagged": flagged[::-1],
+            "thresholds": {"slow_query_ms": SLOW_QUERY_MS, "n_plus_one": N_PLUS_ONE_THRESHOLD}}
+
+
+def _labels(**labels) -> str:
+    escaped = {k: str(v).replace("\\", "\\\\").replace('"', '\\"') for k, v in labels.items()}
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped.items()) + "}"
+
+
+def _histogram_lines(name: str, hist: Histogram, **labels) -> List[str]:
+    lines = [f"{name}_bucket{_labels(**labels, le=le)} {count}" for le, count in hist.cumulative()]
+    lines.append(f"{name}_sum{_labels(**labels)} {hist.sum}")
+    lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """All request, query and pool metrics in the Prometheus text exposition format"""
+    out: List[str] = []
+
+    def family(name: str, kind: str, help_text: str, lines: List[str]) -> None:
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(lines)
+
+    with _lock:
+        routes = sorted(_routes.items())
+        family("http_requests_total", "counter", "HTTP responses by route template and status", [
+            f"http_requests_total{_labels(method=m, route=t, status=s)} {n}"
+            for (m, t), r in routes for s, n in sorted(r.responses.items())
+        ])
+        family("http_request_duration_seconds", "histogram", "Wall time per request", [
+            line for (m, t), r in routes for line in _histogram_lines("http_request_duration_seconds", r.wall, method=m, route=t)
+        ])
+        family("http_request_db_seconds", "histogram", "Time spent in database calls per request", [
+            line for (m, t), r in routes for line in _histogram_lines("http_request_db_seconds", r.db, method=m, route=t)
+        ])
+        family("http_request_db_queries", "histogram", "Database statements executed per request", [
+            line for (m, t), r in routes for line in _histogram_lines("http_request_db_queries", r.queries, method=m, route=t)
+        ])
+        family("http_request_db_rows_total", "counter", "Rows returned by SELECT statements", [
+            f"http_request_db_rows_total{_labels(method=m, route=t)} {r.rows}" for (m, t), r in routes
+        ])
+        family("db_n_plus_one_total", "counter", "Statements repeated N_PLUS_ONE_THRESHOLD+ times in one request", [
+            f"db_n_plus_one_total{_labels(method=m, route=t)} {r.n_plus_one}" for (m, t), r in routes
+        ])
+        family("db_slow_queries_total", "counter", f"Statements slower than {SLOW_QUERY_MS:g} ms", [
+            f"db_slow_queries_total{_labels(method=m, route=t)} {r.slow_queries}" for (m, t), r in routes
+        ] + [f'db_slow_queries_total{_labels(method="", route="background")} {_background_slow_queries}'])
+
+    pools = pool_stats()
+    for gauge, key, help_text in (
+        ("db_pool_size", "size", "Configured pool size"),
+        ("db_pool_checked_out", "checked_out", "Connections currently checked out"),
+        ("db_pool_overflow", "overflow", "Overflow connections currently open"),
+    ):
+        family(gauge, "gauge", help_text, [
+            f"{gauge}{_labels(pool=p['name'])} {p[key]}" for p in pools if key in p
+        ])
+    wait_lines = []
+    for p in pools:
+        wait = p["checkout_wait"]
+        for bound, count in wait["buckets_ms"].items():
+            le = bound if bound == "+Inf" else str(float(bound) / 1000)
+            wait_lines.append(f"db_pool_checkout_wait_seconds_bucket{_labels(pool=p['name'], le=le)} {count}")
+        wait_lines.append(f"db_pool_checkout_wait_seconds_sum{_labels(pool=p['name'])} {wait['sum_ms'] / 1000}")
+        wait_lines.append(f"db_pool_checkout_wait_seconds_count{_labels(pool=p['name'])} {wait['count']}")
+    family("db_pool_checkout_wait_seconds", "histogram", "Time waiting for a pooled connection", wait_lines)
+    family("db_pool_checkout_timeouts_total", "counter", "Checkouts that hit pool_timeout", [
+        f"db_pool_checkout_timeouts_total{_labels(pool=p['name'])} {p['checkout_wait']['timeouts']}" for p in pools
+    ])
+    return "\n".join(out) + "\n"
@@ -1,45 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
-from typing import List
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional
+from app.bulk import ingest_stream
+from app import citizen_summary, dashboard_counters, fast_json, search
+from app.database import get_async_db, get_db
+from app.http_cache import cached
+from app.id_allocator import id_allocator
+from app.pagination import keyset_paginate
 from app.models.citizen import Citizen as CitizenModel
-from app.schemas.schemas import Citizen, CitizenCreate
+from app.schemas.schemas import Citizen, CitizenCreate, CitizenSearchHit, BulkIngestResult
 
 router = APIRouter(prefix="/citizens", tags=["citizens"])
 
-@router.get("/", response_model=List[Citizen])
-def get_citizens(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=List[Citizen], dependencies=[cached("Citizen")])
+async def get_citizens(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
     """Get all citizens"""
     # Return newest-first so newly created citizens appear on the first page
-    citizens = (
-        db.query(CitizenModel)
-        .order_by(CitizenModel.Citizen_ID.desc())
-        .offset(skip)
-        .all()
+    page = await keyset_paginate(
+        db,
+        select(CitizenModel.__table__),
+        [CitizenModel.Citizen_ID],
+        limit,
+        cursor=cursor,
+        response=response,
+        skip=skip,
+        scalars=False,
     )
-    return citizens
+    return fast_json.respond(page, response)
 
-@router.get("/{citizen_id}")
+@router.get("/search", response_model=List[CitizenSearchHit], dependencies=[cached("Citizen")])
+async def search_citizens(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Search citizens by name, email, phone or Aadhaar prefix, best match first"""
+    hits = await search.search_citizens(db, q, limit, cursor=cursor, response=response)
+    return fast_json.respond(hits, response)
+
+@router.get("/{citizen_id}", dependencies=[cached("Citizen", "citizen_summary")])
 def get_citizen(citizen_id: int, db: Session = Depends(get_db)):
-    """Get a specific citizen by ID and include stored-procedure summary (if available).
+    """Get a specific citizen by ID together with their activity summary.
 
-    This endpoint now uses the stored procedure `sp_get_citizen_summary` to fetch
-    aggregated information about the citizen (total requests, grievances, total paid)
-    and returns a combined JSON with the citizen record + summary. This keeps the
-    functionality inside the backend and demonstrates use of the project's procedures.
+    The summary (total requests, grievances, total paid, last activity) comes
+    from the ``citizen_summary`` projection, joined to the citizen row in a
+    single primary-key lookup, instead of running ``sp_get_citizen_summary``
+    on every profile view.
     """
-    citizen = db.query(CitizenModel).filter(CitizenModel.Citizen_ID == citizen_id).first()
-    if citizen is None:
+    found = citizen_summary.lookup(db, citizen_id)
+    if found is None:
         raise HTTPException(status_code=404, detail="Citizen not found")
-
-    # Try to call stored procedure for summary; if it fails, return citizen alone
-    try:
-        res = db.execute(text("CALL sp_get_citizen_summary(:id)"), {"id": citizen_id})
-        rows = [dict(r._mapping) for r in res]
-        summary = rows[0] if rows else None
-    except Exception:
-        summary = None
+    citizen, summary = found
 
     data = {
         "citizen": {
@@ -49,23 +70,28 @@ def get_citizen(citizen_id: int, db: Session = Depends(get_db)):
             "Phone": getattr(citizen, 'Phone', None),
             "Address": getattr(citizen, 'Address', None),
         },
-        "summary": summary
+        "summary": {"Citizen_ID": citizen.Citizen_ID, "Name": citizen.Name, "Email": citizen.Email, **summary},
     }
     return data
 
 @router.post("/", response_model=Citizen)
 def create_citizen(citizen: CitizenCreate, db: Session = Depends(get_db)):
     """Create a new citizen"""
-    # Get the next ID
-    max_id = db.query(func.max(CitizenModel.Citizen_ID)).scalar()
-    next_id = (max_id or 0) + 1
+    # Take the next ID from this worker's reserved block
+    next_id = id_allocator.next_id(CitizenModel)
     
     db_citizen = CitizenModel(Citizen_ID=next_id, **citizen.model_dump())
     db.add(db_citizen)
+    dashboard_counters.record_change(db, CitizenModel, after={})
     db.commit()
     db.refresh(db_citizen)
     return db_citizen
 
+@router.post("/bulk", response_model=BulkIngestResult)
+async def bulk_create_citizens(request: Request, db: Session = Depends(get_db)):
+    """Bulk-create citizens from an NDJSON (default) or CSV (Content-Type: text/csv) upload"""
+    return await ingest_stream(request, db, CitizenModel, CitizenCreate)
+
 @router.put("/{citizen_id}", response_model=Citizen)
 def update_citizen(citizen_id: int, citizen: CitizenCreate, db: Session = Depends(get_db)):
     """Update a citizen"""
@@ -88,5 +114,6 @@ def delete_citizen(citizen_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Citizen not found")
     # Delete the citizen (database triggers will cascade to related tables)
     db.delete(db_citizen)
+    dashboard_counters.record_change(db, CitizenModel, before={})
     db.commit()
     return {"message": "Citizen deleted successfully (related records handled by DB triggers)"}
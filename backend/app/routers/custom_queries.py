@@ -1,9 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from pydantic import BaseModel
 from typing import List, Dict, Any
-from app.database import get_db
+from app.cache import result_cache
+from app.reference_data import catalog as reference_catalog
+from app.database import custom_query_engine, custom_query_replicas, get_custom_query_db
+from app.db_routing import prefer_replica, read_engine
+from app.http_cache import cached
+from app.query_export import ENCODERS, EXPORT_CHUNK_ROWS, MEDIA_TYPES, column_types, rows_to_dicts
+from app import query_governor
+from app.query_governor import QueryRejected
 
 router = APIRouter(prefix="/custom-queries", tags=["custom-queries"])
 
@@ -16,10 +24,11 @@ class QueryResponse(BaseModel):
     columns: List[str] = []
     data: List[Dict[str, Any]] = []
     rows_affected: int = 0
+    truncated: bool = False
 
 @router.post("/execute", response_model=QueryResponse)
-def execute_custom_query(query_request: QueryRequest, db: Session = Depends(get_db)):
-    """Execute a custom SQL query"""
+def execute_custom_query(query_request: QueryRequest, db: Session = Depends(get_custom_query_db)):
+    """Execute a custom SQL query on the custom query pool, within its guardrails"""
     try:
         query = query_request.query.strip()
         
@@ -33,41 +42,53 @@ def execute_custom_query(query_request: QueryRequest, db: Session = Depends(get_
         # Check if it's a SELECT query
         is_select = query.upper().startswith('SELECT')
         
-        # Execute the query
-        result = db.execute(text(query))
+        # Refuse SELECTs the optimizer expects to be too expensive
+        if is_select:
+            # Read-only console queries can run on a replica
+            prefer_replica(db)
+            query_governor.check_cost(db, query)
+
+        # Execute the query. SELECTs use a server-side cursor, as the export
+        # does, and carry the row cap as a LIMIT (one extra row tells us
+        # whether the result was cut off): closing a server-side cursor early
+        # would read the rest of the result off the wire
+        max_rows = query_governor.CUSTOM_QUERY_MAX_ROWS
+        if is_select:
+            query = query_governor.cap_rows(query, max_rows + 1)
+        result = db.execute(text(query), execution_options={"stream_results": is_select})
         
         if is_select:
-            # For SELECT queries, fetch all results
-            rows = result.fetchall()
+            # For SELECT queries, fetch up to the row cap
+            rows = result.fetchmany(max_rows + 1)
+            truncated = len(rows) > max_rows
+            rows = rows[:max_rows]
             columns = list(result.keys()) if rows else []
+            types = column_types(result) if rows else []
+            result.close()
             
-            # Convert rows to list of dictionaries
-            data = []
-            for row in rows:
-                row_dict = {}
-                for i, col in enumerate(columns):
-                    value = row[i]
-                    # Convert non-serializable types
-                    if hasattr(value, 'isoformat'):  # datetime/date objects
-                        value = value.isoformat()
-                    elif isinstance(value, bytes):
-                        value = value.decode('utf-8', errors='ignore')
-                    row_dict[col] = value
-                data.append(row_dict)
+            # Convert rows to list of dictionaries, one converter per column
+            data = rows_to_dicts(columns, rows, types)
             
             db.commit()
             
+            message = f"Query executed successfully. {len(rows)} rows returned."
+            if truncated:
+                message += f" Result truncated to the first {max_rows} rows."
             return QueryResponse(
                 success=True,
-                message=f"Query executed successfully. {len(rows)} rows returned.",
+                message=message,
                 columns=columns,
                 data=data,
-                rows_affected=len(rows)
+                rows_affected=len(rows),
+                truncated=truncated
             )
         else:
             # For INSERT, UPDATE, DELETE queries
             db.commit()
             rows_affected = result.rowcount
+            # Arbitrary SQL may touch any table, so drop every cached result
+            result_cache.invalidate_all()
+            reference_catalog.invalidate()
             
             return QueryResponse(
                 success=True,
@@ -77,6 +98,9 @@ def execute_custom_query(query_request: QueryRequest, db: Session = Depends(get_
                 rows_affected=rows_affected
             )
             
+    except QueryRejected as e:
+        db.rollback()
+        return QueryResponse(success=False, message=str(e))
     except Exception as e:
         db.rollback()
         error_message = str(e)
@@ -93,7 +117,66 @@ def execute_custom_query(query_request: QueryRequest, db: Session = Depends(get_
             rows_affected=0
         )
 
-@router.get("/sample-queries")
+@router.post("/export")
+def export_custom_query(query_request: QueryRequest, format: str = "ndjson"):
+    """Stream the result of a SELECT query as NDJSON, CSV or Arrow IPC.
+
+    Rows are read through a server-side cursor and encoded chunk by chunk,
+    so memory use does not grow with the size of the result. The query is
+    limited to CUSTOM_QUERY_EXPORT_MAX_ROWS rows.
+    """
+    if format not in ENCODERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Must be one of: {', '.join(ENCODERS)}")
+    if format == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Arrow export requires the pyarrow package")
+
+    query = query_request.query.strip()
+    if ';' in query[:-1]:
+        raise HTTPException(
+            status_code=400,
+            detail="Multiple statements not allowed. Execute one query at a time."
+        )
+    if not query.upper().startswith('SELECT'):
+        raise HTTPException(status_code=400, detail="Only SELECT queries can be exported")
+
+    # A dedicated connection (on a replica when one is fresh enough): the
+    # streamed body outlives the request's session
+    conn = read_engine(custom_query_engine, custom_query_replicas).connect().execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS)
+    try:
+        query_governor.check_cost(conn, query)
+        result = conn.execute(text(query_governor.cap_rows(query, query_governor.CUSTOM_QUERY_EXPORT_MAX_ROWS)))
+    except QueryRejected as e:
+        conn.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        conn.close()
+        raise HTTPException(status_code=400, detail=f"Query execution failed: {getattr(e, 'orig', e)}")
+    columns = list(result.keys())
+    types = column_types(result)
+
+    def chunks():
+        remaining = query_governor.CUSTOM_QUERY_EXPORT_MAX_ROWS
+        try:
+            for part in result.partitions(EXPORT_CHUNK_ROWS):
+                if len(part) >= remaining:
+                    yield part[:remaining]
+                    break
+                remaining -= len(part)
+                yield part
+        finally:
+            result.close()
+            conn.close()
+
+    return StreamingResponse(
+        ENCODERS[format](columns, types, chunks()),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="query_result.{format}"'},
+    )
+
+@router.get("/sample-queries", dependencies=[cached()])
 def get_sample_queries():
     """Get sample SQL queries for reference"""
     return {
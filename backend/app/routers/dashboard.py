@@ -1,110 +1,141 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
-from typing import List, Dict, Any
+from sqlalchemy import text
+from datetime import date, timedelta
+from typing import List, Dict, Any, Optional
+import os
+from app import department_rollup, fast_json, live_updates, monthly_trends, reference_data
+from app.cache import result_cache
 from app.database import get_db
-from app.models.citizen import Citizen
-from app.models.service_request import ServiceRequest
-from app.models.grievance import Grievance
-from app.models.payment import Payment
+from app.http_cache import cached
+from app.single_flight import single_flight
+from app.dashboard_counters import read_counters, reconcile
 from app.schemas.schemas import DashboardStats
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
-@router.get("/stats", response_model=DashboardStats)
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    """Get dashboard statistics"""
-    total_citizens = db.query(func.count(Citizen.Citizen_ID)).scalar()
-    total_requests = db.query(func.count(ServiceRequest.Request_ID)).scalar()
-    total_grievances = db.query(func.count(Grievance.Grievance_ID)).scalar()
-    
-    # Calculate total revenue from completed payments
-    total_revenue = db.query(func.sum(Payment.Amount)).filter(
-        Payment.Status == 'Completed'
-    ).scalar() or 0.0
-    
-    # Count pending requests
-    pending_requests = db.query(func.count(ServiceRequest.Request_ID)).filter(
-        ServiceRequest.Status.in_(['Pending', 'Processing'])
-    ).scalar()
-    
-    # Count open grievances
-    open_grievances = db.query(func.count(Grievance.Grievance_ID)).filter(
-        Grievance.Status.in_(['Open', 'In Progress'])
-    ).scalar()
-    
+def _stats_response(counters) -> DashboardStats:
     return DashboardStats(
-        total_citizens=total_citizens,
-        total_requests=total_requests,
-        total_grievances=total_grievances,
-        total_revenue=float(total_revenue),
-        pending_requests=pending_requests,
-        open_grievances=open_grievances
+        total_citizens=int(counters["total_citizens"]),
+        total_requests=int(counters["total_requests"]),
+        total_grievances=int(counters["total_grievances"]),
+        total_revenue=float(counters["total_revenue"] or 0),
+        pending_requests=int(counters["pending_requests"]),
+        open_grievances=int(counters["open_grievances"])
     )
 
-@router.get("/recent-requests")
-def get_recent_requests(limit: int = 10, db: Session = Depends(get_db)):
+@router.get("/stats", response_model=DashboardStats, dependencies=[cached("dashboard_counter")])
+def get_dashboard_stats(db: Session = Depends(get_db)):
+    """Get dashboard statistics from the incrementally maintained counters"""
+    counters = result_cache.shared("dashboard.stats", lambda: read_counters(db), tags=("dashboard_counter",))
+    return _stats_response(counters)
+
+@router.post("/stats/reconcile", response_model=DashboardStats)
+def reconcile_dashboard_stats(db: Session = Depends(get_db)):
+    """Recount the dashboard statistics from the tables and fix any drift"""
+    return _stats_response(reconcile(db))
+
+# Recent requests are looked up within the last RECENT_REQUESTS_WINDOW_DAYS
+# first, so only the newest monthly partitions are read (app/partitioning.py);
+# the unbounded query is the fallback when the window holds too few rows.
+# 0 disables the window.
+RECENT_REQUESTS_WINDOW_DAYS = int(os.getenv("RECENT_REQUESTS_WINDOW_DAYS", "90"))
+
+_RECENT_REQUESTS = """
+    SELECT 
+        sr.Request_ID,
+        c.Name AS Citizen_Name,
+        s.Service_Name,
+        d.Department_Name,
+        sr.Request_Date,
+        sr.Status,
+        p.Amount,
+        p.Payment_Method
+    FROM Service_Request sr
+    INNER JOIN Citizen c ON sr.Citizen_ID = c.Citizen_ID
+    INNER JOIN Service s ON sr.Service_ID = s.Service_ID
+    INNER JOIN Department d ON s.Department_ID = d.Department_ID
+    LEFT JOIN Payment p ON sr.Payment_ID = p.Payment_ID
+    {where}
+    ORDER BY sr.Request_Date DESC
+    LIMIT :limit
+"""
+RECENT_REQUESTS_SQL = text(_RECENT_REQUESTS.format(where=""))
+RECENT_REQUESTS_WINDOW_SQL = text(_RECENT_REQUESTS.format(where="WHERE sr.Request_Date >= :since"))
+
+def _recent_requests(db: Session, limit: int) -> List[Dict[str, Any]]:
+    if RECENT_REQUESTS_WINDOW_DAYS > 0:
+        since = date.today() - timedelta(days=RECENT_REQUESTS_WINDOW_DAYS)
+        rows = db.execute(RECENT_REQUESTS_WINDOW_SQL, {"limit": limit, "since": since}).all()
+        if len(rows) >= limit:
+            return [dict(row._mapping) for row in rows]
+    return [dict(row._mapping) for row in db.execute(RECENT_REQUESTS_SQL, {"limit": limit})]
+
+@router.get("/recent-requests", dependencies=[cached("Service_Request", "Citizen", "Service", "Department", "Payment")])
+def get_recent_requests(response: Response, limit: int = 10, db: Session = Depends(get_db)):
     """Get recent service requests with details"""
-    query = text("""
-        SELECT 
-            sr.Request_ID,
-            c.Name AS Citizen_Name,
-            s.Service_Name,
-            d.Department_Name,
-            sr.Request_Date,
-            sr.Status,
-            p.Amount,
-            p.Payment_Method
-        FROM Service_Request sr
-        INNER JOIN Citizen c ON sr.Citizen_ID = c.Citizen_ID
-        INNER JOIN Service s ON sr.Service_ID = s.Service_ID
-        INNER JOIN Department d ON s.Department_ID = d.Department_ID
-        LEFT JOIN Payment p ON sr.Payment_ID = p.Payment_ID
-        ORDER BY sr.Request_Date DESC
-        LIMIT :limit
-    """)
-    
-    result = db.execute(query, {"limit": limit})
-    return [dict(row._mapping) for row in result]
+    rows = result_cache.get_or_compute(
+        "dashboard.recent_requests",
+        lambda: _recent_requests(db, limit),
+        tags=("Service_Request", "Citizen", "Service", "Department", "Payment"),
+        params={"limit": limit},
+    )
+    return fast_json.respond(rows, response)
 
-@router.get("/department-performance")
-def get_department_performance(db: Session = Depends(get_db)):
-    """Get department performance metrics"""
-    query = text("""
-        SELECT 
-            d.Department_Name,
-            COUNT(sr.Request_ID) AS Total_Requests,
-            COUNT(CASE WHEN sr.Status = 'Completed' THEN 1 END) AS Completed_Requests,
-            COUNT(CASE WHEN sr.Status = 'Pending' THEN 1 END) AS Pending_Requests,
-            COALESCE(SUM(p.Amount), 0) AS Total_Revenue,
-            ROUND(COUNT(CASE WHEN sr.Status = 'Completed' THEN 1 END) * 100.0 / 
-                  NULLIF(COUNT(sr.Request_ID), 0), 2) AS Completion_Rate
-        FROM Department d
-        LEFT JOIN Service s ON d.Department_ID = s.Department_ID
-        LEFT JOIN Service_Request sr ON s.Service_ID = sr.Service_ID
-        LEFT JOIN Payment p ON sr.Payment_ID = p.Payment_ID AND p.Status = 'Completed'
-        GROUP BY d.Department_ID, d.Department_Name
-        ORDER BY Total_Requests DESC
-    """)
-    
-    result = db.execute(query)
-    return [dict(row._mapping) for row in result]
+@router.get("/department-performance", dependencies=[cached("Department", "Service", "department_daily_rollup")])
+def get_department_performance(
+    response: Response,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """Get department performance metrics, optionally for a Request_Date range.
+
+    Merged from the daily department/service/status buckets of the
+    department_daily_rollup table rather than joining the fact tables.
+    """
+    rows = result_cache.get_or_compute(
+        "dashboard.department_performance",
+        lambda: department_rollup.department_performance(db, start_date, end_date),
+        tags=("Department", "Service", "department_daily_rollup"),
+        params={"start": str(start_date), "end": str(end_date)},
+    )
+    return fast_json.respond(rows, response)
+
+@router.get("/monthly-trends", dependencies=[cached("Service_Request", "Payment")])
+def get_monthly_trends(response: Response, months: int = 12, approximate: bool = False,
+                       db: Session = Depends(get_db)):
+    """Get monthly service request trends.
+
+    Finished months come frozen from the monthly_trend table; only the open
+    month is aggregated. ``approximate`` counts unique citizens with
+    HyperLogLog sketches instead of COUNT(DISTINCT).
+    """
+    rows = result_cache.get_or_compute(
+        "dashboard.monthly_trends",
+        lambda: monthly_trends.monthly_trends(db, months=max(1, min(months, 120)), approximate=approximate),
+        tags=("Service_Request", "Payment"),
+        params={"months": months, "approximate": approximate},
+    )
+    return fast_json.respond(rows, response)
+
+@router.get("/stream")
+async def stream_dashboard_updates(request: Request):
+    """Server-sent events with coalesced dashboard changes (see app/live_updates.py)"""
+    return StreamingResponse(
+        live_updates.broker.events(request),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-@router.get("/monthly-trends")
-def get_monthly_trends(db: Session = Depends(get_db)):
-    """Get monthly service request trends"""
-    query = text("""
-        SELECT 
-            DATE_FORMAT(sr.Request_Date, '%Y-%m') AS Month,
-            COUNT(sr.Request_ID) AS Total_Requests,
-            COALESCE(SUM(p.Amount), 0) AS Total_Revenue,
-            COUNT(DISTINCT sr.Citizen_ID) AS Unique_Citizens
-        FROM Service_Request sr
-        LEFT JOIN Payment p ON sr.Payment_ID = p.Payment_ID AND p.Status = 'Completed'
-        GROUP BY DATE_FORMAT(sr.Request_Date, '%Y-%m')
-        ORDER BY Month DESC
-        LIMIT 12
-    """)
-    
-    result = db.execute(query)
-    return [dict(row._mapping) for row in result]
+@router.get("/cache-stats")
+def get_cache_stats():
+    """Hit/miss and invalidation counters of the analytics result cache, and query coalescing"""
+    return {
+        **result_cache.stats(),
+        "reference_data": reference_data.catalog.stats(),
+        "single_flight": single_flight.stats(),
+        "live_updates": live_updates.broker.stats(),
+    }
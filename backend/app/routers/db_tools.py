@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from typing import List
-from pydantic import BaseModel
+from datetime import date
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from app import citizen_summary, department_rollup, fast_json, function_batches, history
+from app.cache import result_cache
 from app.database import get_db
+from app.db_routing import prefer_replica
+from app import http_cache
+from app.http_cache import cached
 
 router = APIRouter(prefix="/db", tags=["db-tools"])
 
@@ -13,22 +19,41 @@ class MarkGrievanceResolvedRequest(BaseModel):
     resolved_by: str
 
 
-@router.get("/procedures/citizen_summary")
+class FunctionBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=function_batches.FUNCTION_BATCH_MAX_IDS)
+
+
+@router.get("/procedures/citizen_summary", dependencies=[cached("Citizen", "citizen_summary")])
 def call_sp_get_citizen_summary(citizen_id: int, db: Session = Depends(get_db)):
-    """Call stored procedure sp_get_citizen_summary(IN p_citizen_id INT)"""
+    """Result of sp_get_citizen_summary(IN p_citizen_id INT), served from the citizen_summary projection"""
     try:
-        res = db.execute(text("CALL sp_get_citizen_summary(:id)"), {"id": citizen_id})
-        rows = res.mappings().all()
-        return rows
+        summary = result_cache.shared(
+            "db.procedures.citizen_summary",
+            lambda: citizen_summary.read(db, citizen_id),
+            tags=("Citizen", "citizen_summary"),
+            params={"citizen_id": citizen_id},
+        )
+        return [summary] if summary else []
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/procedures/department_stats")
-def call_sp_get_department_stats(department_id: int, db: Session = Depends(get_db)):
+@router.get("/procedures/department_stats", dependencies=[cached("Department", "Service", "department_daily_rollup")])
+def call_sp_get_department_stats(
+    department_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """Result of sp_get_department_stats(IN p_department_id INT), merged from the department_daily_rollup buckets"""
     try:
-        res = db.execute(text("CALL sp_get_department_stats(:id)"), {"id": department_id})
-        return res.mappings().all()
+        stats = result_cache.shared(
+            "db.procedures.department_stats",
+            lambda: department_rollup.department_stats(db, department_id, start_date, end_date),
+            tags=("Department", "Service", "department_daily_rollup"),
+            params={"department_id": department_id, "start": str(start_date), "end": str(end_date)},
+        )
+        return [stats] if stats else []
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -38,6 +63,7 @@ def call_sp_mark_grievance_resolved(request: MarkGrievanceResolvedRequest, db: S
     try:
         db.execute(text("CALL sp_mark_grievance_resolved(:gid, :by)"), {"gid": request.grievance_id, "by": request.resolved_by})
         db.commit()
+        result_cache.invalidate("Grievance")
         return {"message": "Grievance marked resolved", "grievance_id": request.grievance_id}
     except Exception as e:
         db.rollback()
@@ -45,52 +71,81 @@ def call_sp_mark_grievance_resolved(request: MarkGrievanceResolvedRequest, db: S
 
 
 # Functions
-@router.get("/functions/total_paid")
+def _function_row(name: str, sql: str, entity_id: int, tags: tuple, db: Session) -> dict:
+    """The single row of a stored function call, shared by identical concurrent calls"""
+    return result_cache.shared(
+        f"db.functions.{name}",
+        lambda: dict(db.execute(text(sql), {"id": entity_id}).mappings().first() or {}),
+        tags=tags,
+        params={"id": entity_id},
+    )
+
+
+@router.get("/functions/total_paid", dependencies=[cached(*history.REQUEST_TABLES, *history.PAYMENT_TABLES)])
 def fn_total_paid_by_citizen(citizen_id: int, db: Session = Depends(get_db)):
     try:
-        res = db.execute(text("SELECT fn_total_paid_by_citizen(:id) AS total"), {"id": citizen_id})
-        row = res.mappings().first()
-        return row or {}
+        return _function_row("total_paid", "SELECT fn_total_paid_by_citizen(:id) AS total", citizen_id,
+                             (*history.REQUEST_TABLES, *history.PAYMENT_TABLES), db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/functions/count_requests")
+@router.get("/functions/count_requests", dependencies=[cached(*history.REQUEST_TABLES)])
 def fn_count_requests_by_citizen(citizen_id: int, db: Session = Depends(get_db)):
     try:
-        res = db.execute(text("SELECT fn_count_requests_by_citizen(:id) AS cnt"), {"id": citizen_id})
-        return res.mappings().first() or {}
+        return _function_row("count_requests", "SELECT fn_count_requests_by_citizen(:id) AS cnt", citizen_id,
+                             history.REQUEST_TABLES, db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/functions/avg_payment")
+@router.get("/functions/avg_payment", dependencies=[cached(*history.REQUEST_TABLES, *history.PAYMENT_TABLES)])
 def fn_avg_payment_by_service(service_id: int, db: Session = Depends(get_db)):
     try:
-        res = db.execute(text("SELECT fn_avg_payment_by_service(:id) AS avg_amt"), {"id": service_id})
-        return res.mappings().first() or {}
+        return _function_row("avg_payment", "SELECT fn_avg_payment_by_service(:id) AS avg_amt", service_id,
+                             (*history.REQUEST_TABLES, *history.PAYMENT_TABLES), db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/functions/open_grievances")
+@router.get("/functions/open_grievances", dependencies=[cached("Grievance")])
 def fn_open_grievances_by_department(department_id: int, db: Session = Depends(get_db)):
     try:
-        res = db.execute(text("SELECT fn_open_grievances_by_department(:id) AS open_cnt"), {"id": department_id})
-        return res.mappings().first() or {}
+        return _function_row("open_grievances", "SELECT fn_open_grievances_by_department(:id) AS open_cnt",
+                             department_id, ("Grievance",), db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/functions/is_citizen_active")
+@router.get("/functions/is_citizen_active", dependencies=[cached(*history.REQUEST_TABLES, "Grievance")])
 def fn_is_citizen_active(citizen_id: int, db: Session = Depends(get_db)):
     try:
-        res = db.execute(text("SELECT fn_is_citizen_active(:id) AS active"), {"id": citizen_id})
-        return res.mappings().first() or {}
+        return _function_row("is_citizen_active", "SELECT fn_is_citizen_active(:id) AS active", citizen_id,
+                             (*history.REQUEST_TABLES, "Grievance"), db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/functions/{name}/batch")
+def fn_batch(name: str, request: FunctionBatchRequest, db: Session = Depends(get_db)):
+    """One of the functions above for many IDs at once, computed with a single GROUP BY"""
+    fn = function_batches.FUNCTIONS.get(name)
+    if fn is None:
+        raise HTTPException(status_code=404, detail=f"Unknown function. Must be one of: {', '.join(function_batches.FUNCTIONS)}")
+    # Read-only, so a replica may answer although this is a POST
+    prefer_replica(db)
+    try:
+        rows = result_cache.shared(
+            f"db.functions.{name}.batch",
+            lambda: function_batches.compute(db, name, request.ids),
+            tags=fn.tags,
+            params=request.ids,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return fast_json.respond(rows)
+
+
 # Views: allow selecting from predefined views only
 ALLOWED_VIEWS = {
     "view_total_paid_per_citizen": "SELECT * FROM view_total_paid_per_citizen",
@@ -99,14 +154,27 @@ ALLOWED_VIEWS = {
     "view_recent_requests": "SELECT * FROM view_recent_requests",
 }
 
+# Base tables each view reads, used as cache invalidation tags
+VIEW_TABLES = {
+    "view_total_paid_per_citizen": ("Citizen", *history.REQUEST_TABLES, *history.PAYMENT_TABLES),
+    "view_request_counts_per_service": ("Service", *history.REQUEST_TABLES),
+    "view_open_grievances_per_department": ("Department", "Grievance"),
+    "view_recent_requests": ("Service_Request", "Citizen", "Service"),
+}
+
 
 @router.get("/views/{view_name}")
-def select_view(view_name: str, db: Session = Depends(get_db)):
+def select_view(view_name: str, request: Request, response: Response, db: Session = Depends(get_db)):
     stmt = ALLOWED_VIEWS.get(view_name)
     if not stmt:
         raise HTTPException(status_code=404, detail="View not allowed")
+    http_cache.check(request, response, VIEW_TABLES[view_name])
     try:
-        res = db.execute(text(stmt))
-        return res.mappings().all()
+        rows = result_cache.get_or_compute(
+            f"db.views.{view_name}",
+            lambda: [dict(row) for row in db.execute(text(stmt)).mappings()],
+            tags=VIEW_TABLES[view_name],
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return fast_json.respond(rows, response)
@@ -1,52 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
-from typing import List
+from datetime import date
+from typing import List, Optional
+from app import department_rollup, reference_data
 from app.database import get_db
+from app.http_cache import cached
+from app.id_allocator import id_allocator
 from app.models.department import Department as DepartmentModel
 from app.schemas.schemas import Department, DepartmentCreate
 
 router = APIRouter(prefix="/departments", tags=["departments"])
 
 @router.get("/", response_model=List[Department])
-def get_departments(db: Session = Depends(get_db)):
-    """Get all departments"""
-    return db.query(DepartmentModel).all()
+def get_departments(request: Request, response: Response):
+    """Get all departments from the reference-data cache (304 if the ETag still matches)"""
+    return reference_data.conditional(request, response, reference_data.departments())
 
-@router.get("/{department_id}")
-def get_department(department_id: int, db: Session = Depends(get_db)):
-    """Get a specific department and include aggregated stats via stored procedure.
+@router.get("/{department_id}", dependencies=[cached("Department", "Service", "department_daily_rollup")])
+def get_department(
+    department_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """Get a specific department and include its aggregated stats.
 
-    This endpoint calls `sp_get_department_stats` internally and returns the
-    department record plus aggregated metrics so the backend demonstrates
-    use of the project's stored procedures without exposing a separate API.
+    The stats have the shape of `sp_get_department_stats` and are merged
+    from the department_daily_rollup buckets, optionally limited to a
+    Request_Date range.
     """
     dept = db.query(DepartmentModel).filter(DepartmentModel.Department_ID == department_id).first()
     if dept is None:
         raise HTTPException(status_code=404, detail="Department not found")
 
-    try:
-        res = db.execute(text("CALL sp_get_department_stats(:id)"), {"id": department_id})
-        stats = [dict(r._mapping) for r in res]
-        stats = stats[0] if stats else None
-    except Exception:
-        stats = None
-
     data = {
         "department": {
             "Department_ID": dept.Department_ID,
             "Department_Name": dept.Department_Name,
             "Contact_Info": getattr(dept, 'Contact_Info', None),
         },
-        "stats": stats
+        "stats": department_rollup.department_stats(db, department_id, start_date, end_date)
     }
     return data
 
 @router.post("/", response_model=Department)
 def create_department(department: DepartmentCreate, db: Session = Depends(get_db)):
     """Create a new department"""
-    max_id = db.query(func.max(DepartmentModel.Department_ID)).scalar()
-    next_id = (max_id or 0) + 1
+    next_id = id_allocator.next_id(DepartmentModel)
     
     db_dept = DepartmentModel(Department_ID=next_id, **department.model_dump())
     db.add(db_dept)
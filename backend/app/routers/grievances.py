@@ -1,28 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional
+from app import dashboard_counters, fast_json, search
+from app.database import get_async_db, get_db
+from app.http_cache import cached
+from app.id_allocator import id_allocator
+from app.pagination import keyset_paginate
 from app.models.grievance import Grievance as GrievanceModel
-from app.schemas.schemas import Grievance, GrievanceCreate
+from app.schemas.schemas import Grievance, GrievanceCreate, GrievanceSearchHit
 
 router = APIRouter(prefix="/grievances", tags=["grievances"])
 
-@router.get("/", response_model=List[Grievance])
-def get_grievances(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=List[Grievance], dependencies=[cached("Grievance")])
+async def get_grievances(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
     """Get all grievances"""
-    return (
-        db.query(GrievanceModel)
-        .order_by(GrievanceModel.Grievance_ID.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    page = await keyset_paginate(
+        db,
+        select(GrievanceModel.__table__),
+        [GrievanceModel.Grievance_ID],
+        limit,
+        cursor=cursor,
+        response=response,
+        skip=skip,
+        scalars=False,
     )
+    return fast_json.respond(page, response)
 
-@router.get("/{grievance_id}", response_model=Grievance)
-def get_grievance(grievance_id: int, db: Session = Depends(get_db)):
+@router.get("/search", response_model=List[GrievanceSearchHit], dependencies=[cached("Grievance")])
+async def search_grievances(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    status: Optional[str] = None,
+    department_id: Optional[int] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Full-text search of grievance descriptions, best match first"""
+    hits = await search.search_grievances(db, q, limit, cursor=cursor, response=response,
+                                          status=status, department_id=department_id)
+    return fast_json.respond(hits, response)
+
+@router.get("/{grievance_id}", response_model=Grievance, dependencies=[cached("Grievance")])
+async def get_grievance(grievance_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific grievance"""
-    grievance = db.query(GrievanceModel).filter(GrievanceModel.Grievance_ID == grievance_id).first()
+    grievance = await db.get(GrievanceModel, grievance_id)
     if grievance is None:
         raise HTTPException(status_code=404, detail="Grievance not found")
     return grievance
@@ -30,11 +60,11 @@ def get_grievance(grievance_id: int, db: Session = Depends(get_db)):
 @router.post("/", response_model=Grievance)
 def create_grievance(grievance: GrievanceCreate, db: Session = Depends(get_db)):
     """Create a new grievance"""
-    max_id = db.query(func.max(GrievanceModel.Grievance_ID)).scalar()
-    next_id = (max_id or 0) + 1
+    next_id = id_allocator.next_id(GrievanceModel)
     
     db_grievance = GrievanceModel(Grievance_ID=next_id, **grievance.model_dump())
     db.add(db_grievance)
+    dashboard_counters.record_change(db, GrievanceModel, after=dashboard_counters.snapshot(db_grievance))
     db.commit()
     db.refresh(db_grievance)
     return db_grievance
@@ -46,7 +76,11 @@ def update_grievance(grievance_id: int, grievance: GrievanceCreate, db: Session
     if db_grievance is None:
         raise HTTPException(status_code=404, detail="Grievance not found")
     
-    for key, value in grievance.model_dump().items():
+    payload = grievance.model_dump()
+    dashboard_counters.record_change(
+        db, GrievanceModel, before=dashboard_counters.snapshot(db_grievance), after=payload
+    )
+    for key, value in payload.items():
         setattr(db_grievance, key, value)
     
     db.commit()
@@ -65,6 +99,9 @@ def update_grievance_status(grievance_id: int, status: str, db: Session = Depend
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
     
+    dashboard_counters.record_change(
+        db, GrievanceModel, before=dashboard_counters.snapshot(db_grievance), after={"Status": status}
+    )
     db_grievance.Status = status
     db.commit()
     db.refresh(db_grievance)
@@ -78,5 +115,6 @@ def delete_grievance(grievance_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Grievance not found")
     
     db.delete(db_grievance)
+    dashboard_counters.record_change(db, GrievanceModel, before=dashboard_counters.snapshot(db_grievance))
     db.commit()
     return {"message": "Grievance deleted successfully"}
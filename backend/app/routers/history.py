@@ -0,0 +1,102 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from typing import List, Optional
+from app import fast_json, history
+from app.database import get_async_db
+from app.http_cache import cached
+from app.models.payment import Payment as PaymentModel
+from app.models.payment_history import PaymentHistory as PaymentHistoryModel
+from app.models.service_request import ServiceRequest as ServiceRequestModel
+from app.models.service_request_history import ServiceRequestHistory as ServiceRequestHistoryModel
+from app.schemas.schemas import HistoricalPayment, HistoricalServiceRequest
+
+router = APIRouter(prefix="/history", tags=["history"])
+
+REQUEST_SOURCES = (ServiceRequestModel, ServiceRequestHistoryModel)
+PAYMENT_SOURCES = (PaymentModel, PaymentHistoryModel)
+
+
+def _date_range(column, start_date: Optional[date], end_date: Optional[date]) -> list:
+    clauses = []
+    if start_date is not None:
+        clauses.append(column >= start_date)
+    if end_date is not None:
+        clauses.append(column <= end_date)
+    return clauses
+
+
+@router.get("/service-requests", response_model=List[HistoricalServiceRequest],
+            dependencies=[cached(*history.REQUEST_TABLES)])
+async def get_all_service_requests(
+    response: Response,
+    citizen_id: Optional[int] = None,
+    service_id: Optional[int] = None,
+    status: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Live and archived service requests, newest Request_Date first"""
+    await db.run_sync(history.ensure_tables)
+
+    def where(model):
+        clauses = _date_range(model.Request_Date, start_date, end_date)
+        if citizen_id is not None:
+            clauses.append(model.Citizen_ID == citizen_id)
+        if service_id is not None:
+            clauses.append(model.Service_ID == service_id)
+        if status is not None:
+            clauses.append(model.Status == status)
+        return clauses
+
+    page = await history.read_page(db, REQUEST_SOURCES, ("Request_Date", "Request_ID"), where, limit,
+                                   cursor=cursor, response=response)
+    return fast_json.respond(page, response)
+
+
+@router.get("/service-requests/{request_id}", response_model=HistoricalServiceRequest,
+            dependencies=[cached(*history.REQUEST_TABLES)])
+async def get_any_service_request(request_id: int, db: AsyncSession = Depends(get_async_db)):
+    """A service request, whether live or archived"""
+    await db.run_sync(history.ensure_tables)
+    row = await history.read_one(db, REQUEST_SOURCES, "Request_ID", request_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Service request not found")
+    return row
+
+
+@router.get("/payments", response_model=List[HistoricalPayment], dependencies=[cached(*history.PAYMENT_TABLES)])
+async def get_all_payments(
+    response: Response,
+    status: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Live and archived payments, newest Payment_Date first"""
+    await db.run_sync(history.ensure_tables)
+
+    def where(model):
+        clauses = _date_range(model.Payment_Date, start_date, end_date)
+        if status is not None:
+            clauses.append(model.Status == status)
+        return clauses
+
+    page = await history.read_page(db, PAYMENT_SOURCES, ("Payment_Date", "Payment_ID"), where, limit,
+                                   cursor=cursor, response=response)
+    return fast_json.respond(page, response)
+
+
+@router.get("/payments/{payment_id}", response_model=HistoricalPayment, dependencies=[cached(*history.PAYMENT_TABLES)])
+async def get_any_payment(payment_id: int, db: AsyncSession = Depends(get_async_db)):
+    """A payment, whether live or archived"""
+    await db.run_sync(history.ensure_tables)
+    row = await history.read_one(db, PAYMENT_SOURCES, "Payment_ID", payment_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    return row
@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+from app.db_routing import replica_stats
+from app.pool_metrics import pool_stats
+from app.request_metrics import request_stats
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/pool")
+def get_pool_metrics():
+    """Live connection pool statistics and checkout wait histograms per engine"""
+    return {"pools": pool_stats()}
+
+
+@router.get("/requests")
+def get_request_metrics():
+    """Per-route timings, query counts and recently flagged slow / N+1 statements"""
+    return request_stats()
+
+
+@router.get("/replicas")
+def get_replica_metrics():
+    """Lag of each read replica and whether reads are currently routed to it"""
+    return {"replicas": replica_stats()}
@@ -1,22 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional
+from app.bulk import ingest_stream
+from app import dashboard_counters, fast_json
+from app.database import get_async_db, get_db
+from app.http_cache import cached
+from app.id_allocator import id_allocator
+from app.pagination import keyset_paginate
 from app.models.payment import Payment as PaymentModel
-from app.schemas.schemas import Payment, PaymentCreate
+from app.schemas.schemas import Payment, PaymentCreate, BulkIngestResult
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
 
-@router.get("/", response_model=List[Payment])
-def get_payments(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(PaymentModel).offset(skip).limit(limit).all()
-
-
-@router.get("/{payment_id}", response_model=Payment)
-def get_payment(payment_id: int, db: Session = Depends(get_db)):
-    payment = db.query(PaymentModel).filter(PaymentModel.Payment_ID == payment_id).first()
+@router.get("/", response_model=List[Payment], dependencies=[cached("Payment")])
+async def get_payments(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    page = await keyset_paginate(
+        db,
+        select(PaymentModel.__table__),
+        [PaymentModel.Payment_ID],
+        limit,
+        cursor=cursor,
+        descending=False,
+        response=response,
+        skip=skip,
+        scalars=False,
+    )
+    return fast_json.respond(page, response)
+
+
+@router.get("/{payment_id}", response_model=Payment, dependencies=[cached("Payment")])
+async def get_payment(payment_id: int, db: AsyncSession = Depends(get_async_db)):
+    payment = await db.get(PaymentModel, payment_id)
     if payment is None:
         raise HTTPException(status_code=404, detail="Payment not found")
     return payment
@@ -24,11 +47,17 @@ def get_payment(payment_id: int, db: Session = Depends(get_db)):
 
 @router.post("/", response_model=Payment)
 def create_payment(payment: PaymentCreate, db: Session = Depends(get_db)):
-    max_id = db.query(func.max(PaymentModel.Payment_ID)).scalar()
-    next_id = (max_id or 0) + 1
+    next_id = id_allocator.next_id(PaymentModel)
 
     db_payment = PaymentModel(Payment_ID=next_id, **payment.model_dump())
     db.add(db_payment)
+    dashboard_counters.record_change(db, PaymentModel, after=dashboard_counters.snapshot(db_payment))
     db.commit()
     db.refresh(db_payment)
     return db_payment
+
+
+@router.post("/bulk", response_model=BulkIngestResult)
+async def bulk_create_payments(request: Request, db: Session = Depends(get_db)):
+    """Bulk-create payments from an NDJSON (default) or CSV (Content-Type: text/csv) upload"""
+    return await ingest_stream(request, db, PaymentModel, PaymentCreate)
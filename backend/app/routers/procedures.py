@@ -1,30 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from datetime import date
+from typing import Optional
+from app import citizen_summary as citizen_summary_projection
+from app import department_rollup
 from app.database import get_db
+from app.http_cache import cached
 
 router = APIRouter(prefix="/procedures", tags=["procedures"])
 
 
-@router.get("/citizen-summary/{citizen_id}")
+@router.get("/citizen-summary/{citizen_id}", dependencies=[cached("Citizen", "citizen_summary")])
 def citizen_summary(citizen_id: int, db: Session = Depends(get_db)):
-    """Call stored procedure sp_get_citizen_summary and return single row"""
-    try:
-        result = db.execute(text("CALL sp_get_citizen_summary(:id)"), {"id": citizen_id})
-        rows = [dict(r._mapping) for r in result]
-        if not rows:
-            raise HTTPException(status_code=404, detail="Citizen summary not found")
-        return rows[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """Citizen summary (same shape as sp_get_citizen_summary) from the citizen_summary projection"""
+    summary = citizen_summary_projection.read(db, citizen_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Citizen summary not found")
+    return summary
 
 
-@router.get("/department-stats/{department_id}")
-def department_stats(department_id: int, db: Session = Depends(get_db)):
-    """Call stored procedure sp_get_department_stats and return result set"""
+@router.get("/department-stats/{department_id}", dependencies=[cached("Department", "Service", "department_daily_rollup")])
+def department_stats(
+    department_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """sp_get_department_stats result set, merged from the department_daily_rollup buckets"""
     try:
-        result = db.execute(text("CALL sp_get_department_stats(:id)"), {"id": department_id})
-        rows = [dict(r._mapping) for r in result]
-        return rows
+        stats = department_rollup.department_stats(db, department_id, start_date, end_date)
+        return [stats] if stats else []
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
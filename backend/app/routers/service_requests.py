@@ -1,33 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import exists, select, text
 from sqlalchemy.exc import IntegrityError
-from typing import List
-from app.database import get_db
+from typing import List, Optional
+from app.bulk import ingest_stream
+from app import dashboard_counters, fast_json, reference_data
+from app.database import get_async_db, get_db
+from app.http_cache import cached
+from app.id_allocator import id_allocator
+from app.pagination import keyset_paginate
 from app.models.service_request import ServiceRequest as ServiceRequestModel
 from app.models.payment import Payment as PaymentModel
 from app.models.citizen import Citizen as CitizenModel
 from app.models.service import Service as ServiceModel
-from app.schemas.schemas import ServiceRequest, ServiceRequestCreate
+from app.schemas.schemas import ServiceRequest, ServiceRequestCreate, BulkIngestResult
 
 router = APIRouter(prefix="/service-requests", tags=["service-requests"])
 
-@router.get("/", response_model=List[ServiceRequest])
-def get_service_requests(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+# (payload key, model, primary key column, required) in the order errors are reported
+FOREIGN_KEYS = [
+    ("Citizen_ID", CitizenModel, CitizenModel.Citizen_ID, False),
+    ("Service_ID", ServiceModel, ServiceModel.Service_ID, True),
+    ("Payment_ID", PaymentModel, PaymentModel.Payment_ID, False),
+]
+
+# Keys whose rows are known from the in-memory reference catalog. Only misses
+# are probed in the database: the row may be newer than this worker's snapshot.
+CACHED_KEYS = {"Service_ID": reference_data.service_exists}
+
+def check_foreign_keys(db: Session, payload: dict):
+    """Check every referenced row exists with a single EXISTS round trip"""
+    probes = []
+    for key, model, column, required in FOREIGN_KEYS:
+        value = payload.get(key)
+        if key in CACHED_KEYS and value is not None and CACHED_KEYS[key](value):
+            continue
+        if value is not None or required:
+            probes.append((key, model, value, exists().where(column == value).label(key)))
+    if not probes:
+        return
+    found = db.execute(select(*[probe for *_, probe in probes])).one()
+    for (key, model, value, _), ok in zip(probes, found):
+        if not ok:
+            raise HTTPException(status_code=400, detail=f"{model.__name__} with ID {value} does not exist")
+
+def check_foreign_keys_bulk(db: Session, records):
+    """Set-based variant for bulk uploads: one IN query per referenced table.
+
+    Returns {row_number: message} for records referencing missing rows.
+    """
+    existing = {}
+    for key, model, column, _ in FOREIGN_KEYS:
+        wanted = {payload[key] for _, payload in records if payload.get(key) is not None}
+        known = {value for value in wanted if CACHED_KEYS[key](value)} if key in CACHED_KEYS else set()
+        wanted -= known
+        existing[key] = known | (set(db.scalars(select(column).where(column.in_(wanted)))) if wanted else set())
+
+    rejected = {}
+    for row, payload in records:
+        for key, model, _, required in FOREIGN_KEYS:
+            value = payload.get(key)
+            if (value is not None or required) and value not in existing[key]:
+                rejected[row] = f"{model.__name__} with ID {value} does not exist"
+                break
+    return rejected
+
+@router.get("/", response_model=List[ServiceRequest], dependencies=[cached("Service_Request")])
+async def get_service_requests(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
     """Get all service requests"""
     # Return newest-first so recent requests appear on first page
-    return (
-        db.query(ServiceRequestModel)
-        .order_by(ServiceRequestModel.Request_ID.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    page = await keyset_paginate(
+        db,
+        select(ServiceRequestModel.__table__),
+        [ServiceRequestModel.Request_ID],
+        limit,
+        cursor=cursor,
+        response=response,
+        skip=skip,
+        scalars=False,
     )
+    return fast_json.respond(page, response)
 
-@router.get("/{request_id}", response_model=ServiceRequest)
-def get_service_request(request_id: int, db: Session = Depends(get_db)):
+@router.get("/{request_id}", response_model=ServiceRequest, dependencies=[cached("Service_Request")])
+async def get_service_request(request_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific service request"""
-    request = db.query(ServiceRequestModel).filter(ServiceRequestModel.Request_ID == request_id).first()
+    request = await db.get(ServiceRequestModel, request_id)
     if request is None:
         raise HTTPException(status_code=404, detail="Service request not found")
     return request
@@ -35,33 +99,14 @@ def get_service_request(request_id: int, db: Session = Depends(get_db)):
 @router.post("/", response_model=ServiceRequest)
 def create_service_request(request: ServiceRequestCreate, db: Session = Depends(get_db)):
     """Create a new service request"""
-    max_id = db.query(func.max(ServiceRequestModel.Request_ID)).scalar()
-    next_id = (max_id or 0) + 1
+    next_id = id_allocator.next_id(ServiceRequestModel)
     # Validate foreign keys before insert to provide clearer errors
     payload = request.model_dump()
-
-    # Citizen_ID may be provided or None
-    citizen_id = payload.get("Citizen_ID")
-    if citizen_id is not None:
-        citizen = db.query(CitizenModel).filter(CitizenModel.Citizen_ID == citizen_id).first()
-        if citizen is None:
-            raise HTTPException(status_code=400, detail=f"Citizen with ID {citizen_id} does not exist")
-
-    # Service must exist
-    service_id = payload.get("Service_ID")
-    service = db.query(ServiceModel).filter(ServiceModel.Service_ID == service_id).first()
-    if service is None:
-        raise HTTPException(status_code=400, detail=f"Service with ID {service_id} does not exist")
-
-    # If Payment_ID provided, ensure it exists
-    payment_id = payload.get("Payment_ID")
-    if payment_id is not None:
-        payment = db.query(PaymentModel).filter(PaymentModel.Payment_ID == payment_id).first()
-        if payment is None:
-            raise HTTPException(status_code=400, detail=f"Payment with ID {payment_id} does not exist")
+    check_foreign_keys(db, payload)
 
     db_request = ServiceRequestModel(Request_ID=next_id, **payload)
     db.add(db_request)
+    dashboard_counters.record_change(db, ServiceRequestModel, after=payload)
     try:
         db.commit()
     except IntegrityError as e:
@@ -71,6 +116,13 @@ def create_service_request(request: ServiceRequestCreate, db: Session = Depends(
     db.refresh(db_request)
     return db_request
 
+@router.post("/bulk", response_model=BulkIngestResult)
+async def bulk_create_service_requests(request: Request, db: Session = Depends(get_db)):
+    """Bulk-create service requests from an NDJSON (default) or CSV (Content-Type: text/csv) upload"""
+    return await ingest_stream(
+        request, db, ServiceRequestModel, ServiceRequestCreate, validate_chunk=check_foreign_keys_bulk
+    )
+
 @router.put("/{request_id}", response_model=ServiceRequest)
 def update_service_request(request_id: int, request: ServiceRequestCreate, db: Session = Depends(get_db)):
     """Update a service request"""
@@ -81,23 +133,11 @@ def update_service_request(request_id: int, request: ServiceRequestCreate, db: S
     payload = request.model_dump()
 
     # Validate foreign keys similar to create
-    citizen_id = payload.get("Citizen_ID")
-    if citizen_id is not None:
-        citizen = db.query(CitizenModel).filter(CitizenModel.Citizen_ID == citizen_id).first()
-        if citizen is None:
-            raise HTTPException(status_code=400, detail=f"Citizen with ID {citizen_id} does not exist")
-
-    service_id = payload.get("Service_ID")
-    service = db.query(ServiceModel).filter(ServiceModel.Service_ID == service_id).first()
-    if service is None:
-        raise HTTPException(status_code=400, detail=f"Service with ID {service_id} does not exist")
-
-    payment_id = payload.get("Payment_ID")
-    if payment_id is not None:
-        payment = db.query(PaymentModel).filter(PaymentModel.Payment_ID == payment_id).first()
-        if payment is None:
-            raise HTTPException(status_code=400, detail=f"Payment with ID {payment_id} does not exist")
+    check_foreign_keys(db, payload)
 
+    dashboard_counters.record_change(
+        db, ServiceRequestModel, before=dashboard_counters.snapshot(db_request), after=payload
+    )
     for key, value in payload.items():
         setattr(db_request, key, value)
 
@@ -121,6 +161,9 @@ def update_request_status(request_id: int, status: str, db: Session = Depends(ge
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
     
+    dashboard_counters.record_change(
+        db, ServiceRequestModel, before=dashboard_counters.snapshot(db_request), after={"Status": status}
+    )
     db_request.Status = status
     db.commit()
     db.refresh(db_request)
@@ -135,5 +178,6 @@ def delete_service_request(request_id: int, db: Session = Depends(get_db)):
 
     # Delete the service request (DB trigger will archive/delete payment)
     db.delete(db_request)
+    dashboard_counters.record_change(db, ServiceRequestModel, before=dashboard_counters.snapshot(db_request))
     db.commit()
     return {"message": "Service request deleted successfully (related records handled by DB triggers)"}
@@ -1,22 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
+from app import reference_data
+from app.database import get_async_db, get_db
+from app.http_cache import cached
+from app.id_allocator import id_allocator
 from app.models.service import Service as ServiceModel
 from app.schemas.schemas import Service, ServiceCreate
 
 router = APIRouter(prefix="/services", tags=["services"])
 
 @router.get("/", response_model=List[Service])
-def get_services(db: Session = Depends(get_db)):
-    """Get all services"""
-    return db.query(ServiceModel).all()
+def get_services(request: Request, response: Response):
+    """Get all services from the reference-data cache (304 if the ETag still matches)"""
+    return reference_data.conditional(request, response, reference_data.services())
 
-@router.get("/{service_id}", response_model=Service)
-def get_service(service_id: int, db: Session = Depends(get_db)):
+@router.get("/{service_id}", response_model=Service, dependencies=[cached("Service")])
+async def get_service(service_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific service"""
-    service = db.query(ServiceModel).filter(ServiceModel.Service_ID == service_id).first()
+    service = await db.get(ServiceModel, service_id)
     if service is None:
         raise HTTPException(status_code=404, detail="Service not found")
     return service
@@ -24,8 +27,7 @@ def get_service(service_id: int, db: Session = Depends(get_db)):
 @router.post("/", response_model=Service)
 def create_service(service: ServiceCreate, db: Session = Depends(get_db)):
     """Create a new service"""
-    max_id = db.query(func.max(ServiceModel.Service_ID)).scalar()
-    next_id = (max_id or 0) + 1
+    next_id = id_allocator.next_id(ServiceModel)
     
     db_service = ServiceModel(Service_ID=next_id, **service.model_dump())
     db.add(db_service)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 
 # Citizen Schemas
@@ -19,6 +19,9 @@ class Citizen(CitizenBase):
     class Config:
         from_attributes = True
 
+class CitizenSearchHit(Citizen):
+    Score: float
+
 # Department Schemas
 class DepartmentBase(BaseModel):
     Department_Name: str
@@ -83,6 +86,13 @@ class ServiceRequest(ServiceRequestBase):
     class Config:
         from_attributes = True
 
+# Live or archived rows (app/history.py)
+class HistoricalServiceRequest(ServiceRequest):
+    Archived: bool
+
+class HistoricalPayment(Payment):
+    Archived: bool
+
 # Grievance Schemas
 class GrievanceBase(BaseModel):
     Citizen_ID: Optional[int] = None  # Optional in case of orphaned grievances
@@ -100,6 +110,9 @@ class Grievance(GrievanceBase):
     class Config:
         from_attributes = True
 
+class GrievanceSearchHit(Grievance):
+    Score: float
+
 # Dashboard Statistics
 class DashboardStats(BaseModel):
     total_citizens: int
@@ -108,3 +121,14 @@ class DashboardStats(BaseModel):
     total_revenue: float
     pending_requests: int
     open_grievances: int
+
+# Bulk ingestion report
+class BulkIngestError(BaseModel):
+    row: int
+    error: str
+
+class BulkIngestResult(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[BulkIngestError] = []
@@ -0,0 +1,141 @@
+"""Ranked, paginated search over citizens and grievances.
+
+All matching happens in database indexes, so nothing is scanned or held in
+application memory, and the indexes change in the same transaction as the
+rows they cover:
+
+* Citizen names and emails: the ``ft_citizen_name_email`` FULLTEXT index
+  (MySQL), queried in boolean mode with every term as a required prefix
+  (``+ram* +kum*``).
+* Phone and Aadhaar numbers (digits only) and full email addresses (contains
+  ``@``): a prefix range scan (``LIKE 'x%'``) on their B-tree indexes. Exact
+  matches rank first.
+* Grievance descriptions: the ``ft_grievance_description`` FULLTEXT index.
+
+The FULLTEXT indexes and the phone index are created by migration
+``0006_search_indexes``. Other dialects (SQLite in development) fall back to
+``LIKE`` over the same columns. That path scans the table and is not meant
+for production sizes.
+
+Results are ordered by relevance, then newest ID first. Pages are keyset
+paginated on that (score, ID) pair like the list endpoints, with the cursor
+in the ``X-Next-Cursor`` header.
+"""
+import os
+import re
+from typing import List, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, case, literal, or_, select
+from sqlalchemy.dialects.mysql import match
+
+from app.models.citizen import Citizen
+from app.models.grievance import Grievance
+from app.pagination import NEXT_CURSOR_HEADER, clamp_limit, decode_cursor, encode_cursor, keyset_after
+
+# InnoDB does not index words shorter than innodb_ft_min_token_size (3)
+FULLTEXT_MIN_TOKEN = int(os.getenv("SEARCH_FULLTEXT_MIN_TOKEN", "3"))
+# Shorter digit prefixes match too large a slice of the phone/Aadhaar ranges
+MIN_DIGIT_PREFIX = int(os.getenv("SEARCH_MIN_DIGIT_PREFIX", "4"))
+MAX_TERMS = 8
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+_DIGITS = re.compile(r"^[\d\s+-]+$")
+
+
+def _terms(q: str) -> List[str]:
+    """Word tokens of ``q``; FULLTEXT boolean operators are dropped"""
+    return [t.lower() for t in _TERM.findall(q)][:MAX_TERMS]
+
+
+def _boolean_query(terms: List[str]) -> str:
+    return " ".join(f"+{t}*" for t in terms)
+
+
+def _rows(model, hits) -> List[dict]:
+    columns = [c.key for c in model.__table__.columns]
+    return [{**{c: getattr(obj, c) for c in columns}, "Score": float(score)} for obj, score in hits]
+
+
+async def _ranked_page(db, stmt, score, id_column, limit: int, cursor: Optional[str],
+                       response: Optional[Response]) -> list:
+    limit = clamp_limit(limit)
+    keys = [score, id_column]
+    if cursor:
+        stmt = stmt.where(keyset_after(keys, decode_cursor(cursor, len(keys)), descending=True))
+    hits = (await db.execute(stmt.order_by(score.desc(), id_column.desc()).limit(limit + 1))).all()
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    if response is not None and has_more:
+        obj, last_score = hits[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([float(last_score), getattr(obj, id_column.key)])
+    return hits
+
+
+def _citizen_match(q: str, dialect: str):
+    """(WHERE clause, score expression) for a citizen query"""
+    q = q.strip()
+    if _DIGITS.match(q):
+        digits = re.sub(r"\D", "", q)
+        if len(digits) < MIN_DIGIT_PREFIX:
+            raise HTTPException(status_code=400,
+                                detail=f"Enter at least {MIN_DIGIT_PREFIX} digits to search by phone or Aadhaar")
+        where = or_(Citizen.Phone.startswith(digits, autoescape=True),
+                    Citizen.Aadhaar_Number.startswith(digits, autoescape=True))
+        score = case((or_(Citizen.Phone == digits, Citizen.Aadhaar_Number == digits), 2), else_=1)
+        return where, score
+
+    if "@" in q:
+        where = Citizen.Email.startswith(q, autoescape=True)
+        return where, case((Citizen.Email == q, 2), else_=1)
+
+    terms = _terms(q)
+    if not terms:
+        return None, None
+    long_terms = [t for t in terms if len(t) >= FULLTEXT_MIN_TOKEN]
+    if dialect == "mysql" and long_terms:
+        score = match(Citizen.Name, Citizen.Email, against=_boolean_query(long_terms)).in_boolean_mode()
+        return score, score
+    if dialect == "mysql":
+        # Only short words: a name prefix range scan on idx_citizen_name
+        return Citizen.Name.startswith(q, autoescape=True), literal(1)
+
+    where = [or_(Citizen.Name.startswith(t, autoescape=True),
+                 Citizen.Name.contains(f" {t}", autoescape=True),
+                 Citizen.Email.startswith(t, autoescape=True)) for t in terms]
+    score = case((Citizen.Name.startswith(q, autoescape=True), 2), else_=1)
+    return and_(*where), score
+
+
+async def search_citizens(db, q: str, limit: int = 20, cursor: Optional[str] = None,
+                          response: Optional[Response] = None) -> List[dict]:
+    """Citizens matching ``q`` by name, email, phone or Aadhaar prefix, best first"""
+    where, score = _citizen_match(q, db.get_bind().dialect.name)
+    if where is None:
+        return []
+    stmt = select(Citizen, score).where(where)
+    return _rows(Citizen, await _ranked_page(db, stmt, score, Citizen.Citizen_ID, limit, cursor, response))
+
+
+async def search_grievances(db, q: str, limit: int = 20, cursor: Optional[str] = None,
+                            response: Optional[Response] = None, status: Optional[str] = None,
+                            department_id: Optional[int] = None) -> List[dict]:
+    """Grievances whose description matches every word of ``q``, best first"""
+    terms = _terms(q)
+    if db.get_bind().dialect.name == "mysql":
+        # Words below the FULLTEXT token size are not in the index
+        terms = [t for t in terms if len(t) >= FULLTEXT_MIN_TOKEN]
+        if not terms:
+            return []
+        score = match(Grievance.Description, against=_boolean_query(terms)).in_boolean_mode()
+        stmt = select(Grievance, score).where(score)
+    else:
+        if not terms:
+            return []
+        score = literal(1)
+        stmt = select(Grievance, score).where(*[Grievance.Description.contains(t, autoescape=True) for t in terms])
+    if status is not None:
+        stmt = stmt.where(Grievance.Status == status)
+    if department_id is not None:
+        stmt = stmt.where(Grievance.Department_ID == department_id)
+    return _rows(Grievance, await _ranked_page(db, stmt, score, Grievance.Grievance_ID, limit, cursor, response))
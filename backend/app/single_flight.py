@@ -0,0 +1,140 @@
+"""Single-flight execution of identical concurrent read queries.
+
+When many clients open the dashboard at once, every one of them asks for
+the same aggregates before any result has been cached. Through
+``single_flight.do(key, compute)`` only the first caller (the leader) runs
+``compute``; callers arriving with the same key while it runs wait for it
+and get the same result, or the same exception.
+
+Keys are built by ``ResultCache.key``: the query name, its parameters and
+the current versions of the tables it reads. A caller that arrives after a
+write to one of those tables therefore never joins a flight that may have
+read the data before the write.
+
+``SINGLE_FLIGHT=local`` (the default) coalesces the threads of one
+process. ``SINGLE_FLIGHT=redis`` also coalesces across uvicorn workers: the
+process that takes a short Redis lock on the key runs the query and
+publishes the result for ``SINGLE_FLIGHT_RESULT_TTL_SECONDS``, and the other
+processes poll for it (requires the ``redis`` package). ``off`` disables
+coalescing. A waiting caller gives up after ``SINGLE_FLIGHT_WAIT_SECONDS``
+and runs the query itself.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "local").lower()
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "30"))
+SINGLE_FLIGHT_RESULT_TTL_SECONDS = int(os.getenv("SINGLE_FLIGHT_RESULT_TTL_SECONDS", "5"))
+SINGLE_FLIGHT_POLL_SECONDS = 0.02
+
+
+class _Call:
+    """One in-flight computation and the outcome its followers wait for"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class RedisFlights:
+    """Cross-process leader election and result hand-off through Redis"""
+
+    def __init__(self, url: str, prefix: str = "csms:flight:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SINGLE_FLIGHT=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def do(self, key: str, compute: Callable[[], Any], wait: float) -> Any:
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        lock_key, result_key = self._prefix + "lock:" + digest, self._prefix + "result:" + digest
+        token = uuid.uuid4().hex
+        # The lock outlives a crashed leader by at most the wait limit
+        if self._client.set(lock_key, token, nx=True, px=int(wait * 1000)):
+            try:
+                value = compute()
+                self._client.set(result_key, pickle.dumps(value), ex=SINGLE_FLIGHT_RESULT_TTL_SECONDS)
+                return value
+            finally:
+                if self._client.get(lock_key) == token.encode():
+                    self._client.delete(lock_key)
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            raw = self._client.get(result_key)
+            if raw is not None:
+                return pickle.loads(raw)
+            if not self._client.exists(lock_key):
+                # The leader failed (or its result already expired): run it here
+                break
+            time.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+        return compute()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution"""
+
+    def __init__(self, mode: str = SINGLE_FLIGHT, wait: float = SINGLE_FLIGHT_WAIT_SECONDS):
+        self.mode = mode
+        self.wait = wait
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._remote: Optional[RedisFlights] = None
+        if mode == "redis":
+            self._remote = RedisFlights(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+
+    def _count(self, name: str, outcome: str) -> None:
+        stats = self._stats.setdefault(name, {"executed": 0, "shared": 0})
+        stats[outcome] += 1
+
+    def do(self, key: str, compute: Callable[[], Any], name: Optional[str] = None) -> Any:
+        """Result of ``compute()``, shared with every concurrent call for ``key``"""
+        if self.mode == "off":
+            return compute()
+        name = name or key.split("|", 1)[0]
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count(name, "executed" if leader else "shared")
+        if not leader:
+            if not call.done.wait(self.wait):
+                logger.warning("Single-flight wait for %s timed out; running it again", name)
+                return compute()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            if self._remote is not None:
+                call.value = self._remote.do(key, compute, self.wait)
+            else:
+                call.value = compute()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            per_name = {k: dict(v) for k, v in self._stats.items()}
+            in_flight = len(self._calls)
+        return {"mode": self.mode, "in_flight": in_flight, "queries": per_name}
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,106 @@
+"""Rows/s of the /bulk upload endpoints against one POST per row.
+
+Inserts the same synthetic citizens (or payments) three ways against a
+running server: single-row POSTs from ``--concurrency`` clients, one NDJSON
+upload and one CSV upload of ``--rows`` rows each, and prints the throughput
+and the speedup over single-row POSTs:
+
+    uvicorn main:app --port 8000
+    python benchmarks/bulk_ingest.py --rows 20000
+    python benchmarks/bulk_ingest.py --endpoint payments --single-rows 2000
+
+Every run inserts 2 x ``--rows`` + ``--single-rows`` new rows; use a scratch
+database. Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import time
+
+import httpx
+
+
+def citizen(i: int) -> dict:
+    # Email and Aadhaar_Number are unique, so they are left out
+    return {"Name": f"Bulk Citizen {i}", "Address": f"{i} Bulk Road\nWard {i % 50}", "Phone": f"9{i:09d}"}
+
+
+def payment(i: int) -> dict:
+    return {"Amount": f"{100 + i % 900}.00", "Payment_Method": "UPI", "Status": "Completed",
+            "Payment_Date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}"}
+
+
+ENDPOINTS = {"citizens": citizen, "payments": payment}
+
+
+def ndjson_body(rows: list) -> bytes:
+    return "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+def csv_body(rows: list) -> bytes:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue().encode()
+
+
+async def single_posts(client, path: str, rows: list, concurrency: int) -> dict:
+    remaining = iter(rows)
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for row in remaining:
+            response = await client.post(path, json=row)
+            errors += response.status_code >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return {"rows": len(rows) - errors, "seconds": time.perf_counter() - started, "errors": errors}
+
+
+async def upload(client, path: str, body: bytes, content_type: str) -> dict:
+    started = time.perf_counter()
+    response = await client.post(f"{path}bulk", content=body, headers={"content-type": content_type})
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    result = response.json()
+    return {"rows": result["inserted"], "seconds": elapsed, "errors": result["failed"]}
+
+
+async def run(args) -> list:
+    make = ENDPOINTS[args.endpoint]
+    path = f"/api/{args.endpoint}/"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=600) as client:
+        single = await single_posts(client, path, [make(i) for i in range(args.single_rows)], args.concurrency)
+        rows = [make(i) for i in range(args.rows)]
+        ndjson = await upload(client, path, ndjson_body(rows), "application/x-ndjson")
+        as_csv = await upload(client, path, csv_body(rows), "text/csv")
+    return [(f"POST {path} x{args.concurrency}", single), (f"POST {path}bulk NDJSON", ndjson),
+            (f"POST {path}bulk CSV", as_csv)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="citizens")
+    parser.add_argument("--rows", type=int, default=20000, help="rows per bulk upload")
+    parser.add_argument("--single-rows", type=int, default=2000, help="rows inserted with single-row POSTs")
+    parser.add_argument("--concurrency", type=int, default=10, help="clients for the single-row POSTs")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    baseline = results[0][1]["rows"] / results[0][1]["seconds"]
+    print(f"{'method':<36} {'rows':>8} {'seconds':>8} {'rows/s':>9} {'speedup':>8} {'errors':>6}")
+    for label, r in results:
+        rate = r["rows"] / r["seconds"] if r["seconds"] else 0.0
+        print(f"{label:<36} {r['rows']:>8} {r['seconds']:>8.2f} {rate:>9.1f} "
+              f"{rate / baseline if baseline else 0:>7.1f}x {r['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Requests/s of the read endpoints at increasing client concurrency.
+
+Used to compare the async session stack with the threaded sync fallback.
+Start the API once per mode and run this script against each:
+
+    USE_ASYNC_DB=true  uvicorn main:app --port 8000
+    python benchmarks/concurrency_load.py --label async
+
+    USE_ASYNC_DB=false uvicorn main:app --port 8000
+    python benchmarks/concurrency_load.py --label sync
+
+Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/api/citizens/?limit=50",
+    "/api/service-requests/?limit=50",
+    "/api/grievances/?limit=50",
+    "/api/payments/?limit=50",
+    "/api/services/",
+    "/api/departments/",
+]
+
+
+async def _worker(client, paths, deadline, latencies, errors, offset):
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_level(base_url, paths, concurrency, duration):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies, errors = [], []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*[
+            _worker(client, paths, deadline, latencies, errors, n) for n in range(concurrency)
+        ])
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / duration,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--levels", default="50,200,1000", help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per level")
+    parser.add_argument("--label", default="", help="tag printed with each result row")
+    args = parser.parse_args()
+
+    print(f"{'label':<8} {'clients':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for level in [int(x) for x in args.levels.split(",")]:
+        r = asyncio.run(run_level(args.base_url, DEFAULT_PATHS, level, args.duration))
+        print(f"{args.label:<8} {r['concurrency']:>7} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
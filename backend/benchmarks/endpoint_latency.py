@@ -0,0 +1,282 @@
+"""Per-endpoint latency and throughput baseline for every /api/* route.
+
+Routes are read from the running server's OpenAPI document, so endpoints
+added to ``main.py`` are picked up without editing this file. Path and
+required query parameters are filled from PARAM_VALUES (IDs that exist in
+any database seeded by ``scripts/generate_data.py``). Each endpoint is
+driven by ``--concurrency`` clients for ``--requests`` calls and reported
+with p50/p95/p99 latency and requests/s.
+
+    python scripts/generate_data.py --scale 1m
+    uvicorn main:app --port 8000
+    python benchmarks/endpoint_latency.py --save baseline.json
+    # ... change something, restart ...
+    python benchmarks/endpoint_latency.py --compare baseline.json
+
+Write endpoints (POST) are skipped unless --include-writes is given; they
+insert new rows on every call. Streaming and bulk endpoints are always
+skipped. Requires httpx (pip install httpx).
+
+``--fk-validation`` instead times the service request foreign key check in
+process, against the database of DATABASE_URL: the single EXISTS round trip
+of ``check_foreign_keys`` and the set-based ``check_foreign_keys_bulk``
+against the per-reference ORM lookups they replaced:
+
+    python benchmarks/endpoint_latency.py --fk-validation
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+import httpx
+
+# Values for path/query parameters, keyed by parameter name
+PARAM_VALUES = {
+    "citizen_id": 1,
+    "department_id": 1,
+    "service_id": 1,
+    "request_id": 1,
+    "grievance_id": 1,
+    "payment_id": 1,
+    "limit": 50,
+}
+VIEW_NAMES = [
+    "view_total_paid_per_citizen",
+    "view_request_counts_per_service",
+    "view_open_grievances_per_department",
+    "view_recent_requests",
+]
+SKIP_PATHS = ("/bulk", "/export", "/stream", "/reconcile")
+# JSON bodies for the write endpoints exercised with --include-writes
+WRITE_BODIES = {
+    "/api/custom-queries/execute": {"query": "SELECT COUNT(*) AS n FROM Service_Request WHERE Status = 'Pending'"},
+    # Email and Aadhaar_Number are unique, so repeated inserts leave them out
+    "/api/citizens/": {"Name": "Bench Citizen", "Address": "1 Bench Road", "Phone": "9000000000"},
+    "/api/grievances/": {"Citizen_ID": 1, "Department_ID": 1, "Description": "Benchmark grievance",
+                         "Status": "Open", "Date": "2025-01-01"},
+    "/api/service-requests/": {"Citizen_ID": 1, "Service_ID": 1, "Payment_ID": 1, "Status": "Pending",
+                               "Request_Date": "2025-01-01"},
+}
+
+
+def discover(base_url: str, include_writes: bool) -> list:
+    """Return (label, method, url, body) for every benchmarkable /api route"""
+    spec = httpx.get(f"{base_url}/openapi.json", timeout=30).json()
+    targets = []
+    for path, operations in sorted(spec["paths"].items()):
+        if not path.startswith("/api/") or any(s in path for s in SKIP_PATHS):
+            continue
+        for method, op in operations.items():
+            if method == "post" and not (include_writes and path in WRITE_BODIES):
+                continue
+            if method not in ("get", "post"):
+                continue
+            params, missing = {}, []
+            for p in op.get("parameters", []):
+                if p["in"] == "path" and p["name"] == "view_name":
+                    continue
+                value = PARAM_VALUES.get(p["name"])
+                if value is None:
+                    if p.get("required"):
+                        missing.append(p["name"])
+                    continue
+                params[p["name"]] = (p["in"], value)
+            if missing:
+                print(f"skipping {method.upper()} {path}: no value for {', '.join(missing)}", file=sys.stderr)
+                continue
+            urls = [path]
+            if "{view_name}" in path:
+                urls = [path.replace("{view_name}", v) for v in VIEW_NAMES]
+            for url in urls:
+                query = {}
+                for name, (where, value) in params.items():
+                    if where == "path":
+                        url = url.replace("{" + name + "}", str(value))
+                    else:
+                        query[name] = value
+                if query:
+                    url += "?" + "&".join(f"{k}={v}" for k, v in query.items())
+                targets.append((f"{method.upper()} {url}", method, url, WRITE_BODIES.get(path)))
+    return targets
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))] * 1000
+
+
+async def run_endpoint(client, method, url, body, total, concurrency):
+    latencies, errors, statuses = [], 0, set()
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+                statuses.add(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_statuses": sorted(statuses),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+async def run_all(base_url, targets, total, concurrency, warmup):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for label, method, url, body in targets:
+            if warmup:
+                await run_endpoint(client, method, url, body, warmup, min(concurrency, warmup))
+            results[label] = await run_endpoint(client, method, url, body, total, concurrency)
+            yield label, results[label]
+
+
+def _delta(current: float, baseline: float) -> str:
+    if not baseline:
+        return ""
+    return f"{(current - baseline) / baseline * 100:+.0f}%"
+
+
+def _time_calls(fn, repeats: int) -> dict:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {"p50_ms": percentile(latencies, 0.50), "p95_ms": percentile(latencies, 0.95),
+            "total_s": sum(latencies)}
+
+
+def fk_validation(repeats: int, bulk_rows: int) -> int:
+    """Time the service request foreign key checks in process, old way against new"""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from fastapi import HTTPException
+    from sqlalchemy import event
+
+    from app.database import SessionLocal, engine
+    from app.routers.service_requests import FOREIGN_KEYS, check_foreign_keys, check_foreign_keys_bulk
+
+    def lookups(db, payload):
+        # The validation before check_foreign_keys: one ORM row load per reference
+        for key, model, column, required in FOREIGN_KEYS:
+            value = payload.get(key)
+            if (value is not None or required) and db.query(model).filter(column == value).first() is None:
+                raise HTTPException(status_code=400, detail=f"{model.__name__} with ID {value} does not exist")
+
+    def per_row(db, records):
+        for _, payload in records:
+            lookups(db, payload)
+
+    payload = {key: PARAM_VALUES[key.lower()] for key, *_ in FOREIGN_KEYS}
+    records = [(row, payload) for row in range(1, bulk_rows + 1)]
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    cases = [
+        ("single row: per-reference lookups", lambda db: lookups(db, payload), repeats),
+        ("single row: check_foreign_keys", lambda db: check_foreign_keys(db, payload), repeats),
+        (f"bulk chunk of {bulk_rows}: per-row lookups", lambda db: per_row(db, records), max(1, repeats // 100)),
+        (f"bulk chunk of {bulk_rows}: check_foreign_keys_bulk",
+         lambda db: check_foreign_keys_bulk(db, records), max(1, repeats // 100)),
+    ]
+    print(f"{'foreign key check':<48} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8}")
+    db = SessionLocal()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        for label, check, n in cases:
+            check(db)  # warm up the connection and the reference catalog
+            statements = 0
+            r = _time_calls(lambda: check(db), n)
+            print(f"{label:<48} {r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} {statements / n:>8.1f}")
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+        db.close()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=500, help="measured calls per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured calls per endpoint")
+    parser.add_argument("--match", default="", help="only endpoints whose label matches this regex")
+    parser.add_argument("--include-writes", action="store_true", help="also drive POST endpoints")
+    parser.add_argument("--save", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --save")
+    parser.add_argument("--fail-over", type=float, default=None,
+                        help="with --compare, exit 1 if any p95 regresses by more than this percentage")
+    parser.add_argument("--fk-validation", action="store_true",
+                        help="time the service request foreign key checks in process and exit")
+    parser.add_argument("--bulk-rows", type=int, default=1000, help="chunk size for --fk-validation")
+    args = parser.parse_args()
+
+    if args.fk_validation:
+        return fk_validation(args.requests, args.bulk_rows)
+
+    targets = [t for t in discover(args.base_url, args.include_writes) if re.search(args.match, t[0])]
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+
+    print(f"{'endpoint':<64} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}  p95 vs baseline")
+    results, regressions = {}, []
+
+    async def report():
+        async for label, r in run_all(args.base_url, targets, args.requests, args.concurrency, args.warmup):
+            results[label] = r
+            base = baseline.get(label, {})
+            change = _delta(r["p95_ms"], base.get("p95_ms", 0))
+            if args.fail_over is not None and base and r["p95_ms"] > base["p95_ms"] * (1 + args.fail_over / 100):
+                regressions.append(label)
+            print(f"{label[:64]:<64} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                  f"{r['p99_ms']:>8.1f} {r['errors']:>6}  {change}")
+
+    asyncio.run(report())
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "base_url": args.base_url,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "endpoints": results,
+            }, f, indent=2)
+        print(f"saved {len(results)} endpoints to {args.save}")
+    if regressions:
+        print(f"p95 regressed by more than {args.fail_over}% on: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Serialization cost per endpoint: default FastAPI path vs. the orjson fast path.
+
+Runs in-process against the configured database (seed it first), so only
+the response-building step is timed, not the query or the network. For
+every endpoint the same page of rows is turned into response bytes by:
+
+* ``orm+pydantic``: ORM entities validated against the route's
+  ``response_model`` (how the list endpoints used to work; list endpoints only)
+* ``default``: what the endpoint returns today with the fast path off:
+  column rows validated against ``response_model``, or dicts run through
+  ``jsonable_encoder``, then ``json.dumps``
+* ``orjson``: ``app.fast_json.respond`` (no validation, orjson encoding)
+
+Each run also checks that the fast path produces the same JSON.
+
+    python scripts/generate_data.py --scale 10k
+    python benchmarks/serialization.py --rows 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import APIRoute, serialize_response  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app import department_rollup, fast_json, monthly_trends  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models import Citizen, Grievance, Payment, ServiceRequest  # noqa: E402
+from app.routers.dashboard import RECENT_REQUESTS_SQL  # noqa: E402
+from main import app  # noqa: E402
+
+LIST_ENDPOINTS = {
+    "/api/citizens/": Citizen,
+    "/api/service-requests/": ServiceRequest,
+    "/api/grievances/": Grievance,
+    "/api/payments/": Payment,
+}
+
+
+def _route(path: str) -> APIRoute:
+    return next(r for r in app.routes if isinstance(r, APIRoute) and r.path == path and "GET" in r.methods)
+
+
+_loop = asyncio.new_event_loop()
+
+
+def _default_bytes(route: APIRoute, content) -> bytes:
+    # The same two steps FastAPI runs after the endpoint returns (validation
+    # inline, as for async endpoints, to leave threadpool hops out)
+    encoded = _loop.run_until_complete(serialize_response(
+        field=route.secure_cloned_response_field, response_content=content, is_coroutine=True,
+    ))
+    return JSONResponse(encoded).body
+
+
+def _fast_bytes(content) -> bytes:
+    return fast_json.respond(content, enabled=True).body
+
+
+def cases(db, rows: int):
+    """(label, route path, {path name: content}) for each benchmarked endpoint"""
+    for path, model in LIST_ENDPOINTS.items():
+        order = model.__table__.primary_key.columns.values()[0].desc()
+        variants = {
+            "orm+pydantic": list(db.execute(select(model).order_by(order).limit(rows)).scalars()),
+            "default": db.execute(select(model.__table__).order_by(order).limit(rows)).all(),
+        }
+        variants["orjson"] = variants["default"]
+        yield f"GET {path}?limit={rows}", path, variants
+
+    recent = [dict(r._mapping) for r in db.execute(RECENT_REQUESTS_SQL, {"limit": rows})]
+    yield f"GET /api/dashboard/recent-requests?limit={rows}", "/api/dashboard/recent-requests", \
+        {"default": recent, "orjson": recent}
+
+    performance = department_rollup.department_performance(db)
+    yield "GET /api/dashboard/department-performance", "/api/dashboard/department-performance", \
+        {"default": performance, "orjson": performance}
+
+    trends = monthly_trends.monthly_trends(db, months=120)
+    yield "GET /api/dashboard/monthly-trends?months=120", "/api/dashboard/monthly-trends", \
+        {"default": trends, "orjson": trends}
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="rows per list page")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per path; the best is reported")
+    args = parser.parse_args()
+
+    paths = ["orm+pydantic", "default", "orjson"]
+    print(f"{'endpoint':<52} {'rows':>5} " + " ".join(f"{p + ' ms':>16}" for p in paths) + f" {'speedup':>8}")
+    db = SessionLocal()
+    mismatches = 0
+    try:
+        for label, path, variants in cases(db, args.rows):
+            route = _route(path)
+            results = {}
+            for name, content in variants.items():
+                if name == "orjson":
+                    results[name] = timed(lambda: _fast_bytes(content), args.repeat)
+                else:
+                    results[name] = timed(lambda: _default_bytes(route, content), args.repeat)
+            if json.loads(_default_bytes(route, variants["default"])) != json.loads(_fast_bytes(variants["orjson"])):
+                mismatches += 1
+                print(f"  JSON differs between default and orjson paths for {label}", file=sys.stderr)
+            cells = " ".join(f"{results[p]:>16.2f}" if p in results else f"{'-':>16}" for p in paths)
+            print(f"{label:<52} {len(variants['default']):>5} {cells} {results['default'] / results['orjson']:>7.1f}x")
+    finally:
+        db.close()
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
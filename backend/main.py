@@ -1,17 +1,46 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import citizens, departments, services, dashboard, service_requests, grievances, custom_queries, payments
-from app.routers import db_tools
+from app.routers import db_tools, history, metrics, procedures
 from app.routers import payments
+from app.dashboard_counters import reconciler
+from app.db_routing import ReadRoutingMiddleware, replica_monitor
+from app.http_cache import add_compression
+from app.live_updates import broker as live_updates
+from app.reference_data import catalog as reference_catalog
+from app.request_metrics import RequestMetricsMiddleware, render_prometheus
+import logging
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Periodically recount the dashboard counters to correct drift from
+    # writes that bypass the routers (triggers, custom queries)
+    reconciler.start()
+    # Heartbeat that measures replica lag; reads use the primary until it runs
+    replica_monitor.start()
+    # Departments and services are served from memory; load them up front
+    try:
+        reference_catalog.load()
+    except Exception:
+        logger.exception("Reference data not loaded at startup; it will load on first use")
+    yield
+    await live_updates.stop()
+    replica_monitor.stop()
+    reconciler.stop()
+
 app = FastAPI(
     title="Citizen Service Management System",
     description="API for managing citizen services, requests, and grievances",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -23,8 +52,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "ETag", "X-Read-After"],
 )
 
+# GET/HEAD reads may use replicas; writes hand the client an X-Read-After token
+app.add_middleware(ReadRoutingMiddleware)
+
+# Per-route wall/DB time, query counts and the Server-Timing header
+app.add_middleware(RequestMetricsMiddleware)
+
+# gzip/brotli for large JSON bodies (outermost, so timings exclude it)
+add_compression(app)
+
 # Include routers
 app.include_router(citizens.router, prefix="/api")
 app.include_router(departments.router, prefix="/api")
@@ -35,6 +74,9 @@ app.include_router(dashboard.router, prefix="/api")
 app.include_router(custom_queries.router, prefix="/api")
 app.include_router(payments.router, prefix="/api")
 app.include_router(db_tools.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
+app.include_router(procedures.router, prefix="/api")
+app.include_router(history.router, prefix="/api")
 
 @app.get("/")
 def read_root():
@@ -48,6 +90,11 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,17 @@
+-- Support tables used by the application layer.
+-- Already part of schema.sql for new installs; IF NOT EXISTS makes this a
+-- no-op there and brings older databases up to date.
+
+-- Block ID allocation (app/id_allocator.py)
+CREATE TABLE IF NOT EXISTS id_sequence (
+    Sequence_Name VARCHAR(64),
+    Next_Value BIGINT NOT NULL,
+    CONSTRAINT pk_id_sequence PRIMARY KEY (Sequence_Name)
+);
+
+-- Materialized dashboard statistics (app/dashboard_counters.py)
+CREATE TABLE IF NOT EXISTS dashboard_counter (
+    Name VARCHAR(64),
+    Value DECIMAL(18,2) NOT NULL DEFAULT 0,
+    CONSTRAINT pk_dashboard_counter PRIMARY KEY (Name)
+);
@@ -0,0 +1,33 @@
+-- Secondary indexes for the queries the routers actually run.
+-- InnoDB already indexes every FOREIGN KEY column on its own; the indexes
+-- below add the filter/sort/group columns and make the hot aggregates
+-- covering so they are answered from the index without touching rows.
+
+-- Service_Request
+--   department performance: GROUP BY via Service_ID, CASE on Status, join on Payment_ID
+--   (the pending count of the counter reconciliation also reads this index;
+--   it runs every few minutes, not per request, so it gets no index of its own)
+CREATE INDEX idx_sr_service_status_payment ON Service_Request (Service_ID, Status, Payment_ID);
+--   recent requests / view_recent_requests: ORDER BY Request_Date DESC LIMIT n
+--   monthly trends: GROUP BY month of Request_Date with Citizen_ID, Payment_ID covered
+CREATE INDEX idx_sr_date_citizen_payment ON Service_Request (Request_Date, Citizen_ID, Payment_ID);
+--   citizen summary, fn_is_citizen_active: WHERE Citizen_ID = ? ... MAX(Request_Date)
+CREATE INDEX idx_sr_citizen_date ON Service_Request (Citizen_ID, Request_Date);
+
+-- Grievance
+--   open grievance counts (overall and per department), fn_open_grievances_by_department:
+--   WHERE Status IN (...) [AND Department_ID = ?] is a range over a short list of
+--   Status values either way, so one index serves both
+CREATE INDEX idx_grievance_status_department ON Grievance (Status, Department_ID);
+--   citizen summary: WHERE Citizen_ID = ? ... MAX(Date)
+CREATE INDEX idx_grievance_citizen_date ON Grievance (Citizen_ID, Date);
+
+-- Payment
+--   revenue: SUM(Amount) WHERE Status = 'Completed' (covering)
+CREATE INDEX idx_payment_status_amount ON Payment (Status, Amount);
+--   recent payments sample query: ORDER BY Payment_Date DESC
+CREATE INDEX idx_payment_date ON Payment (Payment_Date);
+
+-- Citizen
+--   name lookups and sorting
+CREATE INDEX idx_citizen_name ON Citizen (Name);
@@ -0,0 +1,15 @@
+-- Per-citizen summary projection (app/citizen_summary.py).
+-- Fill it after applying with: python -m app.citizen_summary rebuild
+
+CREATE TABLE IF NOT EXISTS citizen_summary (
+    Citizen_ID INT,
+    Total_Service_Requests INT NOT NULL DEFAULT 0,
+    Completed_Requests INT NOT NULL DEFAULT 0,
+    Pending_Requests INT NOT NULL DEFAULT 0,
+    Total_Grievances INT NOT NULL DEFAULT 0,
+    Open_Grievances INT NOT NULL DEFAULT 0,
+    Total_Amount_Paid DECIMAL(14,2) NOT NULL DEFAULT 0,
+    Last_Service_Request_Date DATE,
+    Last_Grievance_Date DATE,
+    CONSTRAINT pk_citizen_summary PRIMARY KEY (Citizen_ID)
+);
@@ -0,0 +1,14 @@
+-- Daily department/service/status buckets (app/department_rollup.py).
+-- Fill it after applying with: python -m app.department_rollup rebuild
+
+CREATE TABLE IF NOT EXISTS department_daily_rollup (
+    Department_ID INT NOT NULL,
+    Service_ID INT NOT NULL,
+    Day DATE NOT NULL,
+    Status VARCHAR(50) NOT NULL,
+    Request_Count INT NOT NULL DEFAULT 0,
+    Paid_Count INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    CONSTRAINT pk_department_daily_rollup PRIMARY KEY (Department_ID, Service_ID, Day, Status),
+    INDEX idx_rollup_day (Day)
+);
@@ -0,0 +1,12 @@
+-- Frozen aggregates of finished months (app/monthly_trends.py).
+-- Filled lazily by GET /api/dashboard/monthly-trends.
+
+CREATE TABLE IF NOT EXISTS monthly_trend (
+    Month CHAR(7),
+    Total_Requests INT NOT NULL DEFAULT 0,
+    Total_Revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    Unique_Citizens INT NOT NULL DEFAULT 0,
+    Citizen_Sketch BLOB,
+    Computed_At DATETIME NOT NULL,
+    CONSTRAINT pk_monthly_trend PRIMARY KEY (Month)
+);
@@ -0,0 +1,12 @@
+-- Search indexes (app/search.py, GET /api/citizens/search, /api/grievances/search).
+-- InnoDB maintains FULLTEXT indexes transactionally, so new and edited rows
+-- are searchable as soon as they commit. Email and Aadhaar_Number prefix
+-- searches use their existing UNIQUE indexes.
+
+-- Citizen: word-prefix search over names and email addresses
+ALTER TABLE Citizen ADD FULLTEXT INDEX ft_citizen_name_email (Name, Email);
+--   phone number prefix search: WHERE Phone LIKE '98765%'
+CREATE INDEX idx_citizen_phone ON Citizen (Phone);
+
+-- Grievance: full-text search of descriptions
+ALTER TABLE Grievance ADD FULLTEXT INDEX ft_grievance_description (Description);
@@ -0,0 +1,9 @@
+-- Replica lag heartbeat (app/db_routing.py).
+-- A single row the API rewrites on the primary every second and reads back
+-- from each replica; a replica's copy tells how far it has caught up.
+
+CREATE TABLE IF NOT EXISTS replica_heartbeat (
+    Id INT,
+    Beat_At DOUBLE NOT NULL,
+    CONSTRAINT pk_replica_heartbeat PRIMARY KEY (Id)
+);
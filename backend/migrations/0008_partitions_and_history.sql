@@ -0,0 +1,80 @@
+-- Time partitioning of the fact tables and the archive they age into
+-- (app/partitioning.py, app/archive.py, app/history.py).
+--
+-- Service_Request and Payment become RANGE COLUMNS partitioned on their
+-- dates. MySQL requires the partitioning column in every unique key and
+-- does not allow foreign keys on partitioned tables, so:
+--   * the request foreign keys are dropped (the routers already check them,
+--     see check_foreign_keys in app/routers/service_requests.py);
+--   * the primary keys gain the date column. IDs stay unique because they
+--     are handed out by app/id_allocator.py, not by the key;
+--   * the dates become NOT NULL. Existing NULLs get 1970-01-01, the day
+--     app/department_rollup.py already buckets undated requests under, and
+--     the BEFORE INSERT triggers keep filling in new ones.
+-- Everything starts in one p_future partition; run
+--     python -m app.partitioning maintain
+-- afterwards to split it into monthly partitions.
+
+ALTER TABLE Service_Request
+    DROP FOREIGN KEY fk_request_citizen,
+    DROP FOREIGN KEY fk_request_service,
+    DROP FOREIGN KEY fk_request_payment;
+
+UPDATE Service_Request SET Request_Date = '1970-01-01' WHERE Request_Date IS NULL;
+UPDATE Payment SET Payment_Date = '1970-01-01' WHERE Payment_Date IS NULL;
+
+ALTER TABLE Service_Request
+    MODIFY Request_Date DATE NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (Request_ID, Request_Date);
+
+ALTER TABLE Payment
+    MODIFY Payment_Date DATE NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (Payment_ID, Payment_Date);
+
+ALTER TABLE Service_Request
+    PARTITION BY RANGE COLUMNS (Request_Date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+ALTER TABLE Payment
+    PARTITION BY RANGE COLUMNS (Payment_Date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+-- Closed requests and their payments, moved here by python -m app.archive run.
+-- Compressed pages: rows are written once and read rarely.
+CREATE TABLE IF NOT EXISTS Service_Request_History (
+    Request_ID INT,
+    Citizen_ID INT,
+    Service_ID INT,
+    Request_Date DATE NOT NULL,
+    Status VARCHAR(50),
+    Payment_ID INT,
+    Archived_At DATETIME NOT NULL,
+    CONSTRAINT pk_request_history PRIMARY KEY (Request_ID),
+    INDEX idx_srh_citizen_date (Citizen_ID, Request_Date),
+    INDEX idx_srh_date_citizen_payment (Request_Date, Citizen_ID, Payment_ID),
+    INDEX idx_srh_service_status_payment (Service_ID, Status, Payment_ID)
+) ROW_FORMAT=COMPRESSED;
+
+CREATE TABLE IF NOT EXISTS Payment_History (
+    Payment_ID INT,
+    Amount DECIMAL(10,2),
+    Payment_Date DATE,
+    Payment_Method VARCHAR(50),
+    Status VARCHAR(50),
+    Archived_At DATETIME NOT NULL,
+    CONSTRAINT pk_payment_history PRIMARY KEY (Payment_ID),
+    INDEX idx_ph_date (Payment_Date),
+    INDEX idx_ph_status_amount (Status, Amount)
+) ROW_FORMAT=COMPRESSED;
+
+-- One row per archive run
+CREATE TABLE IF NOT EXISTS archive_run (
+    Run_ID INT AUTO_INCREMENT,
+    Started_At DATETIME NOT NULL,
+    Finished_At DATETIME,
+    Cutoff DATE NOT NULL,
+    Requests INT NOT NULL DEFAULT 0,
+    Payments INT NOT NULL DEFAULT 0,
+    Parquet_Path VARCHAR(500),
+    CONSTRAINT pk_archive_run PRIMARY KEY (Run_ID)
+);
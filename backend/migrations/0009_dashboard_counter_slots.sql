@@ -0,0 +1,10 @@
+-- Slotted dashboard counters (app/dashboard_counters.py).
+-- Each counter is spread over DASHBOARD_COUNTER_SLOTS rows and a writer bumps
+-- one of them at random, so concurrent writes no longer queue on the same six
+-- rows. The existing values stay in slot 0; the first read of the counters
+-- finds the other slots missing and creates them with a full recount.
+
+ALTER TABLE dashboard_counter
+    ADD COLUMN Slot SMALLINT NOT NULL DEFAULT 0 AFTER Name,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (Name, Slot);
@@ -0,0 +1,26 @@
+-- Department rollup buckets keyed by service only (app/department_rollup.py).
+-- The department is joined from Service when the buckets are read, so a
+-- service moved to another department (PUT /api/services/{id},
+-- sp_transfer_service_to_department) takes its history along at once.
+-- Buckets of a service that already moved collapse into one per day/status.
+
+CREATE TABLE department_daily_rollup_by_service (
+    Service_ID INT NOT NULL,
+    Day DATE NOT NULL,
+    Status VARCHAR(50) NOT NULL,
+    Request_Count INT NOT NULL DEFAULT 0,
+    Paid_Count INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    CONSTRAINT pk_department_daily_rollup PRIMARY KEY (Service_ID, Day, Status),
+    INDEX idx_rollup_day (Day)
+);
+
+INSERT INTO department_daily_rollup_by_service (Service_ID, Day, Status, Request_Count, Paid_Count, Revenue)
+SELECT Service_ID, Day, Status, SUM(Request_Count), SUM(Paid_Count), SUM(Revenue)
+FROM department_daily_rollup
+GROUP BY Service_ID, Day, Status;
+
+RENAME TABLE department_daily_rollup TO department_daily_rollup_by_department,
+             department_daily_rollup_by_service TO department_daily_rollup;
+
+DROP TABLE department_daily_rollup_by_department;
@@ -0,0 +1,11 @@
+-- Versioned frozen months (app/monthly_trends.py).
+-- A late write into a finished month bumps its Version instead of deleting
+-- the row; the stored numbers are only used while Frozen_Version (the
+-- version they were computed at) still equals Version. Existing rows stay
+-- valid.
+
+ALTER TABLE monthly_trend
+    ADD COLUMN Version INT NOT NULL DEFAULT 0,
+    ADD COLUMN Frozen_Version INT;
+
+UPDATE monthly_trend SET Frozen_Version = Version;
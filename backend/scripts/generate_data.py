@@ -0,0 +1,235 @@
+"""Seeded synthetic data generator for load and scaling tests.
+
+Produces Department, Service, Citizen, Payment, Service_Request and
+Grievance rows with realistic skew: a few departments and services receive
+most requests (Zipf), a minority of citizens file most requests, request
+volume grows towards the end of the date range, and statuses, payment
+methods and amounts follow fixed weights. The same --seed and --scale always
+produce the same rows.
+
+Rows are inserted in chunked multi-row executemany transactions, the same
+path the /bulk endpoints use, with IDs reserved from the block allocator.
+
+    python scripts/generate_data.py --scale 10k
+    python scripts/generate_data.py --scale 10m --seed 7 --end-date 2025-06-30
+
+--scale is the number of Service_Request rows (1k .. 100m); the other
+tables are sized relative to it. Dashboard counters, citizen summaries and
+the department rollup are rebuilt at the end.
+"""
+import argparse
+import bisect
+import datetime
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import citizen_summary, dashboard_counters, department_rollup  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.id_allocator import id_allocator  # noqa: E402
+from app.models import Citizen, Department, Grievance, Payment, Service, ServiceRequest  # noqa: E402
+
+CHUNK_ROWS = 10000
+
+DEPARTMENTS = [
+    "Revenue", "Municipal Corporation", "Electricity Board", "Water Supply", "Transport",
+    "Health", "Education", "Police", "Housing", "Agriculture", "Social Welfare", "Labour",
+]
+SERVICE_TYPES = {"Certificate": 0.45, "Utility": 0.40, "Grievance": 0.15}
+REQUEST_STATUS = {"Completed": 0.55, "Pending": 0.20, "Processing": 0.15, "Rejected": 0.10}
+PAYMENT_STATUS = {"Completed": 0.85, "Pending": 0.10, "Failed": 0.05}
+PAYMENT_METHOD = {"UPI": 0.60, "Card": 0.25, "Cash": 0.15}
+GRIEVANCE_STATUS = {"Open": 0.25, "In Progress": 0.15, "Under Review": 0.10, "Resolved": 0.40, "Closed": 0.10}
+# Median fee per service type; amounts are log-normal around it
+FEE_MEDIAN = {"Certificate": 150.0, "Utility": 900.0, "Grievance": 0.0}
+PAID_REQUEST_SHARE = 0.7
+
+
+def parse_scale(value: str) -> int:
+    value = value.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(value[-1], 1)
+    return int(float(value.rstrip("km")) * factor)
+
+
+class Weighted:
+    """Fast repeated weighted choice via cumulative weights"""
+
+    def __init__(self, weights: dict):
+        self.values = list(weights)
+        self.cumulative = list(itertools.accumulate(weights.values()))
+
+    def pick(self, rng: random.Random):
+        return self.values[bisect.bisect(self.cumulative, rng.random() * self.cumulative[-1])]
+
+
+def zipf_weights(n: int, s: float = 1.1) -> list:
+    return [1 / (k ** s) for k in range(1, n + 1)]
+
+
+class Generator:
+    def __init__(self, scale: int, seed: int, end_date: datetime.date, years: int):
+        self.rng = random.Random(seed)
+        self.requests = scale
+        self.citizens = max(10, scale // 3)
+        self.grievances = max(1, scale // 10)
+        self.end_date = end_date
+        self.days = 365 * years
+        self.request_status = Weighted(REQUEST_STATUS)
+        self.payment_status = Weighted(PAYMENT_STATUS)
+        self.payment_method = Weighted(PAYMENT_METHOD)
+        self.grievance_status = Weighted(GRIEVANCE_STATUS)
+
+    def random_date(self) -> datetime.date:
+        # u ** 0.6 leans towards 1, i.e. towards end_date: volume grows over time
+        offset = int((1 - self.rng.random() ** 0.6) * self.days)
+        return self.end_date - datetime.timedelta(days=offset)
+
+    def heavy_citizen(self, citizen_ids: range) -> int:
+        # Squaring a uniform draw concentrates activity on a minority of citizens
+        return citizen_ids[int(len(citizen_ids) * self.rng.random() ** 2)]
+
+    def departments(self, ids):
+        return [{"Department_ID": i, "Department_Name": name, "Contact_Info": f"{name.lower().replace(' ', '.')}@gov.example"}
+                for i, name in zip(ids, DEPARTMENTS)]
+
+    def services(self, ids, department_ids):
+        types = Weighted(SERVICE_TYPES)
+        rows = []
+        for n, service_id in enumerate(ids):
+            rows.append({
+                "Service_ID": service_id,
+                "Service_Name": f"Service {n + 1:03d}",
+                "Service_Type": types.pick(self.rng),
+                "Department_ID": department_ids[n % len(department_ids)],
+            })
+        return rows
+
+    def citizens_chunk(self, ids):
+        return [{
+            "Citizen_ID": i,
+            "Name": f"Citizen {i}",
+            "Address": f"{self.rng.randint(1, 999)} Ward {self.rng.randint(1, 200)}",
+            "Phone": f"9{self.rng.randint(100000000, 999999999)}",
+            "Email": f"citizen{i}@example.org",
+            "Aadhaar_Number": f"{i:012d}",
+        } for i in ids]
+
+    def requests_chunk(self, ids, citizen_ids, services, service_picker):
+        """Return (payments, requests); roughly 70% of requests carry a payment"""
+        payments, requests = [], []
+        for request_id in ids:
+            service = services[service_picker.pick(self.rng)]
+            request_date = self.random_date()
+            payment = None
+            if self.rng.random() < PAID_REQUEST_SHARE:
+                median = FEE_MEDIAN[service["Service_Type"]] or 50.0
+                payment = {
+                    "Amount": round(self.rng.lognormvariate(0, 0.5) * median, 2),
+                    "Payment_Date": min(self.end_date, request_date + datetime.timedelta(days=self.rng.randint(0, 3))),
+                    "Payment_Method": self.payment_method.pick(self.rng),
+                    "Status": self.payment_status.pick(self.rng),
+                }
+                payments.append(payment)
+            requests.append(({
+                "Request_ID": request_id,
+                "Citizen_ID": self.heavy_citizen(citizen_ids),
+                "Service_ID": service["Service_ID"],
+                "Request_Date": request_date,
+                "Status": self.request_status.pick(self.rng),
+            }, payment))
+        return payments, requests
+
+    def grievances_chunk(self, ids, citizen_ids, department_ids, department_picker):
+        return [{
+            "Grievance_ID": i,
+            "Citizen_ID": self.heavy_citizen(citizen_ids),
+            "Department_ID": department_ids[department_picker.pick(self.rng)],
+            "Description": f"Synthetic grievance {i}",
+            "Status": self.grievance_status.pick(self.rng),
+            "Date": self.random_date(),
+        } for i in ids]
+
+
+def chunks(ids: range, size: int = CHUNK_ROWS):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def load(model, rows) -> None:
+    if rows:
+        with engine.begin() as conn:
+            conn.execute(insert(model), rows)
+
+
+def progress(label: str, done: int, total: int, started: float) -> None:
+    rate = done / max(time.perf_counter() - started, 1e-9)
+    print(f"\r{label:<16} {done:>12,}/{total:,}  {rate:>10,.0f} rows/s", end="", flush=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="10k", help="Service_Request rows, e.g. 1k, 250k, 10m, 100m")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", type=datetime.date.fromisoformat, default=datetime.date(2025, 12, 31))
+    parser.add_argument("--years", type=int, default=3, help="length of the date range")
+    args = parser.parse_args()
+
+    gen = Generator(parse_scale(args.scale), args.seed, args.end_date, args.years)
+
+    department_ids = list(id_allocator.reserve_range(Department, len(DEPARTMENTS)))
+    load(Department, gen.departments(department_ids))
+    service_ids = list(id_allocator.reserve_range(Service, 60))
+    services = gen.services(service_ids, department_ids)
+    load(Service, services)
+    print(f"departments/services  {len(department_ids)}/{len(services)}")
+
+    # Zipf over services: a handful of services attract most of the traffic
+    service_picker = Weighted(dict(enumerate(zipf_weights(len(services)))))
+    department_picker = Weighted(dict(enumerate(zipf_weights(len(department_ids)))))
+
+    citizen_ids = id_allocator.reserve_range(Citizen, gen.citizens)
+    started = time.perf_counter()
+    for n, ids in enumerate(chunks(citizen_ids)):
+        load(Citizen, gen.citizens_chunk(ids))
+        progress("citizens", min((n + 1) * CHUNK_ROWS, len(citizen_ids)), len(citizen_ids), started)
+    print()
+
+    request_ids = id_allocator.reserve_range(ServiceRequest, gen.requests)
+    started = time.perf_counter()
+    for n, ids in enumerate(chunks(request_ids)):
+        payments, requests = gen.requests_chunk(ids, citizen_ids, services, service_picker)
+        for payment_id, payment in zip(id_allocator.reserve_range(Payment, len(payments)), payments):
+            payment["Payment_ID"] = payment_id
+        load(Payment, payments)
+        load(ServiceRequest, [
+            {**request, "Payment_ID": payment["Payment_ID"] if payment else None} for request, payment in requests
+        ])
+        progress("service requests", min((n + 1) * CHUNK_ROWS, len(request_ids)), len(request_ids), started)
+    print()
+
+    grievance_ids = id_allocator.reserve_range(Grievance, gen.grievances)
+    started = time.perf_counter()
+    for n, ids in enumerate(chunks(grievance_ids)):
+        load(Grievance, gen.grievances_chunk(ids, citizen_ids, department_ids, department_picker))
+        progress("grievances", min((n + 1) * CHUNK_ROWS, len(grievance_ids)), len(grievance_ids), started)
+    print()
+
+    db = SessionLocal()
+    try:
+        dashboard_counters.reconcile(db)
+        print("dashboard counters reconciled")
+        print(f"{citizen_summary.rebuild(db):,} citizen summaries rebuilt")
+        print(f"{department_rollup.rebuild(db):,} department rollup buckets rebuilt")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
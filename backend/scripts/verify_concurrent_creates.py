@@ -0,0 +1,103 @@
+"""Check that parallel creates get distinct IDs and never fail with a 5xx.
+
+Fires ``--creates`` POSTs per endpoint from ``--concurrency`` clients at a
+running server, all at once, and checks the IDs in the responses. Run it
+against a fresh database too: the first reservation of each sequence is the
+racy one (see ``app/id_allocator.py``). Several uvicorn workers exercise the
+cross-process case:
+
+    uvicorn main:app --port 8000 --workers 4
+    python scripts/verify_concurrent_creates.py
+    python scripts/verify_concurrent_creates.py --creates 5000 --concurrency 200
+    python scripts/verify_concurrent_creates.py --citizen-id 7 --service-id 3
+
+Service requests reference a citizen and a service (IDs 1 by default, which
+any database seeded by scripts/generate_data.py has). Exit status is 1 on any duplicate ID or server error. Requires httpx
+(pip install httpx).
+"""
+import argparse
+import asyncio
+import collections
+import sys
+
+import httpx
+
+# Endpoint -> (JSON body, ID field of the response). The bodies leave out
+# the unique columns (Email, Aadhaar_Number) so repeated inserts succeed.
+# Service requests get their citizen and service in endpoints().
+ENDPOINTS = {
+    "/api/citizens/": ({"Name": "Concurrent Citizen", "Address": "1 Load Road"}, "Citizen_ID"),
+    "/api/payments/": ({"Amount": 10, "Payment_Method": "UPI", "Status": "Pending",
+                        "Payment_Date": "2025-01-01"}, "Payment_ID"),
+    "/api/grievances/": ({"Description": "Concurrent grievance", "Status": "Open",
+                          "Date": "2025-01-01"}, "Grievance_ID"),
+    "/api/service-requests/": ({"Status": "Pending", "Request_Date": "2025-01-01"}, "Request_ID"),
+}
+
+
+def endpoints(citizen_id: int, service_id: int) -> dict:
+    """ENDPOINTS with the service request body pointing at existing rows"""
+    result = dict(ENDPOINTS)
+    body, id_field = result["/api/service-requests/"]
+    result["/api/service-requests/"] = ({**body, "Citizen_ID": citizen_id, "Service_ID": service_id}, id_field)
+    return result
+
+
+async def create_all(client, path: str, body: dict, id_field: str, total: int, concurrency: int):
+    ids, statuses = [], collections.Counter()
+    remaining = iter(range(total))
+    start = asyncio.Event()
+
+    async def worker():
+        await start.wait()
+        for _ in remaining:
+            try:
+                response = await client.post(path, json=body)
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            statuses[response.status_code] += 1
+            if response.status_code < 400:
+                ids.append(response.json()[id_field])
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    # Release every client at once so the first block reservations collide
+    start.set()
+    await asyncio.gather(*workers)
+    return ids, statuses
+
+
+async def run(base_url: str, total: int, concurrency: int, targets: dict) -> int:
+    failures = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        results = await asyncio.gather(*(
+            create_all(client, path, body, id_field, total, concurrency)
+            for path, (body, id_field) in targets.items()
+        ))
+    for path, (ids, statuses) in zip(targets, results):
+        duplicates = [i for i, n in collections.Counter(ids).items() if n > 1]
+        errors = {s: n for s, n in statuses.items() if not isinstance(s, int) or s >= 500}
+        ok = not duplicates and not errors and len(ids) == total
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':<4} POST {path}: {len(ids)}/{total} created, "
+              f"{len(duplicates)} duplicate IDs, statuses {dict(statuses)}")
+        if duplicates:
+            print(f"       duplicates: {sorted(duplicates)[:10]}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--creates", type=int, default=2000, help="POSTs per endpoint")
+    parser.add_argument("--concurrency", type=int, default=100, help="parallel clients per endpoint")
+    parser.add_argument("--citizen-id", type=int, default=1, help="existing citizen of the service requests")
+    parser.add_argument("--service-id", type=int, default=1, help="existing service of the service requests")
+    args = parser.parse_args()
+    targets = endpoints(args.citizen_id, args.service_id)
+    return asyncio.run(run(args.base_url, args.creates, args.concurrency, targets))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
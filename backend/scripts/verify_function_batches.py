@@ -0,0 +1,76 @@
+"""Check that the batch function endpoints match the stored functions exactly.
+
+For a sample of IDs (random existing ones, some with archived requests, plus
+a few that do not exist) it calls each ``fn_*`` function once per ID and compares the result with
+``app.function_batches.compute`` for the whole sample. Needs MySQL with
+``sql/triggers_and_procedures.sql`` loaded:
+
+    python scripts/verify_function_batches.py
+    python scripts/verify_function_batches.py --sample 2000
+
+Exit status is 1 when any value differs.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, text  # noqa: E402
+
+from app.database import SessionLocal, engine  # noqa: E402
+from app.function_batches import FUNCTIONS, compute  # noqa: E402
+from app.models import Citizen, Department, Service, ServiceRequestHistory  # noqa: E402
+
+ID_COLUMNS = {
+    "citizen_id": Citizen.Citizen_ID,
+    "service_id": Service.Service_ID,
+    "department_id": Department.Department_ID,
+}
+# Where IDs with archived requests come from, so both sides get compared
+ARCHIVED_ID_COLUMNS = {
+    "citizen_id": ServiceRequestHistory.Citizen_ID,
+    "service_id": ServiceRequestHistory.Service_ID,
+}
+
+
+def sample_ids(db, column, size: int, archived=None) -> list:
+    ids = list(db.scalars(select(column).order_by(func.rand()).limit(size)))
+    if archived is not None:
+        ids += db.scalars(select(archived).distinct().order_by(func.rand()).limit(size // 10 or 1)).all()
+    highest = db.scalar(select(func.max(column))) or 0
+    # IDs without rows must give the function's empty value too
+    return ids + [0, -1, highest + 1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", type=int, default=500, help="existing IDs checked per function")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "mysql":
+        print("verify_function_batches needs MySQL (the stored functions only exist there)")
+        return 2
+
+    mismatches = 0
+    db = SessionLocal()
+    try:
+        for name, fn in FUNCTIONS.items():
+            ids = sample_ids(db, ID_COLUMNS[fn.id_param], args.sample, ARCHIVED_ID_COLUMNS.get(fn.id_param))
+            batch = {row[fn.id_param]: row[fn.column] for row in compute(db, name, ids)}
+            differing = []
+            for i in ids:
+                scalar = db.scalar(text(f"SELECT {fn.function}(:id)"), {"id": i})
+                if scalar != batch[i] or type(scalar) is not type(batch[i]):
+                    differing.append((i, scalar, batch[i]))
+            mismatches += len(differing)
+            print(f"{'FAIL' if differing else 'ok':<4} {name}: {len(ids)} IDs")
+            for i, scalar, value in differing[:10]:
+                print(f"       {fn.id_param}={i}: {fn.function} -> {scalar!r}, batch -> {value!r}")
+    finally:
+        db.close()
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""EXPLAIN every query the API runs and fail on full table scans.
+
+The statements are not copied into this script, so they cannot drift from
+the code. The script calls every GET route of the app in process (plus the
+read-only POSTs in EXTRA_CALLS and the background reads in JOBS), with the
+result cache and single flight off, and records each SELECT the application
+sends to the database. List routes are called a second time with the cursor
+of their first page. Every distinct statement is then EXPLAINed with the
+parameters it ran with. A statement that calls a stored function or
+procedure is followed into the routine: the SELECTs of its body, read from
+``information_schema.ROUTINES``, are EXPLAINed with the call's arguments.
+
+Meant to run against a database seeded at production scale (10M rows per
+fact table by default) after ``python -m app.migrations up``:
+
+    python scripts/verify_query_plans.py
+    python scripts/verify_query_plans.py --max-scan-rows 50000 --expected-rows 1000000
+    python scripts/verify_query_plans.py --list   # print the traced statements only (any database)
+
+The GET routes run as they would in production, including the writes some
+of them make (projections built on first use). A plan step with access type
+``ALL`` over more than ``--max-scan-rows`` estimated rows is a failure. Full
+*index* scans (``index``) are reported but allowed: the whole-history
+aggregates (monthly trends, department rollup) must read every row once,
+and a covering index is the cheapest way to do that. Exit status is 1 when
+any query fails.
+"""
+import argparse
+import contextlib
+import datetime
+import os
+import re
+import sys
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Every read must reach the database, and only the primary (where EXPLAIN runs)
+os.environ.update({
+    "CACHE_TTL_SECONDS": "0",
+    "SINGLE_FLIGHT": "off",
+    "REPLICA_DATABASE_URLS": "",
+    "DASHBOARD_RECONCILE_SECONDS": "0",
+})
+
+from fastapi.routing import APIRoute  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, text  # noqa: E402
+
+from app import archive, citizen_summary, dashboard_counters, database, function_batches  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.pagination import NEXT_CURSOR_HEADER  # noqa: E402
+from app.routers.db_tools import ALLOWED_VIEWS  # noqa: E402
+from main import app  # noqa: E402
+
+# Values for path/query parameters, keyed by parameter name; a list calls the
+# route once per value. IDs exist in any database seeded by scripts/generate_data.py.
+PARAM_VALUES = {
+    "citizen_id": 1,
+    "department_id": 1,
+    "service_id": 1,
+    "request_id": 1,
+    "grievance_id": 1,
+    "payment_id": 1,
+    "view_name": sorted(ALLOWED_VIEWS),
+    # Name (FULLTEXT) and phone (prefix) searches take different paths
+    "q": ["kumar", "98765"],
+}
+SKIP_PATHS = ("/stream", "/export", "/cache-stats", "/metrics")
+# Read-only POST routes: (path, JSON body)
+EXTRA_CALLS = [
+    (f"/api/db/functions/{name}/batch", {"ids": [1, 2, 3]}) for name in sorted(function_batches.FUNCTIONS)
+]
+# Reads of the background jobs: (label, function of a session)
+JOBS = [
+    ("dashboard_counters.compute_from_tables", dashboard_counters.compute_from_tables),
+    ("citizen_summary.compute", lambda db: citizen_summary.compute(db, [1, 2, 3])),
+    ("archive batches", lambda db: [
+        db.execute(archive.next_batch(source, keys, None, 1)).all()
+        for source, keys in archive.phases(archive.cutoff_for(archive.ARCHIVE_AFTER_MONTHS))
+    ]),
+]
+
+_ROUTINE_CALL = re.compile(r"\b(?:CALL\s+)?((?:fn|sp)_\w+)\s*\(", re.IGNORECASE)
+
+
+class Trace:
+    """Distinct SELECT statements with their first parameters and the callers that ran them"""
+
+    def __init__(self):
+        self.statements: Dict[str, Tuple[object, List[str]]] = {}
+        # The caller being traced. The app runs on the test client's own
+        # thread, so this is a plain attribute, not a context variable.
+        self.label = "(background)"
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or not re.match(r"\s*(SELECT|WITH|CALL)\b", statement, re.IGNORECASE):
+            return
+        if statement.lstrip().upper().startswith("EXPLAIN"):
+            return
+        _, labels = self.statements.setdefault(statement, (parameters, []))
+        if self.label not in labels:
+            labels.append(self.label)
+
+    @contextlib.contextmanager
+    def installed(self):
+        engines = [engine] + ([database.async_engine.sync_engine] if database.async_engine else [])
+        for e in engines:
+            event.listen(e, "before_cursor_execute", self.record)
+        try:
+            yield self
+        finally:
+            for e in engines:
+                event.remove(e, "before_cursor_execute", self.record)
+
+
+def _param_sets(route: APIRoute) -> List[Tuple[str, dict]]:
+    """(path, query) combinations to call ``route`` with; empty if a required value is unknown"""
+    combos = [(route.path, {})]
+    for param in route.dependant.path_params + route.dependant.query_params:
+        value = PARAM_VALUES.get(param.name)
+        if value is None:
+            if param.required:
+                print(f"skipping GET {route.path}: no value for {param.name}", file=sys.stderr)
+                return []
+            continue
+        values = value if isinstance(value, list) else [value]
+        expanded = []
+        for path, query in combos:
+            for v in values:
+                if param in route.dependant.path_params:
+                    expanded.append((path.replace("{" + param.name + "}", str(v)), query))
+                else:
+                    expanded.append((path, {**query, param.name: v}))
+        combos = expanded
+    return combos
+
+
+def trace_app() -> Trace:
+    trace = Trace()
+    with trace.installed(), TestClient(app) as client:
+        for route in app.routes:
+            if not isinstance(route, APIRoute) or "GET" not in route.methods or not route.path.startswith("/api/"):
+                continue
+            if any(s in route.path for s in SKIP_PATHS):
+                continue
+            for path, query in _param_sets(route):
+                trace.label = f"GET {path}"
+                response = client.get(path, params=query)
+                if response.status_code >= 500:
+                    print(f"warning: GET {path} answered {response.status_code}", file=sys.stderr)
+                cursor = response.headers.get(NEXT_CURSOR_HEADER)
+                if cursor:
+                    trace.label = f"GET {path} (next page)"
+                    client.get(path, params={**query, "cursor": cursor})
+        for path, body in EXTRA_CALLS:
+            trace.label = f"POST {path}"
+            client.post(path, json=body)
+        for label, job in JOBS:
+            trace.label = label
+            db = SessionLocal()
+            try:
+                job(db)
+            finally:
+                db.rollback()
+                db.close()
+        trace.label = "(background)"
+    return trace
+
+
+def routine_selects(conn, name: str, args: List[str]) -> List[str]:
+    """The SELECT statements of a stored routine's body, with its parameters replaced by ``args``"""
+    body = conn.execute(text(
+        "SELECT ROUTINE_DEFINITION FROM information_schema.ROUTINES "
+        "WHERE ROUTINE_SCHEMA = DATABASE() AND ROUTINE_NAME = :n"
+    ), {"n": name}).scalar()
+    if not body:
+        return []
+    params = [row[0] for row in conn.execute(text(
+        "SELECT PARAMETER_NAME FROM information_schema.PARAMETERS WHERE SPECIFIC_SCHEMA = DATABASE() "
+        "AND SPECIFIC_NAME = :n AND PARAMETER_NAME IS NOT NULL ORDER BY ORDINAL_POSITION"
+    ), {"n": name})]
+    body = re.sub(r"--[^\n]*", "", body)
+    selects = []
+    for stmt in body.split(";"):
+        stmt = re.sub(r"^\s*BEGIN\b", "", stmt.strip(), flags=re.IGNORECASE).strip()
+        if not re.match(r"SELECT\b", stmt, re.IGNORECASE):
+            continue
+        # SELECT ... INTO var FROM ... -> SELECT ... FROM ...
+        stmt = re.sub(r"\bINTO\s+[\w@,\s]+?(?=\bFROM\b)", "", stmt, flags=re.IGNORECASE)
+        for param, arg in zip(params, args):
+            stmt = re.sub(rf"\b{re.escape(param)}\b", arg, stmt)
+        selects.append(stmt)
+    return selects
+
+
+def _call_arguments(parameters) -> List[str]:
+    """Literal arguments of the routine calls in a traced statement (the IDs are plain numbers)"""
+    values = list(parameters.values()) if isinstance(parameters, dict) else list(parameters or ())
+    return [str(int(v)) if isinstance(v, (int, float)) else repr(str(v)) for v in values]
+
+
+def explain(conn, sql: str, parameters=None) -> List[dict]:
+    # On the DBAPI cursor, so the statement and parameters go out exactly as traced
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("EXPLAIN " + sql, parameters)
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def table_rows(conn, table: str) -> int:
+    return conn.execute(
+        text("SELECT TABLE_ROWS FROM information_schema.TABLES "
+             "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t"),
+        {"t": table},
+    ).scalar() or 0
+
+
+def check(plan: List[dict], max_scan_rows: int) -> Tuple[List[str], List[str]]:
+    problems, notes = [], []
+    for step in plan:
+        access, rows = step.get("type"), step.get("rows") or 0
+        label = f"{step.get('table')}({access}, ~{rows:,} rows, key={step.get('key')})"
+        if access == "ALL" and rows > max_scan_rows:
+            problems.append(label)
+        elif access == "index":
+            notes.append(label)
+    return problems, notes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-scan-rows", type=int, default=10000,
+                        help="largest table a query may scan in full (type=ALL)")
+    parser.add_argument("--expected-rows", type=int, default=10_000_000,
+                        help="warn when Service_Request is smaller than this")
+    parser.add_argument("--list", action="store_true", help="print the traced statements without EXPLAIN")
+    args = parser.parse_args()
+
+    if not args.list and engine.dialect.name != "mysql":
+        print("verify_query_plans needs MySQL (EXPLAIN output is engine specific); --list works anywhere")
+        return 2
+
+    started = datetime.datetime.now()
+    trace = trace_app()
+    print(f"traced {len(trace.statements)} distinct statements in "
+          f"{(datetime.datetime.now() - started).total_seconds():.1f}s\n")
+    if args.list:
+        for statement, (parameters, labels) in trace.statements.items():
+            print(f"-- {', '.join(labels)}\n{' '.join(statement.split())}\n   {parameters!r}\n")
+        return 0
+
+    failures = checked = 0
+    with engine.connect() as conn:
+        seeded = table_rows(conn, "Service_Request")
+        if seeded < args.expected_rows:
+            print(f"warning: Service_Request holds ~{seeded:,} rows, plans may differ at "
+                  f"{args.expected_rows:,}; seed with scripts/generate_data.py first")
+
+        for statement, (parameters, labels) in trace.statements.items():
+            name = labels[0] + (f" (+{len(labels) - 1} more)" if len(labels) > 1 else "")
+            targets = []
+            calls = _ROUTINE_CALL.findall(statement)
+            if calls:
+                arguments = _call_arguments(parameters)
+                for routine in dict.fromkeys(calls):
+                    targets += [(f"{name} -> {routine}", sql, None)
+                                for sql in routine_selects(conn, routine, arguments)]
+            else:
+                targets.append((name, statement, parameters))
+            for target, sql, params in targets:
+                problems, notes = check(explain(conn, sql, params), args.max_scan_rows)
+                checked += 1
+                failures += bool(problems)
+                print(f"{'FAIL' if problems else 'ok':<4} {target}")
+                if problems:
+                    print(f"       {' '.join(sql.split())[:300]}")
+                for p in problems:
+                    print(f"       full table scan: {p}")
+                for n in notes:
+                    print(f"       full index scan: {n}")
+
+    print(f"\n{failures} of {checked} queries do full table scans")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Check read/write splitting (app/db_routing.py) with two SQLite files.
+
+Creates a scratch primary and a scratch replica database in a temporary
+directory, gives citizen 1 a different name in each, and runs the app in
+process against them. There is no replication between the files, so the
+script copies the ``replica_heartbeat`` row from the primary to the replica
+itself whenever the replica is meant to have caught up. It checks that:
+
+* a replica whose heartbeat was never seen is not used;
+* GET requests read from the replica once its heartbeat is fresh, including
+  the dashboard aggregates;
+* console SELECTs read from the replica, whose connections get the console's
+  ``max_execution_time`` listener (the statement itself needs MySQL);
+* a session that wrote reads from the primary from then on;
+* a GET sending an ``X-Read-After`` stamp newer than the replica's heartbeat
+  reads from the primary until the heartbeat passes it;
+* a write request returns ``X-Read-After`` (and the ``read_after`` cookie),
+  and reads of the written table use the primary until the replica has it.
+
+    python scripts/verify_replica_routing.py
+
+Exit status is 1 when any check fails. Nothing outside the temporary
+directory is touched; any DATABASE_URL in the environment is ignored.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_scratch = tempfile.mkdtemp(prefix="replica-routing-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_scratch}/primary.db",
+    "REPLICA_DATABASE_URLS": f"sqlite:///{_scratch}/replica.db",
+    # The script beats the heartbeat itself, so it decides when the replica catches up
+    "REPLICA_LAG_CHECK_SECONDS": "0",
+    "REPLICA_MAX_LAG_SECONDS": "60",
+    # Every read must reach a database
+    "CACHE_TTL_SECONDS": "0",
+    "SINGLE_FLIGHT": "off",
+    "DASHBOARD_RECONCILE_SECONDS": "0",
+})
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, insert, select, text  # noqa: E402
+
+from app import db_routing, query_governor  # noqa: E402
+from app.database import (  # noqa: E402
+    Base, SessionLocal, custom_query_replicas, engine, replica_reads_allowed, replicas,
+)
+from app.models import Citizen, ReplicaHeartbeat  # noqa: E402
+from main import app  # noqa: E402
+
+ON_PRIMARY, ON_REPLICA = "Read From Primary", "Read From Replica"
+# Reads built from Core expressions (aggregates, labels), routed like the rest
+ANALYTICS_PATHS = ("/api/dashboard/stats", "/api/dashboard/department-performance", "/api/dashboard/monthly-trends")
+
+failures = 0
+
+
+def expect(label: str, ok: bool, detail: str = "") -> None:
+    global failures
+    failures += not ok
+    print(f"{'ok' if ok else 'FAIL':<4} {label}" + (f" ({detail})" if detail and not ok else ""))
+
+
+def seed() -> None:
+    replica = replicas.engines[0]
+    for bind, name in ((engine, ON_PRIMARY), (replica, ON_REPLICA)):
+        Base.metadata.create_all(bind)
+        with bind.begin() as conn:
+            conn.execute(insert(Citizen).values(Citizen_ID=1, Name=name))
+
+
+def replicate_heartbeat() -> None:
+    """What replication would do for the heartbeat row: copy the primary's beat to the replica"""
+    db_routing.check_replicas()
+    with engine.connect() as conn:
+        beat = conn.execute(select(ReplicaHeartbeat.Id, ReplicaHeartbeat.Beat_At)).one()
+    with replicas.engines[0].begin() as conn:
+        conn.execute(ReplicaHeartbeat.__table__.delete())
+        conn.execute(insert(ReplicaHeartbeat).values(Id=beat.Id, Beat_At=beat.Beat_At))
+    # The next check reads the copied beat back from the replica
+    db_routing.check_replicas()
+
+
+def citizen_name(client, **headers) -> str:
+    response = client.get("/api/citizens/1", headers=headers)
+    response.raise_for_status()
+    return response.json()["citizen"]["Name"]
+
+
+def main() -> int:
+    seed()
+    with TestClient(app) as client:
+        db_routing.check_replicas()
+        name = citizen_name(client)
+        expect("replica without a heartbeat is skipped", name == ON_PRIMARY, f"GET read {name!r}")
+
+        replicate_heartbeat()
+        stats = db_routing.replica_stats()
+        expect("heartbeat copied, replica usable", stats[0]["usable"], str(stats))
+        name = citizen_name(client)
+        expect("GET reads from the replica", name == ON_REPLICA, f"GET read {name!r}")
+        listed = {c["Citizen_ID"]: c["Name"] for c in client.get("/api/citizens/").json()}
+        expect("GET list reads from the replica", listed.get(1) == ON_REPLICA, f"list read {listed.get(1)!r}")
+        for path in ANALYTICS_PATHS:
+            status = client.get(path).status_code
+            expect(f"GET {path} answers from the replica", status < 500, f"status {status}")
+
+        # Textual SQL waits for the last write to any table, and the
+        # aggregates above may have built their projections
+        time.sleep(0.01)
+        replicate_heartbeat()
+        console = client.post("/api/custom-queries/execute",
+                              json={"query": "SELECT Name FROM Citizen WHERE Citizen_ID = 1"}).json()
+        # A POST answers with a read_after stamp, which would pin the next reads
+        client.cookies.clear()
+        name = (console.get("data") or [{}])[0].get("Name")
+        expect("console SELECT reads from the replica", name == ON_REPLICA, f"read {name!r}")
+        for replica in custom_query_replicas.engines:
+            expect(f"{replica.pool.logging_name or 'console replica'} sets max_execution_time on connect",
+                   event.contains(replica, "connect", query_governor._limit_execution_time))
+            if replica.dialect.name == "mysql":
+                with replica.connect() as conn:
+                    limit = conn.scalar(text("SELECT @@SESSION.max_execution_time"))
+                expect("console replica connection has the timeout",
+                       limit == query_governor.CUSTOM_QUERY_TIMEOUT_MS, f"max_execution_time={limit}")
+
+        db = SessionLocal()
+        token = replica_reads_allowed.set(True)
+        try:
+            before = db.scalar(select(Citizen.Name).where(Citizen.Citizen_ID == 1))
+            db.add(Citizen(Citizen_ID=2, Name="Written In Session"))
+            db.flush()
+            after = db.scalar(select(Citizen.Name).where(Citizen.Citizen_ID == 1))
+            expect("session reads the replica before writing", before == ON_REPLICA, f"read {before!r}")
+            expect("session that wrote reads the primary", after == ON_PRIMARY, f"read {after!r}")
+        finally:
+            replica_reads_allowed.reset(token)
+            db.rollback()
+            db.close()
+
+        # A stamp newer than the replica's last heartbeat, as a client sends after a write
+        stamp = f"{time.time():.6f}"
+        name = citizen_name(client, **{db_routing.READ_AFTER_HEADER: stamp})
+        expect("X-Read-After ahead of the heartbeat reads the primary", name == ON_PRIMARY, f"GET read {name!r}")
+        name = citizen_name(client)
+        expect("GET without X-Read-After still reads the replica", name == ON_REPLICA, f"GET read {name!r}")
+        time.sleep(0.01)
+        replicate_heartbeat()
+        name = citizen_name(client, **{db_routing.READ_AFTER_HEADER: stamp})
+        expect("X-Read-After behind the heartbeat reads the replica", name == ON_REPLICA, f"GET read {name!r}")
+
+        response = client.post("/api/citizens/", json={"Name": "Posted Citizen"})
+        expect("write response carries X-Read-After and the read_after cookie",
+               response.status_code < 400 and db_routing.READ_AFTER_HEADER in response.headers
+               and client.cookies.get(db_routing.READ_AFTER_COOKIE) is not None,
+               f"status {response.status_code}, headers {dict(response.headers)}")
+        client.cookies.clear()
+        # Without any stamp, a read of the written table still waits for the replica
+        name = citizen_name(client)
+        expect("GET after a write to its table reads the primary", name == ON_PRIMARY, f"GET read {name!r}")
+        time.sleep(0.01)
+        replicate_heartbeat()
+        name = citizen_name(client)
+        expect("GET reads the replica again once it has the write", name == ON_REPLICA, f"GET read {name!r}")
+
+    print(f"\n{failures} check(s) failed" if failures else "\nall checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
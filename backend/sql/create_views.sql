@@ -5,10 +5,18 @@ CREATE OR REPLACE VIEW view_total_paid_per_citizen AS
 SELECT
   c.Citizen_ID,
   c.Name,
-  COALESCE(SUM(p.Amount), 0) AS Total_Paid
+  COALESCE(SUM(paid.Amount), 0) AS Total_Paid
 FROM Citizen c
-LEFT JOIN Service_Request sr ON sr.Citizen_ID = c.Citizen_ID
-LEFT JOIN Payment p ON p.Payment_ID = sr.Payment_ID
+-- Live and archived requests (Service_Request_History, migration 0008)
+LEFT JOIN (
+  SELECT sr.Citizen_ID, p.Amount
+  FROM Service_Request sr
+  INNER JOIN Payment p ON p.Payment_ID = sr.Payment_ID
+  UNION ALL
+  SELECT srh.Citizen_ID, ph.Amount
+  FROM Service_Request_History srh
+  INNER JOIN Payment_History ph ON ph.Payment_ID = srh.Payment_ID
+) paid ON paid.Citizen_ID = c.Citizen_ID
 GROUP BY c.Citizen_ID, c.Name;
 
 CREATE OR REPLACE VIEW view_request_counts_per_service AS
@@ -17,7 +25,11 @@ SELECT
   s.Service_Name,
   COUNT(sr.Request_ID) AS Request_Count
 FROM Service s
-LEFT JOIN Service_Request sr ON sr.Service_ID = s.Service_ID
+LEFT JOIN (
+  SELECT Service_ID, Request_ID FROM Service_Request
+  UNION ALL
+  SELECT Service_ID, Request_ID FROM Service_Request_History
+) sr ON sr.Service_ID = s.Service_ID
 GROUP BY s.Service_ID, s.Service_Name;
 
 CREATE OR REPLACE VIEW view_open_grievances_per_department AS
@@ -31,6 +43,8 @@ LEFT JOIN Grievance g ON g.Department_ID = d.Department_ID
 GROUP BY d.Department_ID, d.Department_Name;
 
 -- Optional: a simple recent requests view (most recent 20)
+-- Reads only the live table: the archive job moves requests older than its
+-- cutoff (months back), so the newest rows are always live.
 CREATE OR REPLACE VIEW view_recent_requests AS
 SELECT
   sr.Request_ID,
@@ -21,12 +21,18 @@ END$$
 DELIMITER ;
 
 -- 2.7 AFTER DELETE ON Service: delete related service_requests (which will cascade to payments via trg_after_delete_service_request)
+-- and the archived requests of the service with their payments (migration 0008)
 DELIMITER $$
 CREATE TRIGGER trg_after_delete_service
 AFTER DELETE ON Service
 FOR EACH ROW
 BEGIN
     DELETE FROM Service_Request WHERE Service_ID = OLD.Service_ID;
+
+    DELETE ph FROM Payment_History ph
+    INNER JOIN Service_Request_History srh ON srh.Payment_ID = ph.Payment_ID
+    WHERE srh.Service_ID = OLD.Service_ID;
+    DELETE FROM Service_Request_History WHERE Service_ID = OLD.Service_ID;
 END$$
 DELIMITER ;
 
@@ -39,6 +45,12 @@ BEGIN
     -- Delete service requests (will cause trg_after_delete_service_request to archive/delete payments)
     DELETE FROM Service_Request WHERE Citizen_ID = OLD.Citizen_ID;
 
+    -- Delete archived service requests and their payments (no triggers on the history tables)
+    DELETE ph FROM Payment_History ph
+    INNER JOIN Service_Request_History srh ON srh.Payment_ID = ph.Payment_ID
+    WHERE srh.Citizen_ID = OLD.Citizen_ID;
+    DELETE FROM Service_Request_History WHERE Citizen_ID = OLD.Citizen_ID;
+
     -- Delete grievances
     DELETE FROM Grievance WHERE Citizen_ID = OLD.Citizen_ID;
 END$$
@@ -222,10 +234,19 @@ CREATE FUNCTION fn_total_paid_by_citizen(p_citizen_id INT) RETURNS DECIMAL(12,2)
 DETERMINISTIC
 BEGIN
     DECLARE total DECIMAL(12,2);
-    SELECT COALESCE(SUM(p.Amount),0) INTO total
-    FROM Payment p
-    INNER JOIN Service_Request sr ON sr.Payment_ID = p.Payment_ID
-    WHERE sr.Citizen_ID = p_citizen_id AND p.Status = 'Completed';
+    -- Live and archived requests (a request and its payment are always on the same side)
+    SELECT COALESCE(SUM(paid.Amount),0) INTO total
+    FROM (
+        SELECT p.Amount
+        FROM Payment p
+        INNER JOIN Service_Request sr ON sr.Payment_ID = p.Payment_ID
+        WHERE sr.Citizen_ID = p_citizen_id AND p.Status = 'Completed'
+        UNION ALL
+        SELECT ph.Amount
+        FROM Payment_History ph
+        INNER JOIN Service_Request_History srh ON srh.Payment_ID = ph.Payment_ID
+        WHERE srh.Citizen_ID = p_citizen_id AND ph.Status = 'Completed'
+    ) paid;
     RETURN total;
 END$$
 DELIMITER ;
@@ -239,7 +260,12 @@ CREATE FUNCTION fn_count_requests_by_citizen(p_citizen_id INT) RETURNS INT
 DETERMINISTIC
 BEGIN
     DECLARE cnt INT;
-    SELECT COUNT(*) INTO cnt FROM Service_Request WHERE Citizen_ID = p_citizen_id;
+    SELECT COUNT(*) INTO cnt
+    FROM (
+        SELECT Request_ID FROM Service_Request WHERE Citizen_ID = p_citizen_id
+        UNION ALL
+        SELECT Request_ID FROM Service_Request_History WHERE Citizen_ID = p_citizen_id
+    ) requests;
     RETURN IFNULL(cnt, 0);
 END$$
 DELIMITER ;
@@ -250,10 +276,18 @@ CREATE FUNCTION fn_avg_payment_by_service(p_service_id INT) RETURNS DECIMAL(12,2
 DETERMINISTIC
 BEGIN
     DECLARE avg_amt DECIMAL(12,2);
-    SELECT COALESCE(AVG(p.Amount), 0) INTO avg_amt
-    FROM Payment p
-    INNER JOIN Service_Request sr ON sr.Payment_ID = p.Payment_ID
-    WHERE sr.Service_ID = p_service_id AND p.Status = 'Completed';
+    SELECT COALESCE(AVG(paid.Amount), 0) INTO avg_amt
+    FROM (
+        SELECT p.Amount
+        FROM Payment p
+        INNER JOIN Service_Request sr ON sr.Payment_ID = p.Payment_ID
+        WHERE sr.Service_ID = p_service_id AND p.Status = 'Completed'
+        UNION ALL
+        SELECT ph.Amount
+        FROM Payment_History ph
+        INNER JOIN Service_Request_History srh ON srh.Payment_ID = ph.Payment_ID
+        WHERE srh.Service_ID = p_service_id AND ph.Status = 'Completed'
+    ) paid;
     RETURN avg_amt;
 END$$
 DELIMITER ;
@@ -278,7 +312,12 @@ CREATE FUNCTION fn_is_citizen_active(p_citizen_id INT) RETURNS TINYINT(1)
 DETERMINISTIC
 BEGIN
     DECLARE last_date DATETIME;
-    SELECT MAX(Request_Date) INTO last_date FROM Service_Request WHERE Citizen_ID = p_citizen_id;
+    SELECT MAX(latest.Request_Date) INTO last_date
+    FROM (
+        SELECT MAX(Request_Date) AS Request_Date FROM Service_Request WHERE Citizen_ID = p_citizen_id
+        UNION ALL
+        SELECT MAX(Request_Date) FROM Service_Request_History WHERE Citizen_ID = p_citizen_id
+    ) latest;
     IF last_date IS NULL THEN
         RETURN 0;
     END IF;
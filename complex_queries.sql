@@ -564,24 +564,24 @@ ORDER BY sr1.Request_Date DESC;
 -- ==========================================
 
 -- 13.1 Create view for citizen dashboard
+-- Reads the citizen_summary projection (maintained by the backend, see
+-- backend/app/citizen_summary.py) instead of COUNT(DISTINCT) fan-out joins
+-- over every request x grievance pair.
 CREATE OR REPLACE VIEW vw_Citizen_Dashboard AS
 SELECT 
     c.Citizen_ID,
     c.Name,
     c.Email,
     c.Phone,
-    COUNT(DISTINCT sr.Request_ID) AS Total_Requests,
-    COUNT(DISTINCT CASE WHEN sr.Status = 'Completed' THEN sr.Request_ID END) AS Completed_Requests,
-    COUNT(DISTINCT CASE WHEN sr.Status = 'Pending' THEN sr.Request_ID END) AS Pending_Requests,
-    COUNT(DISTINCT g.Grievance_ID) AS Total_Grievances,
-    COUNT(DISTINCT CASE WHEN g.Status = 'Open' THEN g.Grievance_ID END) AS Open_Grievances,
-    COALESCE(SUM(p.Amount), 0) AS Total_Amount_Paid,
-    MAX(sr.Request_Date) AS Last_Request_Date
+    COALESCE(cs.Total_Service_Requests, 0) AS Total_Requests,
+    COALESCE(cs.Completed_Requests, 0) AS Completed_Requests,
+    COALESCE(cs.Pending_Requests, 0) AS Pending_Requests,
+    COALESCE(cs.Total_Grievances, 0) AS Total_Grievances,
+    COALESCE(cs.Open_Grievances, 0) AS Open_Grievances,
+    COALESCE(cs.Total_Amount_Paid, 0) AS Total_Amount_Paid,
+    cs.Last_Service_Request_Date AS Last_Request_Date
 FROM Citizen c
-LEFT JOIN Service_Request sr ON c.Citizen_ID = sr.Citizen_ID
-LEFT JOIN Grievance g ON c.Citizen_ID = g.Citizen_ID
-LEFT JOIN Payment p ON sr.Payment_ID = p.Payment_ID AND p.Status = 'Completed'
-GROUP BY c.Citizen_ID, c.Name, c.Email, c.Phone;
+LEFT JOIN citizen_summary cs ON cs.Citizen_ID = c.Citizen_ID;
 
 -- Query the view
 SELECT * FROM vw_Citizen_Dashboard ORDER BY Total_Requests DESC;
@@ -9,15 +9,31 @@ const api = axios.create({
   },
 });
 
+// Read-your-writes with read replicas: after a write, send its X-Read-After
+// token so reads go to the primary until a replica has caught up
+let readAfter = null;
+api.interceptors.request.use((config) => {
+  if (readAfter) config.headers['X-Read-After'] = readAfter;
+  return config;
+});
+api.interceptors.response.use((response) => {
+  const token = response.headers['x-read-after'];
+  if (token) readAfter = token;
+  return response;
+});
+
 // Dashboard APIs
 export const getDashboardStats = () => api.get('/dashboard/stats');
 export const getRecentRequests = (limit = 10) => api.get(`/dashboard/recent-requests?limit=${limit}`);
 export const getDepartmentPerformance = () => api.get('/dashboard/department-performance');
 export const getMonthlyTrends = () => api.get('/dashboard/monthly-trends');
+// Server-sent "update" events: { counters: {name: delta}, refresh: [panel, ...] }
+export const openDashboardStream = () => new EventSource(`${API_BASE_URL}/dashboard/stream`);
 
 // Citizens APIs
 export const getCitizens = (skip = 0, limit = 100) => api.get(`/citizens?skip=${skip}&limit=${limit}`);
 export const getCitizen = (id) => api.get(`/citizens/${id}`);
+export const searchCitizens = (q, limit = 20, cursor) => api.get('/citizens/search', { params: { q, limit, cursor } });
 export const createCitizen = (data) => api.post('/citizens', data);
 export const updateCitizen = (id, data) => api.put(`/citizens/${id}`, data);
 export const deleteCitizen = (id) => api.delete(`/citizens/${id}`);
@@ -47,9 +63,17 @@ export const getPayments = (skip = 0, limit = 100) => api.get(`/payments?skip=${
 export const getPayment = (id) => api.get(`/payments/${id}`);
 export const createPayment = (data) => api.post('/payments', data);
 
+// Live and archived records together; each row has Archived: true/false
+// params: citizen_id, service_id, status, start_date, end_date, limit, cursor (X-Next-Cursor)
+export const getServiceRequestHistory = (params = {}) => api.get('/history/service-requests', { params });
+export const getServiceRequestAnyAge = (id) => api.get(`/history/service-requests/${id}`);
+export const getPaymentHistory = (params = {}) => api.get('/history/payments', { params });
+export const getPaymentAnyAge = (id) => api.get(`/history/payments/${id}`);
+
 // Grievances APIs
 export const getGrievances = (skip = 0, limit = 100) => api.get(`/grievances?skip=${skip}&limit=${limit}`);
 export const getGrievance = (id) => api.get(`/grievances/${id}`);
+export const searchGrievances = (q, params = {}) => api.get('/grievances/search', { params: { q, ...params } });
 export const createGrievance = (data) => api.post('/grievances', data);
 export const updateGrievance = (id, data) => api.put(`/grievances/${id}`, data);
 export const updateGrievanceStatus = (id, status) => api.patch(`/grievances/${id}/status?status=${status}`);
@@ -69,6 +93,8 @@ export const getFunctionCountRequests = (citizen_id) => api.get(`/db/functions/c
 export const getFunctionAvgPayment = (service_id) => api.get(`/db/functions/avg_payment?service_id=${service_id}`);
 export const getFunctionOpenGrievances = (department_id) => api.get(`/db/functions/open_grievances?department_id=${department_id}`);
 export const getFunctionIsCitizenActive = (citizen_id) => api.get(`/db/functions/is_citizen_active?citizen_id=${citizen_id}`);
+// Batch form of the functions above: name is total_paid, count_requests, avg_payment, open_grievances or is_citizen_active
+export const getFunctionBatch = (name, ids) => api.post(`/db/functions/${name}/batch`, { ids });
 
 export const getView = (viewName) => api.get(`/db/views/${encodeURIComponent(viewName)}`);
 
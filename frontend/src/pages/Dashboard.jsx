@@ -9,7 +9,7 @@ import {
   TrendingUp,
   CheckCircle
 } from 'lucide-react';
-import { getDashboardStats, getRecentRequests, getDepartmentPerformance } from '../api/api';
+import { getDashboardStats, getRecentRequests, getDepartmentPerformance, openDashboardStream } from '../api/api';
 
 const Dashboard = () => {
   const [stats, setStats] = useState(null);
@@ -18,7 +18,41 @@ const Dashboard = () => {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    fetchDashboardData();
+    // Live updates instead of refetching everything: apply the counter
+    // deltas and reload only the panels whose data changed
+    const stream = openDashboardStream();
+    let opened = false;
+    stream.onopen = () => {
+      // Load once subscribed, so no delta can fall between the load and the
+      // subscription; after a reconnect anything may have changed meanwhile
+      opened = true;
+      fetchDashboardData();
+    };
+    stream.onerror = () => {
+      // The stream never connected (e.g. blocked by a proxy): show the data
+      // anyway; onopen reloads it if a retry connects later
+      if (!opened) {
+        opened = true;
+        fetchDashboardData();
+      }
+    };
+    stream.addEventListener('update', (event) => {
+      const { counters, refresh } = JSON.parse(event.data);
+      if (refresh.includes('stats')) {
+        getDashboardStats().then((res) => setStats(res.data));
+      } else if (Object.keys(counters).length) {
+        setStats((current) => current && Object.fromEntries(
+          Object.entries(current).map(([name, value]) => [name, value + (counters[name] || 0)])
+        ));
+      }
+      if (refresh.includes('recent-requests')) {
+        getRecentRequests(5).then((res) => setRecentRequests(res.data));
+      }
+      if (refresh.includes('department-performance')) {
+        getDepartmentPerformance().then((res) => setDeptPerformance(res.data));
+      }
+    });
+    return () => stream.close();
   }, []);
 
   const fetchDashboardData = async () => {
@@ -73,3 +73,126 @@ CREATE TABLE Grievance (
     CONSTRAINT fk_grievance_department FOREIGN KEY (Department_ID)
         REFERENCES Department(Department_ID)
 );
+
+-- 7. ID sequences (block allocation for primary keys, see app/id_allocator.py)
+CREATE TABLE id_sequence (
+    Sequence_Name VARCHAR(64),
+    Next_Value BIGINT NOT NULL,
+    CONSTRAINT pk_id_sequence PRIMARY KEY (Sequence_Name)
+);
+
+-- 8. Dashboard counters (maintained incrementally, see app/dashboard_counters.py)
+-- Each counter is spread over slot rows so concurrent writers rarely lock the same row
+CREATE TABLE dashboard_counter (
+    Name VARCHAR(64),
+    Slot SMALLINT NOT NULL DEFAULT 0,
+    Value DECIMAL(18,2) NOT NULL DEFAULT 0,
+    CONSTRAINT pk_dashboard_counter PRIMARY KEY (Name, Slot)
+);
+
+-- 9. Citizen summary projection (maintained on write, see app/citizen_summary.py)
+CREATE TABLE citizen_summary (
+    Citizen_ID INT,
+    Total_Service_Requests INT NOT NULL DEFAULT 0,
+    Completed_Requests INT NOT NULL DEFAULT 0,
+    Pending_Requests INT NOT NULL DEFAULT 0,
+    Total_Grievances INT NOT NULL DEFAULT 0,
+    Open_Grievances INT NOT NULL DEFAULT 0,
+    Total_Amount_Paid DECIMAL(14,2) NOT NULL DEFAULT 0,
+    Last_Service_Request_Date DATE,
+    Last_Grievance_Date DATE,
+    CONSTRAINT pk_citizen_summary PRIMARY KEY (Citizen_ID)
+);
+
+-- 10. Department analytics rollup (daily buckets, see app/department_rollup.py)
+CREATE TABLE department_daily_rollup (
+    Service_ID INT NOT NULL,
+    Day DATE NOT NULL,
+    Status VARCHAR(50) NOT NULL,
+    Request_Count INT NOT NULL DEFAULT 0,
+    Paid_Count INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    CONSTRAINT pk_department_daily_rollup PRIMARY KEY (Service_ID, Day, Status),
+    INDEX idx_rollup_day (Day)
+);
+
+-- 11. Monthly trends of closed months (see app/monthly_trends.py)
+CREATE TABLE monthly_trend (
+    Month CHAR(7),
+    Total_Requests INT NOT NULL DEFAULT 0,
+    Total_Revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    Unique_Citizens INT NOT NULL DEFAULT 0,
+    Citizen_Sketch BLOB,
+    Computed_At DATETIME NOT NULL,
+    Version INT NOT NULL DEFAULT 0,
+    Frozen_Version INT,
+    CONSTRAINT pk_monthly_trend PRIMARY KEY (Month)
+);
+
+-- 12. Search indexes (see app/search.py)
+ALTER TABLE Citizen ADD FULLTEXT INDEX ft_citizen_name_email (Name, Email);
+CREATE INDEX idx_citizen_phone ON Citizen (Phone);
+ALTER TABLE Grievance ADD FULLTEXT INDEX ft_grievance_description (Description);
+
+-- 13. Replica lag heartbeat (see app/db_routing.py)
+CREATE TABLE replica_heartbeat (
+    Id INT,
+    Beat_At DOUBLE NOT NULL,
+    CONSTRAINT pk_replica_heartbeat PRIMARY KEY (Id)
+);
+
+-- 14. Time partitioning and archive tables (see backend/app/partitioning.py, backend/app/archive.py)
+-- Partitioned tables cannot have foreign keys, and every unique key must include the date
+ALTER TABLE Service_Request
+    DROP FOREIGN KEY fk_request_citizen,
+    DROP FOREIGN KEY fk_request_service,
+    DROP FOREIGN KEY fk_request_payment;
+ALTER TABLE Service_Request
+    MODIFY Request_Date DATE NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (Request_ID, Request_Date);
+ALTER TABLE Payment
+    MODIFY Payment_Date DATE NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (Payment_ID, Payment_Date);
+ALTER TABLE Service_Request
+    PARTITION BY RANGE COLUMNS (Request_Date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+ALTER TABLE Payment
+    PARTITION BY RANGE COLUMNS (Payment_Date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Service_Request_History (
+    Request_ID INT,
+    Citizen_ID INT,
+    Service_ID INT,
+    Request_Date DATE NOT NULL,
+    Status VARCHAR(50),
+    Payment_ID INT,
+    Archived_At DATETIME NOT NULL,
+    CONSTRAINT pk_request_history PRIMARY KEY (Request_ID),
+    INDEX idx_srh_citizen_date (Citizen_ID, Request_Date),
+    INDEX idx_srh_date_citizen_payment (Request_Date, Citizen_ID, Payment_ID),
+    INDEX idx_srh_service_status_payment (Service_ID, Status, Payment_ID)
+) ROW_FORMAT=COMPRESSED;
+
+CREATE TABLE Payment_History (
+    Payment_ID INT,
+    Amount DECIMAL(10,2),
+    Payment_Date DATE,
+    Payment_Method VARCHAR(50),
+    Status VARCHAR(50),
+    Archived_At DATETIME NOT NULL,
+    CONSTRAINT pk_payment_history PRIMARY KEY (Payment_ID),
+    INDEX idx_ph_date (Payment_Date),
+    INDEX idx_ph_status_amount (Status, Amount)
+) ROW_FORMAT=COMPRESSED;
+
+CREATE TABLE archive_run (
+    Run_ID INT AUTO_INCREMENT,
+    Started_At DATETIME NOT NULL,
+    Finished_At DATETIME,
+    Cutoff DATE NOT NULL,
+    Requests INT NOT NULL DEFAULT 0,
+    Payments INT NOT NULL DEFAULT 0,
+    Parquet_Path VARCHAR(500),
+    CONSTRAINT pk_archive_run PRIMARY KEY (Run_ID)
+);